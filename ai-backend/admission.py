@@ -0,0 +1,206 @@
+# Gerekli kütüphanelerin import edilmesi
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+
+from metrics import registry
+
+# Sınıflandırma havuzunun iş parçacığı sayısı ve çalışanlara ek olarak kuyrukta bekleyebilecek en fazla istek
+CLASSIFY_WORKERS = int(os.getenv("CLASSIFY_WORKERS", os.getenv("EXECUTOR_WORKERS", "4")))
+CLASSIFY_QUEUE_MAX = int(os.getenv("CLASSIFY_QUEUE_MAX", "32"))
+# Sohbet isteklerinde aynı anda LLM'e giden istek sayısına ek olarak bekleyebilecek en fazla istek
+CHAT_QUEUE_MAX = int(os.getenv("CHAT_QUEUE_MAX", "32"))
+# Aynı anda çalışabilecek en fazla toplu analiz isteği (/analyze/batch)
+BATCH_MAX_CONCURRENCY = int(os.getenv("BATCH_MAX_CONCURRENCY", "2"))
+# Aynı user_id / session_id için aynı anda işlenebilecek en fazla istek (0: sınırsız)
+PER_USER_MAX_CONCURRENCY = int(os.getenv("PER_USER_MAX_CONCURRENCY", "2"))
+# Doygunluk durumunda istemciye önerilen tekrar deneme süresi (saniye)
+ADMISSION_RETRY_AFTER_SECONDS = int(os.getenv("ADMISSION_RETRY_AFTER_SECONDS", "2"))
+# İstemci bir süre bildirmediğinde uygulanan varsayılan istek süresi (saniye, 0: süresiz)
+DEFAULT_REQUEST_TIMEOUT_SECONDS = float(os.getenv("DEFAULT_REQUEST_TIMEOUT_SECONDS", "0"))
+
+ADMISSION_REJECTED = registry.counter(
+    "dental_admission_rejected_total", "Kabul kontrolü tarafından reddedilen veya süresi dolduğu için bırakılan istek sayısı.",
+    ("pool", "reason"),
+)
+
+
+class AdmissionRejected(Exception):
+    """İstek kabul edilmediğinde fırlatılır; HTTP durum kodu ve önerilen tekrar deneme süresini taşır."""
+
+    status_code = 503
+
+    def __init__(self, detail: str, retry_after: Optional[int] = None):
+        super().__init__(detail)
+        self.detail = detail
+        self.retry_after = retry_after
+
+
+class PoolSaturated(AdmissionRejected):
+    """Havuzun çalışan ve bekleyen istek kapasitesi dolu (503)."""
+
+    status_code = 503
+
+
+class TooManyConcurrentRequests(AdmissionRejected):
+    """Aynı kullanıcı / oturum için eşzamanlı istek sınırı aşıldı (429)."""
+
+    status_code = 429
+
+
+class DeadlineExceeded(AdmissionRejected):
+    """İstemcinin bildirdiği süre, iş başlamadan önce doldu (504); istemci yanıtı artık beklemiyor."""
+
+    status_code = 504
+
+
+class InvalidDeadline(AdmissionRejected):
+    """Süre başlığı sonlu bir sayı değil (NaN / inf); böyle bir son an hiçbir karşılaştırmada dolmaz (400)."""
+
+    status_code = 400
+
+
+def _finite(value: str, header: str) -> float:
+    number = float(value)
+    if not math.isfinite(number):
+        raise InvalidDeadline(f"{header} başlığı sonlu bir sayı olmalıdır.")
+    return number
+
+
+def parse_deadline(timeout_ms: Optional[str], deadline_epoch: Optional[str]) -> Optional[float]:
+    """`X-Request-Timeout-Ms` (göreli) veya `X-Request-Deadline` (Unix zamanı, saniye) başlığını
+    `time.monotonic()` cinsinden mutlak bir son ana çevirir; ikisi de yoksa varsayılan süre kullanılır.
+
+    NaN veya sonsuz değerler `InvalidDeadline` (400) ile reddedilir.
+    """
+    now = time.monotonic()
+    try:
+        if timeout_ms:
+            return now + _finite(timeout_ms, "X-Request-Timeout-Ms") / 1000.0
+        if deadline_epoch:
+            # Saat farkı göreli süreye çevrilerek istemci/sunucu saatleri arasındaki kaymadan yalnızca bir kez etkilenir
+            return now + (_finite(deadline_epoch, "X-Request-Deadline") - time.time())
+    except ValueError:
+        pass
+    if DEFAULT_REQUEST_TIMEOUT_SECONDS > 0:
+        return now + DEFAULT_REQUEST_TIMEOUT_SECONDS
+    return None
+
+
+def check_deadline(deadline: Optional[float], pool: str = "classify") -> None:
+    """Son an geçmişse `DeadlineExceeded` fırlatır; pahalı bir aşamaya başlamadan önce çağrılır."""
+    if deadline is not None and time.monotonic() >= deadline:
+        ADMISSION_REJECTED.inc(pool=pool, reason="deadline")
+        raise DeadlineExceeded("İstek süresi işlem başlamadan doldu.")
+
+
+class AdmissionSlot:
+    """Kabul kontrolünden alınmış tek bir yer; blok sonunda veya `release` ile (bir kez) bırakılır."""
+
+    def __init__(self, controller: "AdmissionController", key: Optional[str]):
+        self._controller = controller
+        self._key = key
+        self._lock = threading.Lock()
+        self._released = False
+
+    def release(self) -> None:
+        """Yeri bırakır; tekrar çağrılması etkisizdir."""
+        with self._lock:
+            if self._released:
+                return
+            self._released = True
+        self._controller.release(self._key)
+
+    def __enter__(self) -> "AdmissionSlot":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.release()
+
+
+class AdmissionController:
+    """Bir iş havuzunun eşzamanlı istek sayısını ve anahtar (kullanıcı / oturum) başına eşzamanlılığı sınırlar.
+
+    Kabul kararı bekleme yapmadan verilir: kapasite doluysa istek kuyruğa alınmak yerine hemen reddedilir,
+    böylece sunucu zaman aşımına uğrayacak işler için CPU harcamaz ve istemci Retry-After ile geri çekilir.
+    """
+
+    def __init__(self, name: str, max_inflight: int, max_per_key: int = PER_USER_MAX_CONCURRENCY,
+                 retry_after: int = ADMISSION_RETRY_AFTER_SECONDS):
+        self.name = name
+        self.max_inflight = max(1, max_inflight)
+        self.max_per_key = max(0, max_per_key)
+        self.retry_after = retry_after
+        self._lock = threading.Lock()
+        self._inflight = 0
+        self._per_key: Dict[str, int] = {}
+        self.admitted = 0
+        self.rejected_saturated = 0
+        self.rejected_per_key = 0
+
+    def acquire(self, key: Optional[str] = None, deadline: Optional[float] = None) -> None:
+        """Bir yer ayırır; havuz doluysa `PoolSaturated`, anahtar sınırı aşıldıysa `TooManyConcurrentRequests` fırlatır."""
+        check_deadline(deadline, self.name)
+        with self._lock:
+            if key is not None and self.max_per_key and self._per_key.get(key, 0) >= self.max_per_key:
+                self.rejected_per_key += 1
+                rejected = TooManyConcurrentRequests(
+                    "Aynı anda çok fazla isteğiniz işleniyor. Lütfen önceki isteklerin tamamlanmasını bekleyin.",
+                    self.retry_after,
+                )
+            elif self._inflight >= self.max_inflight:
+                self.rejected_saturated += 1
+                rejected = PoolSaturated("Sunucu şu anda yoğun. Lütfen birazdan tekrar deneyin.", self.retry_after)
+            else:
+                self._inflight += 1
+                if key is not None:
+                    self._per_key[key] = self._per_key.get(key, 0) + 1
+                self.admitted += 1
+                return
+        ADMISSION_REJECTED.inc(pool=self.name, reason="per_key" if isinstance(rejected, TooManyConcurrentRequests) else "saturated")
+        raise rejected
+
+    def release(self, key: Optional[str] = None) -> None:
+        with self._lock:
+            self._inflight -= 1
+            if key is not None:
+                remaining = self._per_key.get(key, 0) - 1
+                if remaining > 0:
+                    self._per_key[key] = remaining
+                else:
+                    self._per_key.pop(key, None)
+
+    @contextmanager
+    def slot(self, key: Optional[str] = None, deadline: Optional[float] = None) -> Iterator[None]:
+        """`acquire` / `release` çiftini bir blok boyunca uygular."""
+        self.acquire(key, deadline)
+        try:
+            yield
+        finally:
+            self.release(key)
+
+    def hold(self, key: Optional[str] = None, deadline: Optional[float] = None) -> AdmissionSlot:
+        """`acquire` ile yer ayırır ve iş bitmeden erken bırakılabilen bir `AdmissionSlot` döndürür."""
+        self.acquire(key, deadline)
+        return AdmissionSlot(self, key)
+
+    def inflight(self) -> int:
+        with self._lock:
+            return self._inflight
+
+    def stats(self) -> Dict:
+        """Kapasite, anlık eşzamanlılık ve kabul/ret sayaçlarını döndürür."""
+        with self._lock:
+            return {
+                "name": self.name,
+                "max_inflight": self.max_inflight,
+                "max_per_key": self.max_per_key,
+                "inflight": self._inflight,
+                "active_keys": len(self._per_key),
+                "admitted": self.admitted,
+                "rejected_saturated": self.rejected_saturated,
+                "rejected_per_key": self.rejected_per_key,
+            }
@@ -0,0 +1,317 @@
+# Çok sayıda diş görüntüsünü toplu olarak analiz eden işlem hattı ve komut satırı aracı.
+# Kullanım: python batch_analysis.py "scans/**/*.jpg" --output results.ndjson
+# Yarıda kalan bir çalışma aynı komutla tekrar başlatıldığında kontrol noktasından devam eder.
+import argparse
+import csv
+import glob
+import io
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from batching import BATCH_MAX_SIZE
+from image_analyzer import LABELS_EN
+from llm_client import LLM_MAX_CONCURRENCY
+
+# Görüntüleri okuyup çözen ve ön işleyen ön getirme iş parçacığı sayısı
+BATCH_DECODE_WORKERS = int(os.getenv("BATCH_DECODE_WORKERS", str(min(8, os.cpu_count() or 1))))
+# Ön getirme aşamasında aynı anda bellekte tutulacak en fazla görüntü (batch boyutunun katı olarak)
+BATCH_PREFETCH_BATCHES = int(os.getenv("BATCH_PREFETCH_BATCHES", "4"))
+
+# Görüntü dosyası uzantıları (dizin verildiğinde bu uzantılar taranır)
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp", ".webp")
+
+# CSV çıktısının sütunları; olasılıklar etiket başına ayrı sütunlarda (yüzde olarak) yer alır
+CSV_LABEL_COLUMNS = list(LABELS_EN)
+CSV_COLUMNS = ["file", "success", "top_issue", "top_predictions", *CSV_LABEL_COLUMNS, "dental_comment", "error"]
+
+# Toplu analizin girdisi: (görüntü adı, görüntü baytlarını döndüren fonksiyon)
+BatchItem = Tuple[str, Callable[[], bytes]]
+
+
+class BatchRunStats:
+    """Toplu çalışmanın işlenen görüntü, hata ve verim (görüntü/sn) sayaçları."""
+
+    def __init__(self):
+        self.started_at = time.perf_counter()
+        self.processed = 0
+        self.errors = 0
+        self.cache_hits = 0
+
+    def as_dict(self) -> Dict:
+        elapsed = time.perf_counter() - self.started_at
+        return {
+            "processed": self.processed,
+            "errors": self.errors,
+            "cache_hits": self.cache_hits,
+            "elapsed_s": round(elapsed, 3),
+            "images_per_sec": round(self.processed / elapsed, 2) if elapsed > 0 else 0.0,
+        }
+
+
+def _prefetch(analyzer, model, name: str, load: Callable[[], bytes]) -> Dict:
+    """Ön getirme aşaması: görüntüyü okur, çözer ve ön işler (iş parçacığı havuzunda çalışır)."""
+    try:
+        image_key, classification, pixel_values, image = analyzer.prepare_image(load(), model)
+        return {"file": name, "image_key": image_key, "classification": classification, "pixel_values": pixel_values,
+                "image": image}
+    except Exception as e:
+        return {"file": name, "error": f"Görüntü okunamadı: {e}"}
+
+
+def _to_record(name: str, classification: Dict, summary: Optional[Dict]) -> Dict:
+    """Sınıflandırma (ve isteğe bağlı yorum) sonucundan tek satırlık çıktı kaydı oluşturur."""
+    record = {
+        "file": name,
+        "success": True,
+        "top_issue": classification["top_issue"],
+        "top_predictions": classification["top_predictions"],
+        "all_predictions": classification["all_predictions"],
+    }
+    if summary is not None:
+        record["dental_comment"] = summary["comment"]
+        record["weekly_plan"] = summary["plan"]
+    return record
+
+
+def run_batch(
+    analyzer,
+    items: Iterable[BatchItem],
+    with_comment: bool = False,
+    batch_size: int = BATCH_MAX_SIZE,
+    decode_workers: int = BATCH_DECODE_WORKERS,
+    stats: Optional[BatchRunStats] = None,
+    deadline: Optional[float] = None,
+) -> Iterator[Dict]:
+    """Görüntüleri paralel ön getirme, batch'li sınıflandırma ve isteğe bağlı LLM yorumu aşamalarından geçirir.
+
+    Kayıtlar girdi sırasıyla, her batch tamamlandıkça üretilir. Önbellekte sonucu olan görüntüler ileri
+    geçişe girmez; okunamayan görüntüler `success: False` kaydıyla raporlanır ve çalışma devam eder. Tüm
+    görüntüler, çalışma başladığında etkin olan model sürümüyle sınıflandırılır. `deadline`
+    (`time.monotonic()` cinsinden) geçtiğinde kalan görüntüler işlenmeden hata kaydıyla raporlanır.
+    """
+    error = analyzer._readiness_error()
+    if error is not None:
+        raise RuntimeError(error["error"])
+    stats = stats or BatchRunStats()
+    batch_size = max(1, batch_size)
+    max_inflight = batch_size * max(1, BATCH_PREFETCH_BATCHES)
+
+    with analyzer.models.lease() as model, \
+            ThreadPoolExecutor(max_workers=max(1, decode_workers), thread_name_prefix="batch-decode") as decode_pool, \
+            ThreadPoolExecutor(max_workers=LLM_MAX_CONCURRENCY, thread_name_prefix="batch-comment") as comment_pool:
+        pending: deque = deque()
+        source = iter(items)
+        exhausted = False
+        while True:
+            # Ön getirme kuyruğu, bellek kullanımını sınırlamak için en fazla `max_inflight` görüntü tutar
+            while not exhausted and len(pending) < max_inflight:
+                item = next(source, None)
+                if item is None:
+                    exhausted = True
+                    break
+                name, load = item
+                pending.append((name, decode_pool.submit(_prefetch, analyzer, model, name, load)))
+            if not pending:
+                break
+
+            if deadline is not None and time.monotonic() >= deadline:
+                # İstemci artık beklemiyor: ön getirilenler iptal edilir, kalan görüntüler okunmadan raporlanır
+                for name, future in pending:
+                    future.cancel()
+                for name in [name for name, _ in pending] + [name for name, _ in source]:
+                    stats.processed += 1
+                    stats.errors += 1
+                    yield {"file": name, "success": False, "error": "İstek süresi doldu; görüntü işlenmedi."}
+                return
+
+            batch = [pending.popleft()[1].result() for _ in range(min(batch_size, len(pending)))]
+            to_classify = [p for p in batch if "error" not in p and p["classification"] is None]
+            if to_classify:
+                try:
+                    classified = analyzer.classify_prepared([(p["image_key"], p["pixel_values"], p["image"]) for p in to_classify], model)
+                    for prepared, classification in zip(to_classify, classified):
+                        prepared["classification"] = classification
+                except Exception as e:
+                    for prepared in to_classify:
+                        prepared["error"] = f"Sınıflandırma hatası: {e}"
+            ok = [p for p in batch if "error" not in p]
+            stats.cache_hits += sum(1 for p in ok if p["pixel_values"] is None)
+
+            if with_comment and ok:
+                # LLM çağrıları istemcinin eşzamanlılık sınırı içinde paralel yapılır
+                for prepared, summary in zip(ok, comment_pool.map(lambda p: analyzer.summarize(p["classification"]), ok)):
+                    prepared["summary"] = summary
+
+            for prepared in batch:
+                stats.processed += 1
+                if "error" in prepared:
+                    stats.errors += 1
+                    yield {"file": prepared["file"], "success": False, "error": prepared["error"]}
+                else:
+                    yield _to_record(prepared["file"], prepared["classification"], prepared.get("summary"))
+
+
+def format_ndjson(record: Dict) -> str:
+    """Kaydı tek satırlık JSON olarak biçimlendirir."""
+    return json.dumps(record, ensure_ascii=False) + "\n"
+
+
+def format_csv_header() -> str:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerow(CSV_COLUMNS)
+    return buffer.getvalue()
+
+
+def format_csv(record: Dict) -> str:
+    """Kaydı CSV satırı olarak biçimlendirir; olasılıklar İngilizce etiket sütunlarında yüzde olarak yazılır."""
+    probs = record.get("all_predictions", {}).get("en", {})
+    row = {
+        "file": record["file"],
+        "success": record["success"],
+        "top_issue": record.get("top_issue") or "",
+        "top_predictions": "; ".join(record.get("top_predictions", [])),
+        **{label: probs.get(label, 0.0) for label in CSV_LABEL_COLUMNS},
+        "dental_comment": record.get("dental_comment") or "",
+        "error": record.get("error", ""),
+    }
+    buffer = io.StringIO()
+    csv.DictWriter(buffer, fieldnames=CSV_COLUMNS).writerow(row)
+    return buffer.getvalue()
+
+
+def collect_paths(inputs: List[str]) -> List[str]:
+    """Dizin ve glob desenlerini sıralı, tekrarsız görüntü yolları listesine çevirir."""
+    paths: List[str] = []
+    for pattern in inputs:
+        if os.path.isdir(pattern):
+            for root, _, files in os.walk(pattern):
+                paths.extend(os.path.join(root, f) for f in files if f.lower().endswith(IMAGE_EXTENSIONS))
+        else:
+            paths.extend(glob.glob(pattern, recursive=True))
+    return sorted(set(paths))
+
+
+def _read_file(path: str) -> Callable[[], bytes]:
+    def load() -> bytes:
+        with open(path, "rb") as f:
+            return f.read()
+    return load
+
+
+def _load_checkpoint(path: str) -> Set[str]:
+    """Kontrol noktası dosyasındaki (satır başına bir) tamamlanmış görüntü yollarını okur."""
+    if not os.path.exists(path):
+        return set()
+    with open(path, encoding="utf-8") as f:
+        return {line.rstrip("\n") for line in f if line.strip()}
+
+
+def _completed_in_output(path: str, output_format: str) -> Set[str]:
+    """Önceki çalışmanın çıktısında başarıyla yazılmış görüntü yollarını döndürür.
+
+    Kontrol noktası yalnızca ilerleme aralıklarında yazıldığından, son aralıkta çıktıya yazılmış sonuçlar yeniden
+    işlenip ikinci kez eklenmesin diye devam ederken çıktı dosyası da okunur. Kesinti sırasında yarım kalmış son
+    satır kesilir.
+    """
+    with open(path, "rb+") as f:
+        data = f.read()
+        if data and not data.endswith(b"\n"):
+            data = data[:data.rfind(b"\n") + 1]
+            f.truncate(len(data))
+    text = data.decode("utf-8")
+    if output_format == "csv":
+        # Yorum sütunu tırnak içinde satır sonu içerebildiğinden satırlar csv modülüyle ayrılır
+        return {row["file"] for row in csv.DictReader(io.StringIO(text, newline="")) if row.get("success") == "True"}
+    done = set()
+    for line in text.splitlines():
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError:
+            continue
+        if record.get("success"):
+            done.add(record["file"])
+    return done
+
+
+def _positive_int(value: str) -> int:
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError("en az 1 olmalıdır")
+    return number
+
+
+def _commit_progress(out, checkpoint, completed: List[str]) -> None:
+    """Çıktıyı diske yazar, ardından tamamlanan görüntüleri kontrol noktasına ekler.
+
+    Sıralama sayesinde kontrol noktası çıktının önüne geçmez; kesinti olursa en fazla son aralıktaki
+    görüntüler yeniden işlenir.
+    """
+    out.flush()
+    if checkpoint is not None and completed:
+        checkpoint.write("".join(path + "\n" for path in completed))
+        checkpoint.flush()
+    completed.clear()
+
+
+def main() -> None:
+    """Komut satırından bir dizindeki veya glob desenine uyan görüntüleri toplu olarak analiz eder."""
+    parser = argparse.ArgumentParser(description="Diş görüntülerini toplu analiz eder (NDJSON/CSV çıktı, kontrol noktasından devam)")
+    parser.add_argument("inputs", nargs="+", help="Görüntü dizini veya glob deseni (ör. 'scans/**/*.jpg')")
+    parser.add_argument("--output", "-o", help="Çıktı dosyası (verilmezse standart çıktıya yazılır)")
+    parser.add_argument("--format", choices=["ndjson", "csv"], default="ndjson")
+    parser.add_argument("--with-comment", action="store_true", help="Her görüntü için LLM yorumu ve haftalık plan üret")
+    parser.add_argument("--batch-size", type=int, default=BATCH_MAX_SIZE)
+    parser.add_argument("--decode-workers", type=int, default=BATCH_DECODE_WORKERS)
+    parser.add_argument("--checkpoint", help="Tamamlanan görüntülerin kaydedileceği dosya (varsayılan: <output>.checkpoint)")
+    parser.add_argument("--progress-every", type=_positive_int, default=500, help="Kaç görüntüde bir ilerleme yazdırılacağı")
+    args = parser.parse_args()
+
+    from image_analyzer import analyzer
+
+    paths = collect_paths(args.inputs)
+    checkpoint_path = args.checkpoint or (f"{args.output}.checkpoint" if args.output else None)
+    done = _load_checkpoint(checkpoint_path) if checkpoint_path else set()
+    # Çıktı ve kontrol noktası ekleme kipinde açılır; böylece devam eden çalışma önceki sonuçları korur
+    if args.output and os.path.exists(args.output):
+        done |= _completed_in_output(args.output, args.format)
+    resuming = bool(args.output and os.path.exists(args.output) and os.path.getsize(args.output) > 0)
+    remaining = [path for path in paths if path not in done]
+    print(f"[BATCH] {len(paths)} images found, {len(paths) - len(remaining)} already done, {len(remaining)} to process", file=sys.stderr)
+
+    formatter = format_csv if args.format == "csv" else format_ndjson
+    out = open(args.output, "a", encoding="utf-8", newline="") if args.output else sys.stdout
+    checkpoint = open(checkpoint_path, "a", encoding="utf-8") if checkpoint_path else None
+    if args.format == "csv" and not resuming:
+        out.write(format_csv_header())
+
+    stats = BatchRunStats()
+    try:
+        records = run_batch(
+            analyzer, ((path, _read_file(path)) for path in remaining),
+            with_comment=args.with_comment, batch_size=args.batch_size, decode_workers=args.decode_workers, stats=stats,
+        )
+        completed: List[str] = []
+        for record in records:
+            out.write(formatter(record))
+            # Başarısız görüntüler kontrol noktasına yazılmaz; devam eden çalışmada yeniden denenirler
+            if record["success"]:
+                completed.append(record["file"])
+            if stats.processed % args.progress_every == 0:
+                _commit_progress(out, checkpoint, completed)
+                print(f"[BATCH] {stats.as_dict()}", file=sys.stderr)
+        _commit_progress(out, checkpoint, completed)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+        if checkpoint is not None:
+            checkpoint.close()
+        print(f"[BATCH] done: {stats.as_dict()}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
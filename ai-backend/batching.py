@@ -0,0 +1,204 @@
+# Gerekli kütüphanelerin import edilmesi
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from admission import ADMISSION_REJECTED, CLASSIFY_WORKERS, DeadlineExceeded
+from metrics import BATCH_SIZE, BATCH_WAIT_SECONDS
+
+# Mikro-batch penceresinin varsayılan ayarları (ortam değişkenleri ile değiştirilebilir).
+# Kuyruğu yalnızca sınıflandırma iş parçacıkları beslediğinden varsayılan batch boyutu onların sayısıdır; daha büyük
+# bir değerde batch hiç dolmaz ve her istek pencerenin tamamını bekler.
+BATCH_MAX_SIZE = int(os.getenv("BATCH_MAX_SIZE", str(CLASSIFY_WORKERS)))
+BATCH_MAX_WAIT_MS = float(os.getenv("BATCH_MAX_WAIT_MS", "10"))
+
+# İstatistikler için saklanan en fazla bekleme süresi örneği
+WAIT_SAMPLE_SIZE = 2048
+
+
+class _PendingItem:
+    """Kuyrukta bekleyen tek bir isteği, son anını (`time.monotonic()`) ve sonucunu taşıyacak future nesnesini tutar."""
+
+    __slots__ = ("item", "future", "enqueued_at", "deadline")
+
+    def __init__(self, item: Any, deadline: Optional[float] = None):
+        self.item = item
+        self.future: Future = Future()
+        self.enqueued_at = time.monotonic()
+        self.deadline = deadline
+
+
+def _percentile(sorted_values: Sequence[float], pct: float) -> float:
+    """Sıralı bir listeden verilen yüzdelik değerini döndürür."""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(pct / 100.0 * (len(sorted_values) - 1)))))
+    return sorted_values[index]
+
+
+class MicroBatcher:
+    """Bekleyen girdileri kısa bir pencere boyunca toplayıp tek bir toplu çağrıda işleyen zamanlayıcı.
+
+    `batch_fn` girdi listesini alır ve aynı sırada, aynı uzunlukta bir sonuç listesi döndürür.
+    Tüm toplu çağrılar tek bir arka plan iş parçacığında çalışır; böylece torch'un iş parçacığı
+    havuzu birden fazla istek tarafından aynı anda paylaşılmaz.
+    """
+
+    def __init__(
+        self,
+        batch_fn: Callable[[List[Any]], List[Any]],
+        max_batch_size: int = BATCH_MAX_SIZE,
+        max_wait_ms: float = BATCH_MAX_WAIT_MS,
+        name: str = "batcher",
+    ):
+        self.batch_fn = batch_fn
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait_ms = max(0.0, max_wait_ms)
+        self.name = name
+
+        self._queue: deque = deque()
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+
+        # Gecikme / verim ayarı için toplanan istatistikler
+        self._stats_lock = threading.Lock()
+        self._batch_size_hist: Dict[int, int] = {}
+        self._wait_ms_samples: deque = deque(maxlen=WAIT_SAMPLE_SIZE)
+        self._total_requests = 0
+        self._total_batches = 0
+        self._total_errors = 0
+        self._total_expired = 0
+
+    def submit(self, item: Any, deadline: Optional[float] = None) -> Future:
+        """Girdiyi kuyruğa ekler ve sonucu taşıyacak future nesnesini döndürür.
+
+        `deadline` geçtiğinde hâlâ kuyrukta olan girdi ileri geçişe alınmaz; future `DeadlineExceeded` ile tamamlanır.
+        """
+        pending = _PendingItem(item, deadline)
+        with self._cond:
+            if self._closed:
+                raise RuntimeError(f"{self.name} kapatıldı; yeni istek kabul edilmiyor.")
+            self._ensure_worker()
+            self._queue.append(pending)
+            self._cond.notify()
+        return pending.future
+
+    def run(self, item: Any, timeout: Optional[float] = None, deadline: Optional[float] = None) -> Any:
+        """Girdiyi kuyruğa ekler ve toplu çağrının bu girdiye ait sonucunu bekler."""
+        return self.submit(item, deadline).result(timeout=timeout)
+
+    def close(self) -> None:
+        """Yeni istekleri reddeder; kuyruktaki istekler işlendikten sonra arka plan iş parçacığı durur."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+
+    def queue_depth(self) -> int:
+        """Henüz bir batch'e alınmamış istek sayısını döndürür."""
+        with self._cond:
+            return len(self._queue)
+
+    def stats(self) -> Dict:
+        """Kuyruk derinliği, batch boyutu histogramı ve istek başına bekleme süresi istatistiklerini döndürür."""
+        with self._stats_lock:
+            waits = sorted(self._wait_ms_samples)
+            hist = dict(sorted(self._batch_size_hist.items()))
+            total_requests = self._total_requests
+            total_batches = self._total_batches
+            total_errors = self._total_errors
+            total_expired = self._total_expired
+        return {
+            "name": self.name,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait_ms,
+            "queue_depth": self.queue_depth(),
+            "total_requests": total_requests,
+            "total_batches": total_batches,
+            "total_errors": total_errors,
+            "total_expired": total_expired,
+            "mean_batch_size": round(total_requests / total_batches, 3) if total_batches else 0.0,
+            "batch_size_histogram": hist,
+            "wait_ms": {
+                "samples": len(waits),
+                "mean": round(sum(waits) / len(waits), 3) if waits else 0.0,
+                "p50": round(_percentile(waits, 50), 3),
+                "p90": round(_percentile(waits, 90), 3),
+                "p99": round(_percentile(waits, 99), 3),
+                "max": round(waits[-1], 3) if waits else 0.0,
+            },
+        }
+
+    def _ensure_worker(self) -> None:
+        """Arka plan iş parçacığını ilk istekte başlatır (kilit altında çağrılmalıdır)."""
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._loop, name=f"{self.name}-worker", daemon=True)
+            self._thread.start()
+
+    def _next_batch(self) -> List[_PendingItem]:
+        """Pencere dolana veya batch boyutu sınırına ulaşılana kadar bekleyip bir batch döndürür."""
+        with self._cond:
+            while not self._queue and not self._closed:
+                self._cond.wait()
+            if not self._queue:
+                return []
+            # Pencere, kuyruktaki en eski isteğin geliş zamanından itibaren sayılır
+            deadline = self._queue[0].enqueued_at + self.max_wait_ms / 1000.0
+            while len(self._queue) < self.max_batch_size and not self._closed:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            size = min(len(self._queue), self.max_batch_size)
+            return [self._queue.popleft() for _ in range(size)]
+
+    def _loop(self) -> None:
+        """Kuyruktan batch'ler alıp `batch_fn` ile işleyen ve sonuçları future'lara dağıtan döngü."""
+        while True:
+            batch = self._next_batch()
+            if not batch:
+                return
+
+            started_at = time.monotonic()
+            # Süresi kuyrukta dolan istekler için ileri geçiş yapılmaz; istemci yanıtı artık beklemiyor
+            expired = [p for p in batch if p.deadline is not None and p.deadline <= started_at]
+            if expired:
+                batch = [p for p in batch if p.deadline is None or p.deadline > started_at]
+                with self._stats_lock:
+                    self._total_expired += len(expired)
+                ADMISSION_REJECTED.inc(len(expired), pool=self.name, reason="deadline")
+                for pending in expired:
+                    pending.future.set_exception(DeadlineExceeded("İstek süresi mikro-batch kuyruğunda doldu."))
+                if not batch:
+                    continue
+
+            with self._stats_lock:
+                self._total_batches += 1
+                self._total_requests += len(batch)
+                self._batch_size_hist[len(batch)] = self._batch_size_hist.get(len(batch), 0) + 1
+                for pending in batch:
+                    self._wait_ms_samples.append((started_at - pending.enqueued_at) * 1000.0)
+            BATCH_SIZE.observe(len(batch), batcher=self.name)
+            for pending in batch:
+                BATCH_WAIT_SECONDS.observe(started_at - pending.enqueued_at, batcher=self.name)
+
+            try:
+                results = self.batch_fn([pending.item for pending in batch])
+                if len(results) != len(batch):
+                    raise RuntimeError(
+                        f"{self.name}: batch_fn {len(batch)} girdi için {len(results)} sonuç döndürdü."
+                    )
+            except Exception as e:
+                with self._stats_lock:
+                    self._total_errors += 1
+                for pending in batch:
+                    pending.future.set_exception(e)
+                continue
+
+            for pending, result in zip(batch, results):
+                pending.future.set_result(result)
@@ -0,0 +1,367 @@
+# ai-backend için tekrarlanabilir ölçüm aracı: analiz aşamalarının süreleri ve HTTP yük testi.
+# Kullanım:
+#   python benchmark.py stages --batch-sizes 1,4,8,16 --threads 1,2,4 --output bench_stages.json
+#   python benchmark.py http --scenarios analyze,chat --concurrency 1,8,32 --llm-latency-ms 800 --output bench_http.json
+# Sonuçlar JSON olarak yazılır; iki sürümün çıktıları karşılaştırılarak gerilemeler tespit edilebilir.
+import argparse
+import asyncio
+import base64
+import glob
+import io
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import time
+from typing import Callable, Dict, List, Optional
+
+from batching import _percentile
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Sabit tohumlu sentetik görüntü kümesinin varsayılan boyutu ve çözünürlüğü (telefon kamerası fotoğrafına yakın)
+CORPUS_SEED = 1234
+CORPUS_SIZE = 32
+CORPUS_RESOLUTION = (1280, 960)
+
+
+def build_corpus(pattern: Optional[str] = None, count: int = CORPUS_SIZE, resolution=CORPUS_RESOLUTION) -> List[bytes]:
+    """Ölçümlerde kullanılacak JPEG görüntü kümesini döndürür.
+
+    `pattern` verilirse eşleşen dosyalar (sıralı) kullanılır; verilmezse sabit tohumla üretilen, her çalıştırmada
+    bayt bayt aynı olan sentetik ağız içi benzeri görüntüler oluşturulur.
+    """
+    if pattern:
+        paths = sorted(glob.glob(pattern))[:count]
+        if not paths:
+            raise SystemExit(f"Görüntü bulunamadı: {pattern}")
+        corpus = []
+        for path in paths:
+            with open(path, "rb") as f:
+                corpus.append(f.read())
+        return corpus
+
+    import numpy as np
+    from PIL import Image
+    rng = np.random.default_rng(CORPUS_SEED)
+    width, height = resolution
+    yy, xx = np.mgrid[0:height, 0:width].astype(np.float32)
+    corpus = []
+    for _ in range(count):
+        # Yumuşak renk geçişleri ve gürültü; gerçek fotoğraflara benzer JPEG boyutu ve çözümleme maliyeti için
+        base = rng.uniform(60, 200, size=3)
+        slope = rng.uniform(-0.05, 0.05, size=(3, 2))
+        channels = [base[c] + slope[c, 0] * xx + slope[c, 1] * yy for c in range(3)]
+        pixels = np.stack(channels, axis=-1) + rng.normal(0, 12, size=(height, width, 3))
+        buffer = io.BytesIO()
+        Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8)).save(buffer, format="JPEG", quality=90)
+        corpus.append(buffer.getvalue())
+    return corpus
+
+
+def latency_summary(samples_ms: List[float]) -> Dict:
+    """Gecikme örneklerinin ortalama ve yüzdelik değerlerini (ms) döndürür."""
+    ordered = sorted(samples_ms)
+    return {
+        "count": len(ordered),
+        "mean_ms": round(sum(ordered) / len(ordered), 3) if ordered else 0.0,
+        "p50_ms": round(_percentile(ordered, 50), 3),
+        "p90_ms": round(_percentile(ordered, 90), 3),
+        "p99_ms": round(_percentile(ordered, 99), 3),
+        "max_ms": round(ordered[-1], 3) if ordered else 0.0,
+    }
+
+
+def environment_info() -> Dict:
+    """Sonuçların karşılaştırılabilmesi için sürüm, donanım ve yapılandırma bilgileri."""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, capture_output=True, text=True, timeout=5
+        ).stdout.strip() or None
+    except Exception:
+        commit = None
+    config_keys = [
+        "INFERENCE_MODE", "INFERENCE_WORKERS", "INFERENCE_THREADS_PER_WORKER", "CLASSIFIER_BACKEND",
+        "BATCH_MAX_SIZE", "BATCH_MAX_WAIT_MS", "EXECUTOR_WORKERS", "LLM_MAX_CONCURRENCY",
+        "CLASSIFY_WORKERS", "CLASSIFY_QUEUE_MAX", "CHAT_QUEUE_MAX", "LLM_MAX_QUEUE", "PER_USER_MAX_CONCURRENCY",
+        "FAST_PREPROCESS", "TTA_ENABLED", "TTA_CONFIDENCE_THRESHOLD", "TTA_VIEWS",
+        "CLASSIFIER_MODEL_NAME", "CLASSIFIER_VERSION", "CLASSIFIER_MODELS", "SHADOW_MODEL_VERSION", "SHADOW_SAMPLE_RATE",
+    ]
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "git_commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "config": {key: os.getenv(key) for key in config_keys if os.getenv(key) is not None},
+    }
+
+
+def _timed(fn: Callable, samples: List[float]):
+    start = time.perf_counter()
+    result = fn()
+    samples.append((time.perf_counter() - start) * 1000.0)
+    return result
+
+
+def bench_stages(corpus: List[bytes], batch_sizes: List[int], thread_counts: List[int], iterations: int) -> List[Dict]:
+    """`DentalImageAnalyzer` aşamalarını (base64 çözme, PIL çözme, ön işleme, ileri geçiş, son işleme) ayrı ayrı ölçer."""
+    import torch
+    from image_analyzer import analyzer, summarize_probabilities
+
+    if not analyzer.is_ready:
+        analyzer.load(warmup=False)
+    if not analyzer.is_ready:
+        raise SystemExit(f"Model yüklenemedi: {analyzer.load_error}")
+    corpus_b64 = [base64.b64encode(image).decode("ascii") for image in corpus]
+    model = analyzer.models.active
+
+    results = []
+    for threads in thread_counts:
+        torch.set_num_threads(threads)
+        for batch_size in batch_sizes:
+            stages = {name: [] for name in ("b64_decode", "pil_decode", "preprocess", "forward", "postprocess")}
+            # İlk batch ısıtma amaçlıdır ve ölçüme dahil edilmez
+            for iteration in range(iterations + 1):
+                offset = (iteration * batch_size) % len(corpus_b64)
+                batch_b64 = [corpus_b64[(offset + i) % len(corpus_b64)] for i in range(batch_size)]
+                samples = stages if iteration else {name: [] for name in stages}
+
+                raw = _timed(lambda: [base64.b64decode(item) for item in batch_b64], samples["b64_decode"])
+                images = _timed(lambda: [analyzer._decode_image(item, model) for item in raw], samples["pil_decode"])
+                pixel_values = _timed(
+                    lambda: model.preprocess(images), samples["preprocess"]
+                )
+                probs = _timed(lambda: model.classify_batch([pixel_values]), samples["forward"])
+                _timed(lambda: summarize_probabilities(probs), samples["postprocess"])
+
+            stage_report = {}
+            for name, values in stages.items():
+                summary = latency_summary(values)
+                summary["per_image_ms"] = round(summary["mean_ms"] / batch_size, 3)
+                stage_report[name] = summary
+            total_per_image = sum(stage["per_image_ms"] for stage in stage_report.values())
+            results.append({
+                "threads": threads,
+                "batch_size": batch_size,
+                "iterations": iterations,
+                "stages": stage_report,
+                "forward_images_per_sec": round(1000.0 * batch_size / stage_report["forward"]["mean_ms"], 2)
+                if stage_report["forward"]["mean_ms"] else 0.0,
+                "pipeline_images_per_sec": round(1000.0 / total_per_image, 2) if total_per_image else 0.0,
+            })
+            print(f"[BENCH] stages threads={threads} batch={batch_size}: "
+                  f"{results[-1]['pipeline_images_per_sec']} img/s (forward {results[-1]['forward_images_per_sec']} img/s)",
+                  file=sys.stderr)
+    return results
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _wait_for(url: str, timeout_s: float, process: Optional[subprocess.Popen] = None) -> None:
+    """Adres 200 döndürene kadar bekler; süreç erken sonlanırsa veya süre dolarsa hata verir."""
+    import httpx
+    deadline = time.monotonic() + timeout_s
+    while time.monotonic() < deadline:
+        if process is not None and process.poll() is not None:
+            raise SystemExit(f"Süreç beklenmedik şekilde sonlandı ({url}), çıkış kodu {process.returncode}")
+        try:
+            response = httpx.get(url, timeout=2)
+            if response.status_code == 200:
+                return
+            # Model yüklenemediyse zaman aşımını beklemeden çıkılır
+            detail = response.json().get("detail") if response.headers.get("content-type", "").startswith("application/json") else None
+            if isinstance(detail, dict) and detail.get("state") == "failed":
+                raise SystemExit(f"Sunucu hazır olamadı: {detail.get('error')}")
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.5)
+    raise SystemExit(f"{url} {timeout_s:.0f} saniye içinde hazır olmadı.")
+
+
+def _request_factory(scenario: str, corpus: List[bytes]) -> Callable:
+    """Senaryoya göre i. isteği gönderen asenkron fonksiyonu döndürür."""
+    corpus_b64 = [base64.b64encode(image).decode("ascii") for image in corpus]
+
+    async def analyze(client, i):
+        return await client.post("/analyze", data={"user_id": f"bench-{i % 64}", "image_b64": corpus_b64[i % len(corpus_b64)]})
+
+    async def analyze_stream(client, i):
+        return await client.post("/analyze", data={
+            "user_id": f"bench-{i % 64}", "image_b64": corpus_b64[i % len(corpus_b64)], "stream_comment": "true",
+        })
+
+    async def upload(client, i):
+        return await client.post(
+            "/analyze/upload", params={"user_id": f"bench-{i % 64}"}, content=corpus[i % len(corpus)],
+            headers={"Content-Type": "image/jpeg"},
+        )
+
+    async def chat(client, i):
+        return await client.post("/chat", data={"message": f"Dişim ağrıyor, ne yapmalıyım? ({i})", "session_id": f"bench-{i % 64}"})
+
+    scenarios = {"analyze": analyze, "analyze_stream": analyze_stream, "upload": upload, "chat": chat}
+    if scenario not in scenarios:
+        raise SystemExit(f"Bilinmeyen senaryo: {scenario} ({', '.join(scenarios)})")
+    return scenarios[scenario]
+
+
+async def _drive(base_url: str, send: Callable, requests: int, concurrency: int, warmup: int) -> Dict:
+    """Sabit eşzamanlılıkla `requests` istek gönderir; verim, gecikme yüzdelikleri ve durum kodlarını döndürür."""
+    import httpx
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=300, limits=limits) as client:
+        await asyncio.gather(*(send(client, i) for i in range(warmup)), return_exceptions=True)
+
+        latencies: List[float] = []
+        status_counts: Dict[str, int] = {}
+        indices = iter(range(requests))
+
+        async def worker():
+            for i in indices:
+                start = time.perf_counter()
+                try:
+                    response = await send(client, i)
+                    status = str(response.status_code)
+                except httpx.HTTPError as e:
+                    status = type(e).__name__
+                latencies.append((time.perf_counter() - start) * 1000.0)
+                status_counts[status] = status_counts.get(status, 0) + 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    ok = status_counts.get("200", 0)
+    return {
+        "requests": requests,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(requests / elapsed, 2) if elapsed else 0.0,
+        "success_rps": round(ok / elapsed, 2) if elapsed else 0.0,
+        "latency": latency_summary(latencies),
+        "status_counts": status_counts,
+    }
+
+
+def bench_http(args, corpus: List[bytes]) -> Dict:
+    """Stub LLM ile başlatılan (veya `--url` ile verilen) sunucuya eşzamanlı yük uygular."""
+    import httpx
+    processes: List[subprocess.Popen] = []
+    base_url = args.url
+    server_env = None
+    try:
+        if base_url is None:
+            stub_port, app_port = _free_port(), _free_port()
+            processes.append(subprocess.Popen(
+                [sys.executable, "llm_stub_server.py", "--port", str(stub_port), "--latency-ms", str(args.llm_latency_ms)],
+                cwd=BACKEND_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+            ))
+            _wait_for(f"http://127.0.0.1:{stub_port}/stats", 30, processes[-1])
+
+            server_env = dict(os.environ, LLM_STUB_URL=f"http://127.0.0.1:{stub_port}")
+            if not args.with_cache:
+                # Önbellek kapalıyken sabit görüntü kümesi her istekte gerçekten sınıflandırılır ve LLM'e gider
+                server_env.update(RESULT_CACHE_MAX_ENTRIES="1", LLM_CACHE_MAX_ENTRIES="1")
+            processes.append(subprocess.Popen(
+                [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(app_port), "--log-level", "warning"],
+                cwd=BACKEND_DIR, env=server_env, stdout=subprocess.DEVNULL if args.quiet_server else None,
+            ))
+            base_url = f"http://127.0.0.1:{app_port}"
+        _wait_for(f"{base_url}/ready", args.ready_timeout, processes[-1] if processes else None)
+
+        runs = []
+        for scenario in args.scenarios:
+            send = _request_factory(scenario, corpus)
+            for concurrency in args.concurrency:
+                result = asyncio.run(_drive(base_url, send, args.requests, concurrency, args.warmup))
+                runs.append({"scenario": scenario, "concurrency": concurrency, **result})
+                print(f"[BENCH] http {scenario} c={concurrency}: {result['throughput_rps']} req/s, "
+                      f"p50 {result['latency']['p50_ms']} ms, p99 {result['latency']['p99_ms']} ms, {result['status_counts']}",
+                      file=sys.stderr)
+
+        server_stats = {}
+        for path in ("/analyze/stats", "/analyze/cache/stats", "/llm/stats"):
+            try:
+                response = httpx.get(f"{base_url}{path}", timeout=5)
+                if response.status_code == 200:
+                    server_stats[path] = response.json()
+            except httpx.HTTPError:
+                pass
+        return {
+            "base_url": base_url if args.url else None,
+            "llm_latency_ms": None if args.url else args.llm_latency_ms,
+            "cache_enabled": None if args.url else args.with_cache,
+            "runs": runs,
+            "server_stats": server_stats,
+        }
+    finally:
+        for process in reversed(processes):
+            process.terminate()
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+
+def _int_list(value: str) -> List[int]:
+    return [int(part) for part in value.split(",") if part.strip()]
+
+
+def main() -> None:
+    """Seçilen ölçümü çalıştırır ve sonucu JSON olarak yazar."""
+    parser = argparse.ArgumentParser(description="ai-backend ölçüm aracı")
+    parser.add_argument("--images", help="Sentetik küme yerine kullanılacak görüntülerin glob deseni")
+    parser.add_argument("--corpus-size", type=int, default=CORPUS_SIZE)
+    parser.add_argument("--output", "-o", help="JSON sonucun yazılacağı dosya (verilmezse standart çıktı)")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    stages = subparsers.add_parser("stages", help="Analiz aşamalarını batch boyutu ve iş parçacığı sayısına göre ölçer")
+    stages.add_argument("--batch-sizes", type=_int_list, default=[1, 4, 8, 16])
+    stages.add_argument("--threads", type=_int_list, default=[1, 2, 4])
+    stages.add_argument("--iterations", type=int, default=10)
+
+    http = subparsers.add_parser("http", help="Uçtan uca HTTP verimi ve gecikme yüzdelikleri")
+    http.add_argument("--scenarios", type=lambda v: [s for s in v.split(",") if s], default=["analyze", "chat"],
+                      help="analyze, analyze_stream, upload, chat")
+    http.add_argument("--concurrency", type=_int_list, default=[1, 8, 32])
+    http.add_argument("--requests", type=int, default=200, help="Her senaryo/eşzamanlılık için ölçülen istek sayısı")
+    http.add_argument("--warmup", type=int, default=8, help="Ölçüme dahil edilmeyen ısıtma isteği sayısı")
+    http.add_argument("--llm-latency-ms", type=float, default=800)
+    http.add_argument("--with-cache", action="store_true", help="Sonuç ve LLM önbelleklerini açık bırak")
+    http.add_argument("--url", help="Sunucu başlatmak yerine çalışan bir sunucuyu ölç (ör. http://127.0.0.1:8000)")
+    http.add_argument("--ready-timeout", type=float, default=600)
+    http.add_argument("--quiet-server", action="store_true", help="Başlatılan sunucunun loglarını gizle")
+    args = parser.parse_args()
+
+    corpus = build_corpus(args.images, args.corpus_size)
+    report = {
+        "benchmark": args.command,
+        "environment": environment_info(),
+        "corpus": {
+            "source": args.images or f"synthetic(seed={CORPUS_SEED}, {CORPUS_RESOLUTION[0]}x{CORPUS_RESOLUTION[1]})",
+            "images": len(corpus),
+            "mean_bytes": sum(map(len, corpus)) // len(corpus),
+        },
+    }
+    if args.command == "stages":
+        report["results"] = bench_stages(corpus, args.batch_sizes, args.threads, args.iterations)
+    else:
+        report["results"] = bench_http(args, corpus)
+
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+        print(f"[BENCH] results written to {args.output}", file=sys.stderr)
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
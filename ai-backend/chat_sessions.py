@@ -0,0 +1,129 @@
+# Gerekli kütüphanelerin import edilmesi
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+# Bir oturumda özetlenmeden aynen gönderilecek en fazla tur (kullanıcı + asistan mesaj çifti) sayısı
+CHAT_MAX_TURNS = int(os.getenv("CHAT_MAX_TURNS", "8"))
+# Geçmiş (özet + turlar) için yaklaşık token bütçesi; aşılırsa en eski turlar özete katlanır
+CHAT_HISTORY_TOKEN_BUDGET = int(os.getenv("CHAT_HISTORY_TOKEN_BUDGET", "1500"))
+# Bu süre boyunca mesaj gelmeyen oturumlar silinir; aynı anda tutulabilecek en fazla oturum sayısı
+CHAT_SESSION_IDLE_SECONDS = float(os.getenv("CHAT_SESSION_IDLE_SECONDS", "1800"))
+CHAT_MAX_SESSIONS = int(os.getenv("CHAT_MAX_SESSIONS", "5000"))
+
+
+def estimate_tokens(text: str) -> int:
+    """Model tokenizer'ı çağırmadan yaklaşık token sayısı (ortalama 4 karakter = 1 token)."""
+    return len(text) // 4 + 1
+
+
+class ChatSession:
+    """Bir sohbet oturumunun özetini ve özetlenmemiş son turlarını tutar."""
+
+    def __init__(self, session_id: str):
+        self.session_id = session_id
+        self.summary: Optional[str] = None
+        self.turns: List[Dict] = []  # [{"user": ..., "model": ...}]
+        self.last_used = time.time()
+        self.lock = threading.Lock()
+
+    def history(self) -> List[Dict]:
+        """Modele gönderilecek geçmişi {"role", "text"} mesajları olarak döndürür."""
+        messages: List[Dict] = []
+        if self.summary:
+            messages.append({"role": "user", "text": f"Önceki konuşmamızın özeti: {self.summary}"})
+            messages.append({"role": "model", "text": "Tamam, bunu dikkate alarak devam ediyorum."})
+        for turn in self.turns:
+            messages.append({"role": "user", "text": turn["user"]})
+            messages.append({"role": "model", "text": turn["model"]})
+        return messages
+
+    def history_tokens(self) -> int:
+        """Geçmişin yaklaşık token sayısı."""
+        return sum(estimate_tokens(message["text"]) for message in self.history())
+
+    def needs_compaction(self, max_turns: int, token_budget: int) -> bool:
+        return len(self.turns) > max_turns or (len(self.turns) > 1 and self.history_tokens() > token_budget)
+
+    def oldest_turns(self, max_turns: int) -> List[Dict]:
+        """Özete katlanacak turlar: tur sınırını aşan kısım ve en az pencerenin yarısı (özetleme seyrek yapılsın diye)."""
+        keep = max(1, min(len(self.turns) - 1, max_turns // 2))
+        return self.turns[:len(self.turns) - keep]
+
+
+class ChatSessionStore:
+    """Oturum kimliğine göre sohbet durumunu tutan, pasif oturumları silen, iş parçacığı güvenli bellek içi depo."""
+
+    def __init__(
+        self,
+        max_turns: int = CHAT_MAX_TURNS,
+        token_budget: int = CHAT_HISTORY_TOKEN_BUDGET,
+        idle_seconds: float = CHAT_SESSION_IDLE_SECONDS,
+        max_sessions: int = CHAT_MAX_SESSIONS,
+    ):
+        self.max_turns = max(1, max_turns)
+        self.token_budget = max(1, token_budget)
+        self.idle_seconds = idle_seconds
+        self.max_sessions = max(1, max_sessions)
+        self._sessions: "OrderedDict[str, ChatSession]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        # Oturum ve istem boyutu sayaçları
+        self.evicted_sessions = 0
+        self.compactions = 0
+        self.requests = 0
+        self.prompt_tokens = 0
+
+    def get(self, session_id: str) -> ChatSession:
+        """Oturumu döndürür; yoksa yeni bir oturum oluşturur."""
+        now = time.time()
+        with self._lock:
+            self._evict_idle(now)
+            session = self._sessions.get(session_id)
+            if session is None:
+                # Sınır doluysa en uzun süredir kullanılmayan oturum yeni oturuma yer açmak için silinir
+                while len(self._sessions) >= self.max_sessions:
+                    self._sessions.popitem(last=False)
+                    self.evicted_sessions += 1
+                session = self._sessions[session_id] = ChatSession(session_id)
+            else:
+                self._sessions.move_to_end(session_id)
+            session.last_used = now
+            return session
+
+    def record_request(self, history: List[Dict], message: str) -> None:
+        """Modele gönderilen geçmiş ve mesajın yaklaşık token sayısını istatistiklere ekler."""
+        tokens = estimate_tokens(message) + sum(estimate_tokens(m["text"]) for m in history)
+        with self._lock:
+            self.requests += 1
+            self.prompt_tokens += tokens
+
+    def record_compaction(self) -> None:
+        with self._lock:
+            self.compactions += 1
+
+    def stats(self) -> Dict:
+        """Oturum sayısı, özetleme ve istek başına ortalama istem boyutunu döndürür."""
+        with self._lock:
+            return {
+                "sessions": len(self._sessions),
+                "max_sessions": self.max_sessions,
+                "max_turns": self.max_turns,
+                "token_budget": self.token_budget,
+                "idle_seconds": self.idle_seconds,
+                "evicted_sessions": self.evicted_sessions,
+                "compactions": self.compactions,
+                "requests": self.requests,
+                "avg_prompt_tokens": round(self.prompt_tokens / self.requests, 1) if self.requests else 0.0,
+            }
+
+    def _evict_idle(self, now: float) -> None:
+        """Süresi dolan pasif oturumları siler (kilit altında çağrılmalıdır)."""
+        while self._sessions:
+            oldest = next(iter(self._sessions.values()))
+            if now - oldest.last_used <= self.idle_seconds:
+                break
+            del self._sessions[oldest.session_id]
+            self.evicted_sessions += 1
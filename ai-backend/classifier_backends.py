@@ -0,0 +1,205 @@
+# Gerekli kütüphanelerin import edilmesi
+import argparse
+import glob
+import json
+import os
+import random
+from typing import Dict, List, Optional, Sequence
+
+# Sınıflandırıcının hangi çıkarım arka ucuyla çalışacağı: "torch" (fp32), "int8" (dinamik nicemleme) veya "onnx"
+CLASSIFIER_BACKEND = os.getenv("CLASSIFIER_BACKEND", "torch")
+# ONNX arka ucu için dışa aktarılan modelin yolu; dosya yoksa ilk yüklemede oluşturulur
+ONNX_MODEL_PATH = os.getenv("ONNX_MODEL_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "models", "classifier.onnx"))
+# ONNX Runtime oturumunun kullanacağı iş parçacığı sayısı (0: ONNX Runtime varsayılanı)
+ONNX_INTRA_OP_THREADS = int(os.getenv("ONNX_INTRA_OP_THREADS", "0"))
+
+
+class ClassifierBackend:
+    """Önceden işlenmiş piksel tensörlerinden softmax olasılık satırları üreten çıkarım arka ucu arayüzü."""
+
+    name = "base"
+
+    def predict(self, pixel_values) -> "np.ndarray":
+        """(N, 3, H, W) boyutlu piksel tensörü için (N, sınıf sayısı) boyutlu olasılık matrisi döndürür."""
+        raise NotImplementedError
+
+
+class TorchBackend(ClassifierBackend):
+    """Eager PyTorch ile float32 çıkarım yapan referans arka uç."""
+
+    name = "torch"
+
+    def __init__(self, model):
+        self.model = model
+        self.model.eval()
+
+    def predict(self, pixel_values) -> "np.ndarray":
+        import torch
+        with torch.no_grad():
+            logits = self.model(pixel_values=pixel_values).logits
+            probs = torch.nn.functional.softmax(logits, dim=1)
+        # Son işleme NumPy ile toplu yapıldığından satırlar Python listelerine çevrilmez
+        return probs.numpy()
+
+
+class QuantizedTorchBackend(TorchBackend):
+    """Linear katmanları int8'e dinamik olarak nicemlenmiş PyTorch arka ucu."""
+
+    name = "int8"
+
+    def __init__(self, model):
+        import copy
+        import torch
+        # Referans fp32 model değişmesin diye nicemleme bir kopya üzerinde yapılır
+        quantized = torch.ao.quantization.quantize_dynamic(
+            copy.deepcopy(model).eval(), {torch.nn.Linear}, dtype=torch.qint8
+        )
+        super().__init__(quantized)
+
+
+class OnnxBackend(ClassifierBackend):
+    """Dışa aktarılmış ONNX modelini ONNX Runtime CPU sağlayıcısıyla çalıştıran arka uç."""
+
+    name = "onnx"
+
+    def __init__(self, model, onnx_path: str = ONNX_MODEL_PATH, image_size: int = 224):
+        try:
+            import onnxruntime as ort
+        except ImportError as e:
+            raise RuntimeError("ONNX arka ucu için 'pip install onnxruntime onnx' gereklidir.") from e
+
+        if not os.path.exists(onnx_path):
+            export_onnx(model, onnx_path, image_size)
+
+        self.onnx_path = onnx_path
+        self._ort = ort
+        self._session = None
+        self._session_pid = None
+        self._ensure_session()
+
+    def _ensure_session(self):
+        """Oturumu süreç başına bir kez oluşturur; işçi süreçler ebeveynin oturumunu kullanmaz."""
+        if self._session is None or self._session_pid != os.getpid():
+            options = self._ort.SessionOptions()
+            options.graph_optimization_level = self._ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+            if ONNX_INTRA_OP_THREADS > 0:
+                options.intra_op_num_threads = ONNX_INTRA_OP_THREADS
+            self._session = self._ort.InferenceSession(self.onnx_path, sess_options=options, providers=["CPUExecutionProvider"])
+            self._session_pid = os.getpid()
+            self.input_name = self._session.get_inputs()[0].name
+        return self._session
+
+    def predict(self, pixel_values) -> "np.ndarray":
+        import numpy as np
+        session = self._ensure_session()
+        inputs = pixel_values.numpy() if hasattr(pixel_values, "numpy") else np.asarray(pixel_values)
+        logits = session.run(None, {self.input_name: inputs.astype(np.float32, copy=False)})[0]
+        # Sayısal kararlılık için satır başına en büyük logit çıkarılarak softmax hesaplanır
+        exp = np.exp(logits - logits.max(axis=1, keepdims=True))
+        return exp / exp.sum(axis=1, keepdims=True)
+
+
+def export_onnx(model, onnx_path: str, image_size: int = 224) -> None:
+    """SigLIP sınıflandırıcısını dinamik batch boyutlu, yalnızca logit döndüren bir ONNX grafiğine dışa aktarır."""
+    import torch
+
+    class _LogitsOnly(torch.nn.Module):
+        def __init__(self, inner):
+            super().__init__()
+            self.inner = inner
+
+        def forward(self, pixel_values):
+            return self.inner(pixel_values=pixel_values).logits
+
+    os.makedirs(os.path.dirname(onnx_path) or ".", exist_ok=True)
+    dummy = torch.zeros(1, 3, image_size, image_size)
+    with torch.no_grad():
+        torch.onnx.export(
+            _LogitsOnly(model).eval(),
+            (dummy,),
+            onnx_path,
+            input_names=["pixel_values"],
+            output_names=["logits"],
+            dynamic_axes={"pixel_values": {0: "batch"}, "logits": {0: "batch"}},
+            opset_version=17,
+        )
+    print(f"ONNX model exported: {onnx_path}")
+
+
+def create_backend(name: str, model, image_size: int = 224, onnx_path: str = ONNX_MODEL_PATH) -> ClassifierBackend:
+    """Adı verilen çıkarım arka ucunu fp32 referans modelden oluşturur."""
+    if name == "torch":
+        return TorchBackend(model)
+    if name == "int8":
+        return QuantizedTorchBackend(model)
+    if name == "onnx":
+        return OnnxBackend(model, onnx_path=onnx_path, image_size=image_size)
+    raise ValueError(f"Bilinmeyen sınıflandırıcı arka ucu: {name} (torch, int8, onnx)")
+
+
+def check_parity(reference: ClassifierBackend, candidate: ClassifierBackend, pixel_batches: Sequence) -> Dict:
+    """Aday arka ucun fp32 referansa göre top-1 uyumunu ve olasılık farklarını raporlar."""
+    samples = 0
+    top1_agree = 0
+    max_delta = 0.0
+    delta_sum = 0.0
+    for pixel_values in pixel_batches:
+        ref_rows = reference.predict(pixel_values)
+        cand_rows = candidate.predict(pixel_values)
+        for ref, cand in zip(ref_rows, cand_rows):
+            samples += 1
+            if max(range(len(ref)), key=ref.__getitem__) == max(range(len(cand)), key=cand.__getitem__):
+                top1_agree += 1
+            row_max = float(max(abs(r - c) for r, c in zip(ref, cand)))
+            max_delta = max(max_delta, row_max)
+            delta_sum += row_max
+    return {
+        "reference": reference.name,
+        "candidate": candidate.name,
+        "samples": samples,
+        "top1_agreement": round(top1_agree / samples, 4) if samples else 0.0,
+        "max_prob_delta": round(max_delta, 6),
+        "mean_max_prob_delta": round(delta_sum / samples, 6) if samples else 0.0,
+    }
+
+
+def _load_sample_images(pattern: Optional[str], count: int, image_size: int) -> List:
+    """Parite kontrolü için verilen desenle eşleşen görüntüleri veya sabit tohumlu sentetik görüntüleri döndürür."""
+    from PIL import Image
+    if pattern:
+        paths = sorted(glob.glob(pattern))[:count]
+        return [Image.open(path).convert("RGB") for path in paths]
+    rng = random.Random(0)
+    return [
+        Image.frombytes("RGB", (image_size, image_size), rng.randbytes(image_size * image_size * 3))
+        for _ in range(count)
+    ]
+
+
+def main() -> None:
+    """Komut satırından bir arka ucun fp32 modele paritesini ölçer ve sonucu JSON olarak yazdırır."""
+    parser = argparse.ArgumentParser(description="Sınıflandırıcı arka uç parite kontrolü")
+    parser.add_argument("--backend", choices=["int8", "onnx"], required=True)
+    parser.add_argument("--images", help="Örnek görüntü glob deseni (ör. 'samples/*.jpg'); verilmezse sentetik görüntüler kullanılır")
+    parser.add_argument("--count", type=int, default=32)
+    parser.add_argument("--batch-size", type=int, default=8)
+    args = parser.parse_args()
+
+    from transformers import AutoImageProcessor, SiglipForImageClassification
+    from model_registry import CLASSIFIER_MODEL_NAME
+
+    model = SiglipForImageClassification.from_pretrained(CLASSIFIER_MODEL_NAME).eval()
+    processor = AutoImageProcessor.from_pretrained(CLASSIFIER_MODEL_NAME)
+    image_size = processor.size.get("height", 224)
+
+    images = _load_sample_images(args.images, args.count, image_size)
+    batches = [
+        processor(images=images[i:i + args.batch_size], return_tensors="pt")["pixel_values"]
+        for i in range(0, len(images), args.batch_size)
+    ]
+    report = check_parity(TorchBackend(model), create_backend(args.backend, model, image_size), batches)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
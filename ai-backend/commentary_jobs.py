@@ -0,0 +1,111 @@
+# Gerekli kütüphanelerin import edilmesi
+import asyncio
+import os
+import time
+from collections import OrderedDict
+from typing import AsyncIterator, Dict, List, Optional
+from uuid import uuid4
+
+# Tamamlanan yorum işlerinin saklanma süresi ve aynı anda tutulabilecek en fazla iş sayısı
+COMMENT_JOB_TTL_SECONDS = float(os.getenv("COMMENT_JOB_TTL_SECONDS", "600"))
+COMMENT_JOB_MAX_JOBS = int(os.getenv("COMMENT_JOB_MAX_JOBS", "1000"))
+
+
+class CommentaryJob:
+    """Arka planda üretilen bir analiz yorumunun durumunu ve o ana kadar gelen parçalarını tutar."""
+
+    def __init__(self):
+        self.id = uuid4().hex
+        self.status = "pending"  # pending -> streaming -> done / failed
+        self.chunks: List[str] = []
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.finished_at: Optional[float] = None
+        self._changed = asyncio.Condition()
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("done", "failed")
+
+    @property
+    def text(self) -> str:
+        return "".join(self.chunks)
+
+    def snapshot(self) -> Dict:
+        """Yoklama (polling) uç noktası için işin anlık durumunu döndürür."""
+        body = {"job_id": self.id, "status": self.status, "comment": self.text, "done": self.finished}
+        if self.error:
+            body["error"] = self.error
+        return body
+
+    async def wait_for_update(self, seen_chunks: int) -> None:
+        """Yeni bir parça gelene veya iş bitene kadar bekler."""
+        async with self._changed:
+            await self._changed.wait_for(lambda: len(self.chunks) > seen_chunks or self.finished)
+
+    async def _notify(self) -> None:
+        async with self._changed:
+            self._changed.notify_all()
+
+
+class CommentaryJobStore:
+    """Yorum üretim işlerini başlatan ve süresi dolan tamamlanmış işleri temizleyen bellek içi depo."""
+
+    def __init__(self, ttl_seconds: float = COMMENT_JOB_TTL_SECONDS, max_jobs: int = COMMENT_JOB_MAX_JOBS):
+        self.ttl_seconds = ttl_seconds
+        self.max_jobs = max(1, max_jobs)
+        self._jobs: "OrderedDict[str, CommentaryJob]" = OrderedDict()
+        self._tasks = set()
+
+    def start(self, chunks: AsyncIterator[str]) -> CommentaryJob:
+        """Verilen parça akışını çalışan olay döngüsünde tüketen yeni bir iş başlatır."""
+        self._evict()
+        job = CommentaryJob()
+        self._jobs[job.id] = job
+        task = asyncio.get_running_loop().create_task(self._run(job, chunks))
+        # Görevin çöp toplayıcı tarafından erken silinmemesi için referansı tutulur
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return job
+
+    def get(self, job_id: str) -> Optional[CommentaryJob]:
+        """İş kimliğine ait işi döndürür; bulunamazsa None döndürür."""
+        self._evict()
+        return self._jobs.get(job_id)
+
+    def stats(self) -> Dict:
+        """Depodaki iş sayılarını durumlarına göre döndürür."""
+        counts: Dict[str, int] = {}
+        for job in self._jobs.values():
+            counts[job.status] = counts.get(job.status, 0) + 1
+        return {"jobs": len(self._jobs), "running_tasks": len(self._tasks), "by_status": counts}
+
+    async def _run(self, job: CommentaryJob, chunks: AsyncIterator[str]) -> None:
+        job.status = "streaming"
+        try:
+            async for chunk in chunks:
+                job.chunks.append(chunk)
+                await job._notify()
+            job.status = "done"
+        except Exception as e:
+            job.error = str(e)
+            job.status = "failed"
+        finally:
+            job.finished_at = time.time()
+            await job._notify()
+
+    def _evict(self) -> None:
+        """Süresi dolan tamamlanmış işleri ve sınırı aşan en eski işleri siler."""
+        now = time.time()
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job.finished and job.finished_at is not None and now - job.finished_at > self.ttl_seconds
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+        while len(self._jobs) >= self.max_jobs:
+            self._jobs.popitem(last=False)
+
+
+# FastAPI uygulaması ve analiz modülü tarafından paylaşılan global iş deposu
+comment_jobs = CommentaryJobStore()
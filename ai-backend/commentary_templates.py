@@ -0,0 +1,148 @@
+# Gerekli kütüphanelerin import edilmesi
+import json
+import os
+import re
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Dict, List, Mapping, Optional, Sequence, Tuple
+
+# Kural tabanlı yorum, plan, semptom ve video içeriğinin okunduğu veri dosyası (kod değişmeden güncellenebilir)
+COMMENTARY_TEMPLATES_PATH = os.getenv(
+    "COMMENTARY_TEMPLATES_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "content", "commentary_templates.json"),
+)
+# Kural tabanlı yanıtların dili: "tr" veya "en"
+COMMENTARY_LANGUAGE = os.getenv("COMMENTARY_LANGUAGE", "tr")
+LANGUAGES = ("tr", "en")
+
+# İkinci bulgu olmadığında derlenmiş yorum tablosunda kullanılan indeks
+NO_SECOND = -1
+
+
+def _escape(text: str) -> str:
+    """İçerik metnini derlenmiş şablona `str.format` yer tutucusu sanılmadan yerleştirmek için kaçışlar."""
+    return text.replace("{", "{{").replace("}", "}}")
+
+
+class TemplateStore:
+    """Kural tabanlı yorum, 7 günlük plan, semptom tavsiyesi ve video linklerinin değişmez, indeksli deposu.
+
+    İçerik bir kez yüklenir ve sınıf indeksine (LABELS_TR sırası) göre tablolara dönüştürülür. Her dil ve
+    (ana bulgu, ikinci bulgu) çifti için yorum, yalnızca yüzde değerleri boş bırakılarak önceden derlenir; planlar,
+    videolar ve (semptom sınıfı, ana bulgu) yanıtları tamamen hazırdır. Döndürülen plan listeleri paylaşılır ve
+    salt okunur kabul edilmelidir.
+    """
+
+    def __init__(self, data: Mapping, labels: Sequence[str]):
+        self.version = data.get("version", 1)
+        self.labels = tuple(labels)
+        self.label_index: Mapping[str, int] = MappingProxyType({label: i for i, label in enumerate(self.labels)})
+        conditions = data["conditions"]
+        missing = [label for label in self.labels if label not in conditions]
+        if missing:
+            raise ValueError(f"Şablon dosyasında eksik durumlar: {', '.join(missing)}")
+        healthy = data["healthy"]
+
+        label_names = {
+            "tr": self.labels,
+            "en": tuple(conditions[label].get("label_en", label) for label in self.labels),
+        }
+        self.healthy_label: Mapping[str, str] = MappingProxyType(dict(healthy["label"]))
+
+        # Videolar: sınıf indeksine göre, son eleman sağlıklı görünüm için genel bakım videosu
+        self._videos: Tuple[str, ...] = tuple(conditions[label]["video"] for label in self.labels) + (healthy["video"],)
+
+        # Planlar: dil -> sınıf indeksine göre gün/görev listeleri (son eleman sağlıklı görünüm planı)
+        plans: Dict[str, Tuple[List[Dict], ...]] = {}
+        for lang in LANGUAGES:
+            days = data["days"][lang]
+            task_lists = [conditions[label]["plan"][lang] for label in self.labels] + [healthy["plan"][lang]]
+            for tasks in task_lists:
+                if len(tasks) != len(days):
+                    raise ValueError(f"Plan gün sayısı ({len(tasks)}) gün listesiyle ({len(days)}) uyuşmuyor.")
+            plans[lang] = tuple([{"day": day, "task": task} for day, task in zip(days, tasks)] for tasks in task_lists)
+        self._plans = MappingProxyType(plans)
+
+        # Yorumlar: (dil, ana bulgu, ikinci bulgu) -> yalnızca {top_pct} / {second_pct} kalan derlenmiş şablon
+        compiled: Dict[Tuple[str, int, int], str] = {}
+        healthy_comments: Dict[str, str] = {}
+        for lang in LANGUAGES:
+            comment = data["comment"][lang]
+            explanations = [conditions[label]["explanation"][lang] for label in self.labels]
+            names = label_names[lang]
+            for top in range(len(self.labels)):
+                head = comment["top"].replace("{top_label}", _escape(names[top])).replace(
+                    "{top_explanation}", _escape(explanations[top]))
+                closing = _escape(comment["closing"])
+                compiled[(lang, top, NO_SECOND)] = head + closing
+                for second in range(len(self.labels)):
+                    if second == top:
+                        continue
+                    middle = comment["second"].replace("{second_label}", _escape(names[second])).replace(
+                        "{second_explanation}", _escape(explanations[second] or comment["second_fallback_explanation"]))
+                    compiled[(lang, top, second)] = head + middle + closing
+            healthy_comments[lang] = comment["healthy"]
+        self._comments = MappingProxyType(compiled)
+        self._healthy_comments = MappingProxyType(healthy_comments)
+
+        # Semptomlar: anahtar kelimeler tek bir düzenli ifadede birleştirilir; öncelik dosyadaki sınıf sırasıdır
+        symptoms = data["symptoms"]
+        self.symptom_classes: Tuple[str, ...] = tuple(entry["name"] for entry in symptoms["classes"])
+        alternatives = [
+            f"(?P<{name}>{'|'.join(re.escape(keyword.lower()) for keyword in entry['keywords'])})"
+            for name, entry in zip(self.symptom_classes, symptoms["classes"])
+        ]
+        self._symptom_pattern = re.compile("|".join(alternatives))
+        responses: Dict[Tuple[str, Optional[str], int], str] = {}
+        for lang in LANGUAGES:
+            issue_names = list(label_names[lang]) + [self.healthy_label[lang]]
+            for name, entry in zip(self.symptom_classes, symptoms["classes"]):
+                for issue, issue_name in enumerate(issue_names):
+                    responses[(lang, name, issue)] = entry["response"][lang].replace("{top_issue}", issue_name)
+            for issue in range(len(issue_names)):
+                responses[(lang, None, issue)] = symptoms["default"][lang]
+        self._symptom_responses = MappingProxyType(responses)
+        # Aynı semptom metinleri tekrar tekrar geldiğinden sınıflandırma sonucu önbelleğe alınır
+        self.classify_symptom = lru_cache(maxsize=1024)(self._classify_symptom)
+
+    @classmethod
+    def load(cls, path: str, labels: Sequence[str]) -> "TemplateStore":
+        """JSON şablon dosyasını okuyup depoyu oluşturur."""
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(json.load(f), labels)
+
+    def _issue(self, label_id: Optional[int]) -> int:
+        """Sınıf indeksini tablo indeksine çevirir; bulgu yoksa sağlıklı görünüm satırı kullanılır."""
+        return len(self.labels) if label_id is None else label_id
+
+    def video(self, label_id: Optional[int]) -> str:
+        return self._videos[self._issue(label_id)]
+
+    def plan(self, label_id: Optional[int], lang: str = COMMENTARY_LANGUAGE) -> List[Dict]:
+        return self._plans[lang][self._issue(label_id)]
+
+    def comment(self, top: Optional[Tuple[int, str]], second: Optional[Tuple[int, str]] = None,
+                findings: str = "", lang: str = COMMENTARY_LANGUAGE) -> str:
+        """Derlenmiş yorumu yüzde metinleriyle doldurur; `top` / `second` (sınıf indeksi, yüzde metni) çiftleridir."""
+        if top is None:
+            return self._healthy_comments[lang].replace("{findings}", findings)
+        second_id, second_pct = second if second is not None else (NO_SECOND, "")
+        return self._comments[(lang, top[0], second_id)].format(top_pct=top[1], second_pct=second_pct)
+
+    def _classify_symptom(self, symptom: str) -> Optional[str]:
+        """Semptom metnindeki en öncelikli sınıfı döndürür; eşleşme yoksa None."""
+        found = {match.lastgroup for match in self._symptom_pattern.finditer(symptom.lower())}
+        for name in self.symptom_classes:
+            if name in found:
+                return name
+        return None
+
+    def symptom_advice(self, symptom: str, label_id: Optional[int], lang: str = COMMENTARY_LANGUAGE) -> str:
+        return self._symptom_responses[(lang, self.classify_symptom(symptom), self._issue(label_id))]
+
+
+def load_template_store(labels: Sequence[str], path: str = COMMENTARY_TEMPLATES_PATH) -> TemplateStore:
+    """Ortam değişkenindeki yoldan şablon deposunu yükler."""
+    store = TemplateStore.load(path, labels)
+    print(f"Commentary templates loaded: {path} (v{store.version}, language: {COMMENTARY_LANGUAGE})")
+    return store
@@ -1,13 +1,19 @@
 # Gerekli kütüphanelerin ve ortam değişkenlerinin yüklenmesi
 import os
-from typing import Optional
+from typing import Dict, List, Optional, Tuple
 
 from dotenv import load_dotenv
 load_dotenv()
 
+from chat_sessions import ChatSession, ChatSessionStore
+from llm_client import LLMOverloadedError, create_llm_client
+from metrics import span
+
 import google.generativeai as genai
 genai = None
 
+DISABLED_REPLY = "Üzgünüm, sohbet özelliği şu anda devre dışı. API anahtarı eksik veya servis kullanılamıyor."
+
 
 class DentalChatbot:
     """Gemini AI modelini kullanarak diş sağlığı hakkında sohbet eden sınıf."""
@@ -16,7 +22,11 @@ class DentalChatbot:
         """Sınıf başlatıldığında API anahtarını ayarlar ve Gemini modelini kurar."""
         self.api_key = api_key or os.getenv("GEMINI_API_KEY")
         self.model = None
+        # Oturum kimliğine göre sınırlı tur penceresi ve eski turların özeti tutulur
+        self.sessions = ChatSessionStore()
         self._setup_gemini()
+        # LLM çağrıları kendi eşzamanlılık sınırı, zaman aşımı ve yeniden denemesi olan istemciden geçer
+        self.llm = create_llm_client(self.model, name="chat")
 
     def _setup_gemini(self) -> None:
         """Gemini modelini API anahtarı ile yapılandırır ve kullanıma hazırlar."""
@@ -29,7 +39,8 @@ class DentalChatbot:
         try:
             # API anahtarını ayarla ve kullanılacak modeli seç
             genai.configure(api_key=self.api_key)
-            self.model = genai.GenerativeModel("gemini-1.5-flash")
+            # Sabit sistem talimatı modele bir kez verilir; her turda yeniden gönderilmez
+            self.model = genai.GenerativeModel("gemini-1.5-flash", system_instruction=self.get_system_prompt())
         except Exception as e:
             print(f"Gemini init error: {e}")
 
@@ -55,16 +66,110 @@ class DentalChatbot:
             "- Sadece diş sağlığı konularında uzun yanıtlar ver\n"
         )
 
-    def chat(self, user_input: str) -> str:
-        if self.model is None:
-            return "Üzgünüm, sohbet özelliği şu anda devre dışı. API anahtarı eksik veya servis kullanılamıyor."
+    def chat(self, user_input: str, session_id: Optional[str] = None) -> str:
+        """Kullanıcı mesajına yanıt üretir (iş parçacıklarından ve CLI'dan kullanılan bloklayan sürüm)."""
+        if not self.llm.available:
+            return DISABLED_REPLY
+        try:
+            with span("chat"):
+                session, folded = self._prepare_turn(session_id)
+                if folded:
+                    try:
+                        with span("chat_compaction"):
+                            summary = self.llm.generate_sync(self._summary_prompt(session, folded))
+                    except Exception as e:
+                        print(f"Chat summary error: {e}")
+                        summary = None
+                    self._apply_summary(session, folded, summary)
+                history = self._request_history(session, user_input)
+                return self._finish_turn(session, user_input, self.llm.chat_sync(history, user_input))
+        except LLMOverloadedError:
+            # Doygunluk hata yanıtına çevrilmez; çağıran hızlı bir 503 + Retry-After döndürebilsin
+            raise
+        except Exception as e:
+            return f"Üzgünüm, bir hata oluştu: {str(e)}"
+
+    async def chat_async(self, user_input: str, session_id: Optional[str] = None) -> str:
+        """`chat` metodunun, yanıtı beklerken hiçbir iş parçacığını işgal etmeyen asenkron sürümü.
+
+        LLM kuyruğu doluysa `LLMOverloadedError` fırlatılır.
+        """
+        if not self.llm.available:
+            return DISABLED_REPLY
         try:
-            prompt = f"{self.get_system_prompt()}\n\nKullanıcı: {user_input}"
-            response = self.model.generate_content(prompt)
-            return (getattr(response, "text", None) or "Üzgünüm, şu an yanıt üretemiyorum.").strip()
+            with span("chat"):
+                session, folded = self._prepare_turn(session_id)
+                if folded:
+                    try:
+                        with span("chat_compaction"):
+                            summary = await self.llm.generate(self._summary_prompt(session, folded))
+                    except Exception as e:
+                        print(f"Chat summary error: {e}")
+                        summary = None
+                    self._apply_summary(session, folded, summary)
+                history = self._request_history(session, user_input)
+                return self._finish_turn(session, user_input, await self.llm.chat(history, user_input))
+        except LLMOverloadedError:
+            raise
         except Exception as e:
             return f"Üzgünüm, bir hata oluştu: {str(e)}"
 
+    def _prepare_turn(self, session_id: Optional[str]) -> Tuple[Optional[ChatSession], List[Dict]]:
+        """Oturumu bulur ve özetlenip pencereden çıkarılması gereken en eski turları döndürür (gerekmiyorsa boş liste)."""
+        session = self.sessions.get(session_id) if session_id else None
+        if session is None or not session.needs_compaction(self.sessions.max_turns, self.sessions.token_budget):
+            return session, []
+        return session, session.oldest_turns(self.sessions.max_turns)
+
+    def _request_history(self, session: Optional[ChatSession], user_input: str) -> List[Dict]:
+        """LLM'e gönderilecek geçmişi oluşturur ve istek boyutunu oturum istatistiklerine işler."""
+        history = session.history() if session is not None else []
+        self.sessions.record_request(history, user_input)
+        return history
+
+    def _finish_turn(self, session: Optional[ChatSession], user_input: str, text: Optional[str]) -> str:
+        """LLM yanıtını biçimlendirir ve turu oturuma ekler."""
+        reply = self._format_reply(text)
+        self._record_turn(session, user_input, reply)
+        return reply
+
+    @staticmethod
+    def _summary_prompt(session: ChatSession, folded: List[Dict]) -> str:
+        """Önceki özet ile pencereden çıkan turları tek bir kısa özette birleştiren istemi oluşturur."""
+        turns_text = "\n".join(f"Kullanıcı: {turn['user']}\nAsistan: {turn['model']}" for turn in folded)
+        return (
+            "Aşağıdaki diş sağlığı sohbetini, sonraki yanıtlarda bağlam olarak kullanılmak üzere en fazla 5 cümlede "
+            "TÜRKÇE özetle. Kullanıcının şikayetlerini, verilen önerileri ve açık kalan soruları koru.\n\n"
+            f"Önceki özet: {session.summary or 'Yok'}\n\n"
+            f"Yeni konuşma:\n{turns_text}\n\n"
+            "Sadece özet metnini dön."
+        )
+
+    def _apply_summary(self, session: ChatSession, folded: List[Dict], summary: Optional[str]) -> None:
+        """Katlanan turları oturumdan çıkarır; LLM özeti alınamazsa kullanıcı mesajlarından kısa bir özet oluşturur."""
+        if not summary or not summary.strip():
+            asked = "; ".join(turn["user"][:120] for turn in folded)
+            summary = f"{session.summary + ' ' if session.summary else ''}Kullanıcı daha önce şunları sordu: {asked}"
+            # Yedek özet de bütçenin yarısını (≈4 karakter/token) aşmayacak şekilde kırpılır
+            summary = summary[-self.sessions.token_budget * 2:]
+        with session.lock:
+            # Aynı turlar eşzamanlı bir istekte zaten katlandıysa oturum değiştirilmez
+            if session.turns[:len(folded)] != folded:
+                return
+            session.summary = summary.strip()
+            del session.turns[:len(folded)]
+        self.sessions.record_compaction()
+
+    @staticmethod
+    def _record_turn(session: Optional[ChatSession], user_input: str, reply: str) -> None:
+        if session is not None:
+            with session.lock:
+                session.turns.append({"user": user_input, "model": reply})
+
+    @staticmethod
+    def _format_reply(text: Optional[str]) -> str:
+        return (text or "Üzgünüm, şu an yanıt üretemiyorum.").strip()
+
 
 # Global instance to be imported by FastAPI app
 chatbot = DentalChatbot()
@@ -80,7 +185,10 @@ def start_interactive_cli() -> None:
                 break
             if not msg:
                 continue
-            print("Bot:", chatbot.chat(msg), "\n")
+            try:
+                print("Bot:", chatbot.chat(msg, session_id="cli"), "\n")
+            except LLMOverloadedError:
+                print("Bot: Şu anda çok yoğunum, lütfen birazdan tekrar dene.\n")
     except KeyboardInterrupt:
         print("\nGörüşürüz! 😊")
                                             
\ No newline at end of file
@@ -0,0 +1,283 @@
+# Gerekli kütüphanelerin import edilmesi
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Dict, List, Optional, Tuple
+
+# Kullanıcı geçmişi deposunun türü: "memory" (süreç içi halka tampon) veya "sqlite" (kalıcı, süreçler arası paylaşılır)
+HISTORY_BACKEND = os.getenv("HISTORY_BACKEND", "memory")
+# Kullanıcı başına saklanacak en fazla etkileşim sayısı (eskiler halka tampondan düşer)
+HISTORY_MAX_ENTRIES_PER_USER = int(os.getenv("HISTORY_MAX_ENTRIES_PER_USER", "20"))
+# Bellek içi depoda tutulacak en fazla kullanıcı sayısı ve toplam bayt sınırı (aşılırsa en uzun süredir pasif kullanıcılar çıkarılır)
+HISTORY_MAX_USERS = int(os.getenv("HISTORY_MAX_USERS", "10000"))
+HISTORY_MAX_BYTES = int(os.getenv("HISTORY_MAX_BYTES", str(16 * 1024 * 1024)))
+# SQLite deposunun dosya yolu ve toplu yazma ayarları
+HISTORY_DB_PATH = os.getenv("HISTORY_DB_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "history.sqlite3"))
+HISTORY_FLUSH_INTERVAL_MS = float(os.getenv("HISTORY_FLUSH_INTERVAL_MS", "200"))
+HISTORY_FLUSH_BATCH_SIZE = int(os.getenv("HISTORY_FLUSH_BATCH_SIZE", "64"))
+
+
+def _entry_size(entry: Dict) -> int:
+    """Bellek hesabı için bir geçmiş kaydının yaklaşık boyutu (JSON gösteriminin uzunluğu)."""
+    return len(json.dumps(entry, ensure_ascii=False))
+
+
+class HistoryStore:
+    """Kullanıcı başına son etkileşimleri tutan geçmiş deposu arayüzü."""
+
+    name = "base"
+
+    def append(self, user_id: str, entry: Dict) -> None:
+        """Kullanıcının geçmişine {"user": ..., "ai": ...} biçiminde bir kayıt ekler."""
+        raise NotImplementedError
+
+    def recent(self, user_id: str, limit: int = 3) -> List[Dict]:
+        """Kullanıcının en yeni `limit` kaydını eskiden yeniye sıralı döndürür."""
+        raise NotImplementedError
+
+    def stats(self) -> Dict:
+        """Deponun doluluk ve çıkarma istatistiklerini döndürür."""
+        raise NotImplementedError
+
+    def close(self) -> None:
+        """Bekleyen yazmaları tamamlar ve kaynakları serbest bırakır (gerekmiyorsa etkisizdir)."""
+
+
+class InMemoryHistoryStore(HistoryStore):
+    """Kullanıcı başına halka tampon, pasif kullanıcılar için LRU çıkarma ve bayt hesabı yapan, iş parçacığı güvenli depo."""
+
+    name = "memory"
+
+    def __init__(
+        self,
+        max_entries_per_user: int = HISTORY_MAX_ENTRIES_PER_USER,
+        max_users: int = HISTORY_MAX_USERS,
+        max_bytes: int = HISTORY_MAX_BYTES,
+    ):
+        self.max_entries_per_user = max(1, max_entries_per_user)
+        self.max_users = max(1, max_users)
+        self.max_bytes = max(1, max_bytes)
+        # user_id -> (kayıt, boyut) çiftlerinden oluşan halka tampon; sıralama kullanıcıların son erişim sırasıdır
+        self._users: "OrderedDict[str, deque]" = OrderedDict()
+        self._bytes = 0
+        self._entries = 0
+        self._lock = threading.Lock()
+
+        # Çıkarma sayaçları
+        self.dropped_entries = 0
+        self.evicted_users = 0
+
+    def append(self, user_id: str, entry: Dict) -> None:
+        size = _entry_size(entry)
+        with self._lock:
+            ring = self._users.get(user_id)
+            if ring is None:
+                ring = self._users[user_id] = deque()
+            else:
+                self._users.move_to_end(user_id)
+            ring.append((entry, size))
+            self._bytes += size
+            self._entries += 1
+            # Kullanıcı başına sınırı aşan en eski kayıtlar düşürülür
+            while len(ring) > self.max_entries_per_user:
+                _, old_size = ring.popleft()
+                self._bytes -= old_size
+                self._entries -= 1
+                self.dropped_entries += 1
+            # Toplam sınırlar aşılırsa en uzun süredir pasif kullanıcılar çıkarılır (yeni yazan kullanıcı korunur)
+            while len(self._users) > 1 and (len(self._users) > self.max_users or self._bytes > self.max_bytes):
+                self._evict_oldest()
+
+    def recent(self, user_id: str, limit: int = 3) -> List[Dict]:
+        with self._lock:
+            ring = self._users.get(user_id)
+            if not ring:
+                return []
+            self._users.move_to_end(user_id)
+            return [entry for entry, _ in list(ring)[-limit:]]
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "backend": self.name,
+                "users": len(self._users),
+                "entries": self._entries,
+                "bytes": self._bytes,
+                "max_users": self.max_users,
+                "max_bytes": self.max_bytes,
+                "max_entries_per_user": self.max_entries_per_user,
+                "dropped_entries": self.dropped_entries,
+                "evicted_users": self.evicted_users,
+            }
+
+    def _evict_oldest(self) -> None:
+        """En uzun süredir erişilmeyen kullanıcıyı siler (kilit altında çağrılmalıdır)."""
+        _, ring = self._users.popitem(last=False)
+        self._bytes -= sum(size for _, size in ring)
+        self._entries -= len(ring)
+        self.evicted_users += 1
+
+
+class SQLiteHistoryStore(HistoryStore):
+    """Geçmişi SQLite'ta saklayan, yazmaları arka plan iş parçacığında toplu olarak işleyen kalıcı depo.
+
+    Veritabanı WAL modunda açılır; bu sayede süreç havuzundaki işçiler ve yeniden başlatılan sunucular aynı
+    geçmişi görür. Henüz diske yazılmamış kayıtlar okumalarda bekleyen kuyruktan birleştirilir.
+    """
+
+    name = "sqlite"
+
+    def __init__(
+        self,
+        path: str = HISTORY_DB_PATH,
+        max_entries_per_user: int = HISTORY_MAX_ENTRIES_PER_USER,
+        flush_interval_ms: float = HISTORY_FLUSH_INTERVAL_MS,
+        flush_batch_size: int = HISTORY_FLUSH_BATCH_SIZE,
+    ):
+        self.path = path
+        self.max_entries_per_user = max(1, max_entries_per_user)
+        self.flush_interval_s = max(0.0, flush_interval_ms) / 1000.0
+        self.flush_batch_size = max(1, flush_batch_size)
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._read_lock = threading.Lock()
+        self._read_conn = self._connect()
+        self._read_conn.execute(
+            "CREATE TABLE IF NOT EXISTS history ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, user_id TEXT NOT NULL, entry TEXT NOT NULL, created_at REAL NOT NULL)"
+        )
+        self._read_conn.execute("CREATE INDEX IF NOT EXISTS history_user ON history (user_id, id)")
+        self._read_conn.commit()
+
+        # Diske yazılmayı bekleyen kayıtlar: hem yazıcı kuyruğunda hem de okumalar için kullanıcı bazında tutulur
+        self._queue: "queue.Queue[Optional[Tuple[str, Dict, float]]]" = queue.Queue()
+        self._pending: Dict[str, List[Dict]] = {}
+        self._pending_lock = threading.Lock()
+
+        # Yazma sayaçları
+        self.written_entries = 0
+        self.flushes = 0
+        self.write_errors = 0
+
+        self._closed = False
+        self._writer = threading.Thread(target=self._write_loop, name="history-writer", daemon=True)
+        self._writer.start()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def append(self, user_id: str, entry: Dict) -> None:
+        with self._pending_lock:
+            self._pending.setdefault(user_id, []).append(entry)
+        self._queue.put((user_id, entry, time.time()))
+
+    def recent(self, user_id: str, limit: int = 3) -> List[Dict]:
+        with self._pending_lock:
+            pending = list(self._pending.get(user_id, ()))
+        # Bekleyen kayıtlar en yeni kayıtlardır; yalnızca eksik kalan kısım veritabanından okunur
+        needed = limit - len(pending)
+        stored: List[Dict] = []
+        if needed > 0:
+            with self._read_lock:
+                rows = self._read_conn.execute(
+                    "SELECT entry FROM history WHERE user_id = ? ORDER BY id DESC LIMIT ?", (user_id, needed)
+                ).fetchall()
+            stored = [json.loads(row[0]) for row in reversed(rows)]
+        return (stored + pending)[-limit:]
+
+    def stats(self) -> Dict:
+        with self._read_lock:
+            users, entries = self._read_conn.execute("SELECT COUNT(DISTINCT user_id), COUNT(*) FROM history").fetchone()
+        with self._pending_lock:
+            pending = sum(len(entries) for entries in self._pending.values())
+        return {
+            "backend": self.name,
+            "path": self.path,
+            "users": users,
+            "entries": entries,
+            "bytes": os.path.getsize(self.path) if os.path.exists(self.path) else 0,
+            "max_entries_per_user": self.max_entries_per_user,
+            "pending_writes": pending,
+            "written_entries": self.written_entries,
+            "flushes": self.flushes,
+            "write_errors": self.write_errors,
+        }
+
+    def close(self) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._writer.join(timeout=10)
+
+    def _write_loop(self) -> None:
+        """Kuyruktaki kayıtları toplayıp tek işlemde yazar ve kullanıcı başına sınırı aşan eski kayıtları siler."""
+        conn = self._connect()
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is None:
+                break
+            batch = [item]
+            # İlk kayıttan sonra kısa bir süre daha beklenerek aynı işlemde yazılacak kayıtlar toplanır
+            deadline = time.monotonic() + self.flush_interval_s
+            while len(batch) < self.flush_batch_size:
+                remaining = deadline - time.monotonic()
+                try:
+                    item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            self._flush(conn, batch)
+        conn.close()
+
+    def _flush(self, conn: sqlite3.Connection, batch: List[Tuple[str, Dict, float]]) -> None:
+        users = {user_id for user_id, _, _ in batch}
+        try:
+            with conn:
+                conn.executemany(
+                    "INSERT INTO history (user_id, entry, created_at) VALUES (?, ?, ?)",
+                    [(user_id, json.dumps(entry, ensure_ascii=False), created_at) for user_id, entry, created_at in batch],
+                )
+                conn.executemany(
+                    "DELETE FROM history WHERE user_id = ? AND id NOT IN "
+                    "(SELECT id FROM history WHERE user_id = ? ORDER BY id DESC LIMIT ?)",
+                    [(user_id, user_id, self.max_entries_per_user) for user_id in users],
+                )
+            self.written_entries += len(batch)
+            self.flushes += 1
+        except Exception as e:
+            self.write_errors += 1
+            print(f"History store write error: {e}")
+        finally:
+            # Yazılan (veya yazılamayan) kayıtlar bekleyen listesinden çıkarılır
+            with self._pending_lock:
+                for user_id, entry, _ in batch:
+                    entries = self._pending.get(user_id)
+                    if entries:
+                        entries.remove(entry)
+                        if not entries:
+                            del self._pending[user_id]
+
+
+def create_history_store(backend: str = HISTORY_BACKEND) -> HistoryStore:
+    """Ortam değişkenlerindeki ayarlarla seçilen geçmiş deposunu oluşturur."""
+    if backend == "sqlite":
+        try:
+            return SQLiteHistoryStore()
+        except Exception as e:
+            print(f"History store init error ({HISTORY_DB_PATH}): {e}; falling back to memory")
+            return InMemoryHistoryStore()
+    if backend == "memory":
+        return InMemoryHistoryStore()
+    raise ValueError(f"Bilinmeyen geçmiş deposu: {backend} (memory, sqlite)")
@@ -1,62 +1,160 @@
 # Gerekli kütüphanelerin import edilmesi
+import asyncio
 import base64
+import hashlib
 import io
 import os
 import json
-import torch
+import threading
+import time
+import numpy as np
 from PIL import Image
-from transformers import AutoImageProcessor, SiglipForImageClassification
-from typing import Dict, List, Optional
+from typing import TYPE_CHECKING, AsyncIterator, BinaryIO, Callable, Dict, List, Optional, Sequence, Tuple, Union
 from datetime import datetime, timedelta
 from uuid import uuid4
 
+from admission import DeadlineExceeded, check_deadline
+from classifier_backends import CLASSIFIER_BACKEND
+from inference_workers import INFERENCE_MODE, ProcessInferencePool
+from llm_client import create_llm_client
+from metrics import span
+from model_registry import (
+    CLASSIFIER_MODEL_NAME, CLASSIFIER_MODELS, CLASSIFIER_VERSION, SHADOW_MODEL_VERSION, SHADOW_SAMPLE_RATE,
+    ModelRegistry, ModelVersion, parse_model_specs,
+)
+from commentary_jobs import comment_jobs
+from commentary_templates import TemplateStore, load_template_store
+from history_store import HistoryStore, create_history_store
+from result_cache import create_result_cache
+from tta import TestTimeAugmenter
+
+if TYPE_CHECKING:
+    # torch yalnızca model yüklenirken içe aktarılır; tip ipuçları için modül düzeyinde gerekmez
+    import torch
+
 from dotenv import load_dotenv
 load_dotenv()
 
 import google.generativeai as genai
 genai = None
 
-# Sınıflandırma için kullanılacak Hugging Face modelinin adı
-CLASSIFIER_MODEL_NAME = "prithivMLmods/tooth-agenesis-siglip2"
-
-# Model çıktısındaki ID'leri Türkçe ve İngilizce etiketlere eşler
-ID_TO_LABEL = {
-    "0": {"tr": "Diş Taşı (Calculus)", "en": "Calculus"},
-    "1": {"tr": "Diş Çürüğü (Karies)", "en": "Caries"},
-    "2": {"tr": "Diş Eti İltihabı (Gingivitis)", "en": "Gingivitis"},
-    "3": {"tr": "Aft (Ağız Yarası)", "en": "Mouth Ulcer"},
-    "4": {"tr": "Diş Renklenmesi", "en": "Tooth Discoloration"},
-    "5": {"tr": "Hipodonti (Eksik Diş)", "en": "Hypodontia"},
-}
-
-# Tespit edilen durumlara göre önerilecek YouTube video arama linkleri
-VIDEO_LINKS = {
-    "Diş Taşı (Calculus)": "https://www.youtube.com/results?search_query=di%C5%9F+ta%C5%9F%C4%B1+nasil+temizlenir",
-    "Diş Çürüğü (Karies)": "https://www.youtube.com/results?search_query=di%C5%9F+%C3%A7%C3%BCr%C3%BC%C4%9F%C3%BC+%C3%B6nleme",
-    "Diş Eti İltihabı (Gingivitis)": "https://www.youtube.com/results?search_query=di%C5%9F+eti+iltihab%C4%B1+bak%C4%B1m%C4%B1",
-    "Aft (Ağız Yarası)": "https://www.youtube.com/results?search_query=aft+nedir+tedavisi",
-    "Diş Renklenmesi": "https://www.youtube.com/results?search_query=di%C5%9F+renklenmesi+nas%C4%B1l+ge%C3%A7er",
-    "Hipodonti (Eksik Diş)": "https://www.youtube.com/results?search_query=hipodonti+nedir+tedavisi",
-}
+# Özet istem şablonunun sürümü; şablon değiştiğinde LLM yanıt önbelleğini geçersiz kılmak için artırılır
+SUMMARY_PROMPT_VERSION = 1
+
+# Model yüklendikten sonra ilk isteğin gecikmesini azaltmak için boş bir ileri geçiş yapılıp yapılmayacağı
+MODEL_WARMUP = os.getenv("MODEL_WARMUP", "1") == "1"
+
+# Model çıktısındaki sınıf indekslerine karşılık gelen Türkçe ve İngilizce etiketler (indeks = sütun sırası)
+LABELS_TR = (
+    "Diş Taşı (Calculus)",
+    "Diş Çürüğü (Karies)",
+    "Diş Eti İltihabı (Gingivitis)",
+    "Aft (Ağız Yarası)",
+    "Diş Renklenmesi",
+    "Hipodonti (Eksik Diş)",
+)
+LABELS_EN = ("Calculus", "Caries", "Gingivitis", "Mouth Ulcer", "Tooth Discoloration", "Hypodontia")
+
+# Bulgu olarak raporlanacak en düşük olasılık ve raporlanan en fazla bulgu sayısı
+PREDICTION_THRESHOLD = 0.01
+PREDICTION_TOP_K = 3
+
+
+class Prediction:
+    """Tek bir bulgu: sınıf indeksi ve olasılığı; etiketler indeksle tablodan okunur."""
+
+    __slots__ = ("label_id", "prob")
+
+    def __init__(self, label_id: int, prob: float):
+        self.label_id = label_id
+        self.prob = prob
+
+    @property
+    def label_tr(self) -> str:
+        return LABELS_TR[self.label_id]
+
+    @property
+    def label_en(self) -> str:
+        return LABELS_EN[self.label_id]
+
+    @property
+    def percent_text(self) -> str:
+        return f"{self.prob * 100:.1f}%"
+
+    def __str__(self) -> str:
+        return f"{self.label_tr}: {self.percent_text}"
+
+    def __repr__(self) -> str:
+        return f"Prediction({self.label_en!r}, {self.prob:.4f})"
+
+    @classmethod
+    def list_from(cls, classification: Dict) -> List["Prediction"]:
+        """Sınıflandırma sonucundaki en olası bulguları, olasılık sırasıyla Prediction listesi olarak döndürür."""
+        probs = classification["probs"]
+        top_ids = classification.get("top_ids")
+        if top_ids is None:
+            # Eski sürümde önbelleğe yazılmış sonuçlarda indeksler yoktur; olasılıklardan yeniden hesaplanır
+            top_ids = summarize_probabilities([probs])[0]["top_ids"]
+        return [cls(i, probs[i]) for i in top_ids]
+
+
+def summarize_probabilities(rows) -> List[Dict]:
+    """(N, C) boyutlu olasılık matrisinin her satırı için eşik ve top-k işlemini NumPy ile toplu olarak uygular.
+
+    Her satır için ham olasılıkları, en olası bulguların sınıf indekslerini, API'nin beklediği biçimlenmiş
+    etiketleri ve eşiği geçen tüm bulguların Türkçe/İngilizce yüzde tablolarını içeren bir sözlük döndürür.
+    """
+    probs = np.asarray(rows, dtype=np.float64)
+    if probs.ndim == 1:
+        probs = probs[np.newaxis, :]
+    # Eşit olasılıklarda sınıf sırası korunur (kararlı sıralama)
+    order = np.argsort(-probs, axis=1, kind="stable")[:, :PREDICTION_TOP_K]
+    top_probs = np.take_along_axis(probs, order, axis=1)
+    top_valid = top_probs >= PREDICTION_THRESHOLD
+    kept = probs >= PREDICTION_THRESHOLD
+    percents = np.round(probs * 100, 2)
+
+    results = []
+    for row, ids, valid, kept_row, pct in zip(probs.tolist(), order.tolist(), top_valid, kept, percents.tolist()):
+        top_ids = [i for i, ok in zip(ids, valid) if ok]
+        kept_ids = np.flatnonzero(kept_row).tolist()
+        results.append({
+            "probs": row,
+            "top_ids": top_ids,
+            "top_predictions": [f"{LABELS_TR[i]}: {row[i] * 100:.1f}%" for i in top_ids],
+            "all_predictions": {
+                "tr": {LABELS_TR[i]: pct[i] for i in kept_ids},
+                "en": {LABELS_EN[i]: pct[i] for i in kept_ids},
+            },
+            "top_issue": LABELS_TR[top_ids[0]] if top_ids else None,
+        })
+    return results
+
 
 # Diş görüntüsünü analiz eden, yorumlayan ve bakım planı oluşturan ana sınıf
 class DentalImageAnalyzer:
     """Görüntü sınıflandırma ve Gemini ile metin üretme yeteneklerini birleştirir."""
 
     def __init__(self):
-        """Sınıf başlatıldığında görüntü sınıflandırma ve Gemini modellerini yükler."""
-        self.image_processor = None
-        self.image_classifier = None
+        """Sınıf başlatıldığında yalnızca hafif durumu hazırlar; ağır modeller `load` ile yüklenir."""
+        # Bellekteki sınıflandırıcı sürümleri; istekler etkin sürümü kiralar, sürüm değişimi atomiktir
+        self.models = ModelRegistry()
         self.gemini_model = None
-        self.user_memory = {}  
-        
-        # Görüntü sınıflandırma modelini yükler
-        try:
-            self.image_classifier = SiglipForImageClassification.from_pretrained(CLASSIFIER_MODEL_NAME)
-            self.image_processor = AutoImageProcessor.from_pretrained(CLASSIFIER_MODEL_NAME)
-            print(f"Image classifier loaded: {CLASSIFIER_MODEL_NAME}")
-        except Exception as e:
-            print(f"Image classifier load error: {e}")
+        self.process_pool: Optional[ProcessInferencePool] = None
+        # Kullanıcı başına son taramalar; boyutu sınırlı, iş parçacığı güvenli ve isteğe bağlı olarak kalıcı depo
+        self.history: HistoryStore = create_history_store()
+        # Tekrarlanan yüklemeler için sınıflandırıcı çıktısı ve üretilen yorum ayrı katmanlarda önbelleğe alınır
+        self.classifier_cache = create_result_cache("classifier")
+        self.commentary_cache = create_result_cache("commentary")
+        # Düşük güvenli tahminlerde isteğe bağlı çok görünümlü (test-time augmentation) sınıflandırma
+        self.tta = TestTimeAugmenter()
+        # Kural tabanlı yorum, plan, semptom ve video içeriği veri dosyasından bir kez yüklenir
+        self.templates: TemplateStore = load_template_store(LABELS_TR)
+        # Arka planda model yükleme durumu: "pending" -> "loading" -> "ready" / "failed"
+        self.load_state = "pending"
+        self.load_error: Optional[str] = None
+        self.startup_timings: Dict[str, float] = {}
+        self._load_lock = threading.Lock()
         
         # Metin üretimi için Gemini modelini yükler
         if genai is not None:
@@ -71,243 +169,551 @@ class DentalImageAnalyzer:
                     print("GEMINI_API_KEY not set; using rule-based summary")
             except Exception as e:
                 print(f"Gemini init error: {e}")
+        # LLM çağrıları kendi eşzamanlılık sınırı, zaman aşımı, yeniden deneme ve önbelleği olan istemciden geçer
+        self.llm = create_llm_client(self.gemini_model, name="summary")
+
+    @property
+    def is_ready(self) -> bool:
+        """Sınıflandırma modeli yüklenip isteklere hazır olduğunda True döner."""
+        return self.load_state == "ready"
+
+    def load(self, warmup: bool = MODEL_WARMUP) -> None:
+        """torch/transformers içe aktarımını ve model ağırlıklarını yükler; her aşamanın süresini kaydeder."""
+        with self._load_lock:
+            if self.load_state in ("loading", "ready"):
+                return
+            self.load_state = "loading"
+            self.load_error = None
+
+        timings: Dict[str, float] = {}
+        started_at = time.perf_counter()
+        try:
+            phase_start = time.perf_counter()
+            import torch  # noqa: F401
+            import transformers  # noqa: F401
+            timings["import_s"] = time.perf_counter() - phase_start
+
+            # Yapılandırma hataları (tekrarlanan sürüm adları) ağırlıklar yüklenmeden önce yakalanır
+            extra_specs = parse_model_specs(CLASSIFIER_MODELS, CLASSIFIER_VERSION)
+            # Etkin sürümün yükleme aşamaları ayrı ayrı, ek sürümler (CLASSIFIER_MODELS) toplam olarak ölçülür
+            models = [ModelVersion.load(CLASSIFIER_VERSION, CLASSIFIER_MODEL_NAME, CLASSIFIER_BACKEND, timings)]
+            phase_start = time.perf_counter()
+            for version, model_name, backend_name in extra_specs:
+                models.append(ModelVersion.load(version, model_name, backend_name))
+            if len(models) > 1:
+                timings["extra_models_load_s"] = time.perf_counter() - phase_start
+
+            # İşçiler başlatma anında kayıtlı sürümleri kendileri yükler; sürümler havuzdan önce kaydedilir
+            for model in models:
+                self._attach(model)
+            self.models.activate(CLASSIFIER_VERSION)
+            if SHADOW_MODEL_VERSION:
+                self.models.set_shadow(SHADOW_MODEL_VERSION, SHADOW_SAMPLE_RATE)
+            if INFERENCE_MODE == "process":
+                # Çözümleme, ön işleme ve ileri geçiş, ağırlıkları paylaşan işçi süreçlerde çalıştırılır
+                phase_start = time.perf_counter()
+                self.process_pool = ProcessInferencePool()
+                # Bir işçi çökerse havuz yeniden kurulurken o istek bu süreçteki modellerle sınıflandırılır
+                self.process_pool.start([(m.version, m.model_name, m.backend_name) for m in models],
+                                        _load_worker_models, fallback=self._infer_local)
+                timings["process_pool_start_s"] = time.perf_counter() - phase_start
+
+            if warmup:
+                phase_start = time.perf_counter()
+                for model in models:
+                    self._warmup(model)
+                timings["warmup_s"] = time.perf_counter() - phase_start
+        except Exception as e:
+            self.load_error = str(e)
+            self.load_state = "failed"
+            print(f"Image classifier load error: {e}")
+        else:
+            self.load_state = "ready"
+        finally:
+            timings["total_s"] = time.perf_counter() - started_at
+            self.startup_timings = {k: round(v, 3) for k, v in timings.items()}
+            print(f"[STARTUP] classifier {self.load_state}: {self.startup_timings}")
+
+    def _attach(self, model: ModelVersion) -> None:
+        """Yüklenmiş bir sürümü çıkarım yoluna bağlar ve kayda ekler."""
+        if INFERENCE_MODE != "process" and model.batcher is None:
+            # Eşzamanlı istekleri tek bir ileri geçişte toplamak için sürüme ait mikro-batch zamanlayıcısı
+            model.start_batcher()
+        self.models.register(model)
+        print(f"Image classifier loaded: {model.version} = {model.model_name} (backend: {model.backend_name}, "
+              f"inference mode: {INFERENCE_MODE}, preprocess: {'fast' if model.fast_preprocessor is not None else 'hf'})")
+
+    def load_model(self, version: str, model_name: str, backend_name: str = CLASSIFIER_BACKEND, warmup: bool = MODEL_WARMUP) -> Dict:
+        """Çalışma sırasında yeni bir sınıflandırıcı sürümünü belleğe yükler (etkin sürüm değişmez)."""
+        if self.process_pool is not None:
+            # İşçiler yalnızca havuz başlatılırken yüklü olan sürümleri yükler
+            raise ValueError("process modunda yalnızca başlangıçta (CLASSIFIER_MODELS) yüklenen sürümler kullanılabilir.")
+        if any(model.version == version for model in self.models.versions()):
+            raise ValueError(f"Sürüm zaten yüklü: {version}")
+        model = ModelVersion.load(version, model_name, backend_name)
+        # Sürüm, ısıtma geçişi tamamlanmadan etkinleştirilemesin diye kayda en son eklenir
+        model.start_batcher()
+        if warmup:
+            self._warmup(model)
+        try:
+            self._attach(model)
+        except ValueError:
+            model.batcher.close()
+            raise
+        return model.describe()
+
+    def _warmup(self, model: ModelVersion) -> None:
+        """Boş bir görüntüyle tek bir ileri geçiş yaparak ilk isteğin soğuk başlangıç maliyetini öder."""
+        width, height = model.target_size() or (224, 224)
+        blank = io.BytesIO()
+        Image.new("RGB", (width, height)).save(blank, format="JPEG")
+        self._classify_image(blank.getvalue(), model=model, record_tta=False)
+
+    def inference_stats(self) -> Optional[Dict]:
+        """Etkin çıkarım yolunun (mikro-batch veya süreç havuzu) ve çok görünümlü sınıflandırmanın istatistiklerini döndürür."""
+        if self.process_pool is not None:
+            # Süreç modunda çok görünümlü sınıflandırma işçilerde yapılır; sayaçları burada görünmez
+            return self.process_pool.stats()
+        active = self.models.active
+        if active is not None and active.batcher is not None:
+            return {**active.batcher.stats(), "model_version": active.version, "tta": self.tta.stats()}
+        return None
 
     def analyze_image(self, image_b64: str, user_id: Optional[str] = None, symptom: Optional[str] = None) -> Dict:
         """Base64 formatındaki diş görüntüsünü analiz eder ve sonuçları döndürür."""
         try:
-            if self.image_processor is None or self.image_classifier is None:
-                return {"error": "Görüntü sınıflandırma modeli yüklenemedi.", "success": False}
-            
-            # Base64 formatındaki görüntüyü çözer ve modelin anlayacağı formata getirir
-            data_part = image_b64.split(',')[1] if ',' in image_b64 else image_b64
-            image_data = base64.b64decode(data_part)
-            image = Image.open(io.BytesIO(image_data)).convert("RGB")
-            
-            inputs = self.image_processor(images=image, return_tensors="pt")
-            with torch.no_grad():
-                outputs = self.image_classifier(**inputs)
-                logits = outputs.logits
-                probs = torch.nn.functional.softmax(logits, dim=1).squeeze().tolist()
-            
-            # %1'den düşük olasılıkları filtreler ve en yüksek olasılıklı sonuçları alır
-            filtered_probs = {k: v for k, v in zip(ID_TO_LABEL.keys(), probs) if v >= 0.01}
-            topk = sorted(filtered_probs.items(), key=lambda x: x[1], reverse=True)[:3]
-            topk_labels = [f"{ID_TO_LABEL[k]['tr']}: {v*100:.1f}%" for k, v in topk]
-            all_predictions = {
-                "tr": {ID_TO_LABEL[k]["tr"]: round(v * 100, 2) for k, v in filtered_probs.items()},
-                "en": {ID_TO_LABEL[k]["en"]: round(v * 100, 2) for k, v in filtered_probs.items()}
-            }
+            image_data = self._decode_base64(image_b64)
+        except Exception as e:
+            return {"error": f"Analiz hatası: {str(e)}", "success": False}
+        return self.analyze_image_bytes(image_data, user_id, symptom)
+
+    async def analyze_image_async(self, image_b64: str, user_id: Optional[str] = None, symptom: Optional[str] = None, executor=None, defer_comment: bool = False, deadline: Optional[float] = None, on_classified: Optional[Callable[[], None]] = None) -> Dict:
+        """`analyze_image` metodunun asenkron sürümü; base64 çözümlemesi ve sınıflandırma `executor` üzerinde çalışır."""
+        try:
+            loop = asyncio.get_running_loop()
+            image_data = await loop.run_in_executor(executor, self._decode_base64, image_b64)
+        except Exception as e:
+            return {"error": f"Analiz hatası: {str(e)}", "success": False}
+        return await self.analyze_image_bytes_async(image_data, user_id, symptom, executor, defer_comment, deadline, on_classified)
+
+    def analyze_image_bytes(self, image_data: Union[bytes, BinaryIO], user_id: Optional[str] = None, symptom: Optional[str] = None) -> Dict:
+        """Ham (sıkıştırılmış) görüntü baytlarını veya dosya benzeri bir nesneyi analiz eder ve sonuçları döndürür."""
+        try:
+            error = self._readiness_error()
+            if error is not None:
+                return error
+            image_key, classification = self._classification_phase(image_data)
             
             # En yüksek olasılıklı soruna göre özet ve haftalık plan oluşturur
-            top_issue = ID_TO_LABEL[topk[0][0]]["tr"] if topk else None
-            summary_data = self._generate_enhanced_summary(", ".join(topk_labels), top_issue, user_id)
+            commentary_key = self._commentary_cache_key(image_key, user_id)
+            summary_data = self.commentary_cache.get(commentary_key)
+            if summary_data is None:
+                predictions = Prediction.list_from(classification)
+                with span("summary"):
+                    summary_data = self._llm_summary(predictions, user_id, self._summary_cache_key(classification, user_id))
+                # Yalnızca LLM özeti önbelleğe alınır; yedek metin bir sonraki istekte LLM'in yeniden denenmesini engellemez
+                if summary_data is not None:
+                    self.commentary_cache.put(commentary_key, summary_data)
+                else:
+                    summary_data = self._fallback_summary(predictions)
             
-            # Analiz sonucunu kullanıcının geçmişine kaydeder
-            if user_id:
-                if user_id not in self.user_memory:
-                    self.user_memory[user_id] = []
-                self.user_memory[user_id].append({"user": f"Scan: {', '.join(topk_labels)}", "ai": f"Plan for {top_issue or 'healthy'}."})
+            return self._build_result(classification, summary_data, user_id, symptom)
             
-            # İstemciye gönderilecek sonuç sözlüğünü hazırlar
-            result = {
-                "top_predictions": topk_labels,  # Etiketler Türkçe
-                "all_predictions": all_predictions,  # Türkçe ve İngilizce
-                "dental_comment": summary_data["comment"],
-                "weekly_plan": summary_data["plan"],
-                "video_suggestion": VIDEO_LINKS.get(top_issue, "https://www.youtube.com/results?search_query=genel+di%C5%9F+bak%C4%B1m%C4%B1"),
-                "success": True
-            }
+        except Exception as e:
+            return {"error": f"Analiz hatası: {str(e)}", "success": False}
+
+    async def analyze_image_bytes_async(self, image_data: Union[bytes, BinaryIO], user_id: Optional[str] = None, symptom: Optional[str] = None, executor=None, defer_comment: bool = False, deadline: Optional[float] = None, on_classified: Optional[Callable[[], None]] = None) -> Dict:
+        """Sınıflandırmayı `executor` üzerinde, LLM özetini ise iş parçacığı işgal etmeden asenkron olarak çalıştırır.
+
+        `defer_comment` True ise tahminler, kural tabanlı plan ve video önerisi hemen döndürülür; yorum ise
+        arka planda üretilir ve `comment_job_id` ile yoklanabilir veya SSE ile akış halinde alınabilir.
+        `deadline` (`time.monotonic()` cinsinden) ileri geçişten önce geçmişse `DeadlineExceeded` fırlatılır.
+        `on_classified`, sınıflandırma bitip özet üretimine geçilmeden önce çağrılır (ör. kabul yerini bırakmak için).
+        """
+        try:
+            error = self._readiness_error()
+            if error is not None:
+                return error
+            loop = asyncio.get_running_loop()
+            image_key, classification = await loop.run_in_executor(executor, self._classification_phase, image_data, deadline)
+            if on_classified is not None:
+                on_classified()
             
-            # Eğer kullanıcı ek bir semptom belirtmişse, ona özel bir tavsiye ekler
-            if symptom:
-                symptom_advice = self._handle_symptom(symptom, top_issue or "Sağlıklı")
-                result["symptom_advice"] = symptom_advice
+            commentary_key = self._commentary_cache_key(image_key, user_id)
+            summary_data = self.commentary_cache.get(commentary_key)
+            if summary_data is None and defer_comment:
+                predictions = Prediction.list_from(classification)
+                job = comment_jobs.start(self.stream_comment(predictions, user_id))
+                summary_data = {"comment": None, "plan": self._generate_personalized_plan(predictions[0] if predictions else None)}
+                result = self._build_result(classification, summary_data, user_id, symptom)
+                result["comment_job_id"] = job.id
+                return result
+            if summary_data is None:
+                predictions = Prediction.list_from(classification)
+                with span("summary"):
+                    summary_data = await self._llm_summary_async(predictions, user_id, self._summary_cache_key(classification, user_id))
+                if summary_data is not None:
+                    self.commentary_cache.put(commentary_key, summary_data)
+                else:
+                    summary_data = self._fallback_summary(predictions)
             
-            return result
+            return self._build_result(classification, summary_data, user_id, symptom)
             
+        except DeadlineExceeded:
+            raise
         except Exception as e:
             return {"error": f"Analiz hatası: {str(e)}", "success": False}
+
+    def _readiness_error(self) -> Optional[Dict]:
+        """Model kullanıma hazır değilse istemciye dönecek hata sözlüğünü, hazırsa None döndürür."""
+        # Sunucu dışında (ör. betiklerden) kullanıldığında model ilk istekte eşzamanlı olarak yüklenir
+        if self.load_state == "pending":
+            self.load()
+        if self.is_ready:
+            return None
+        if self.load_state == "failed":
+            return {"error": "Görüntü sınıflandırma modeli yüklenemedi.", "success": False}
+        return {"error": "Görüntü sınıflandırma modeli henüz yükleniyor.", "success": False}
+
+    def _classification_phase(self, image_data: Union[bytes, BinaryIO], deadline: Optional[float] = None) -> Tuple[str, Dict]:
+        """Görüntünün sürüme özgü önbellek anahtarını ve (önbellekten veya modelden) sınıflandırma sonucunu döndürür."""
+        # Aynı fotoğrafın tekrar yüklenmesinde çözümleme ve ileri geçiş önbellekten atlanır
+        with span("classification"), self.models.lease() as model:
+            image_key = self._image_digest(image_data)
+            cache_key = self._classifier_cache_key(model, image_key)
+            classification = self.classifier_cache.get(cache_key)
+            if classification is None:
+                # Havuz kuyruğunda beklerken süresi dolan istekler için çözümleme ve ileri geçiş yapılmaz
+                check_deadline(deadline)
+                started_at = time.perf_counter()
+                probs = self._classify_image(image_data, deadline, model)
+                primary_ms = (time.perf_counter() - started_at) * 1000.0
+                classification = summarize_probabilities([probs])[0]
+                classification["model_version"] = model.version
+                self.classifier_cache.put(cache_key, classification)
+                # Örneklenen isteklerde aday sürüm, yanıt beklenmeden arka planda aynı görüntüyle çalıştırılır
+                if self.models.shadow.version is not None:
+                    self.models.shadow.maybe_submit(self.models, model, self._image_bytes(image_data), probs, primary_ms,
+                                                    lambda candidate, data: self._classify_image(data, model=candidate, record_tta=False))
+        # Yorum önbelleği de bu anahtarı kullanır; sürüm değişince eski sürümün yorumu döndürülmez
+        return cache_key, classification
+
+    def prepare_image(self, image_data: Union[bytes, BinaryIO], model: ModelVersion) -> Tuple[str, Optional[Dict], Optional["torch.Tensor"], Optional[Image.Image]]:
+        """Toplu analizin ön getirme aşaması: görüntü özeti, önbellekteki sonuç, (önbellekte yoksa) piksel tensörü ve
+        (çok görünümlü sınıflandırma açıksa) artırılmış görünümler için çözülmüş görüntü."""
+        image_key = self._image_digest(image_data)
+        classification = self.classifier_cache.get(self._classifier_cache_key(model, image_key))
+        if classification is not None:
+            return image_key, classification, None, None
+        with span("image_decode"):
+            image = self._decode_image(image_data, model)
+        with span("preprocess"):
+            # Tensör ön getirme kuyruğunda bekleyeceğinden paylaşılan tampon kullanılmaz
+            pixel_values = model.preprocess([image])
+        return image_key, None, pixel_values, image if self.tta.enabled else None
+
+    def classify_prepared(self, items: List[Tuple[str, "torch.Tensor", Optional[Image.Image]]], model: ModelVersion) -> List[Dict]:
+        """Ön işlenmiş (özet, piksel tensörü, görüntü) üçlülerini tek ileri geçişte sınıflandırır ve önbelleğe yazar.
+
+        Sonuçlar tekil isteklerle aynı önbellek anahtarına yazıldığından, güveni düşük görüntüler tekil yoldaki gibi
+        artırılmış görünümlerle yeniden sınıflandırılır.
+        """
+        # Olasılık satırları tek bir matris olarak işlenir; satır başına sözlük/sıralama döngüsü yapılmaz
+        with span("inference"):
+            if model.batcher is not None:
+                # İleri geçiş, torch iş parçacığı havuzunu paylaşmamak için tekil isteklerle aynı mikro-batch
+                # iş parçacığında yapılır; girdiler birlikte kuyruğa eklendiğinden tek batch halinde birleşir
+                futures = [model.batcher.submit(pixel_values) for _, pixel_values, _ in items]
+                probs = [future.result() for future in futures]
+            else:
+                # process modunda ebeveyn süreçte mikro-batch iş parçacığı yoktur; ileri geçiş doğrudan yapılır
+                probs = model.classify_batch([pixel_values for _, pixel_values, _ in items])
+        if self.tta.enabled:
+            run_views = self._view_runner(model)
+            probs = [self._maybe_augment(model, image, row, run_views) for (_, _, image), row in zip(items, probs)]
+        classifications = summarize_probabilities(probs)
+        for (image_key, _, _), classification in zip(items, classifications):
+            classification["model_version"] = model.version
+            self.classifier_cache.put(self._classifier_cache_key(model, image_key), classification)
+        return classifications
+
+    def summarize(self, classification: Dict, user_id: Optional[str] = None) -> Dict:
+        """Sınıflandırma sonucu için (LLM veya kural tabanlı) yorum ve 7 günlük planı üretir."""
+        return self._generate_enhanced_summary(
+            Prediction.list_from(classification), user_id, self._summary_cache_key(classification, user_id)
+        )
+
+    def _build_result(self, classification: Dict, summary_data: Dict, user_id: Optional[str], symptom: Optional[str]) -> Dict:
+        """Sınıflandırma ve özet verisinden istemciye gönderilecek sonucu hazırlar ve kullanıcı geçmişini günceller."""
+        topk_labels = classification["top_predictions"]
+        top_issue = classification["top_issue"]
+        
+        # Analiz sonucunu kullanıcının geçmişine kaydeder
+        if user_id:
+            self.history.append(user_id, {"user": f"Scan: {', '.join(topk_labels)}", "ai": f"Plan for {top_issue or 'healthy'}."})
+        
+        # İstemciye gönderilecek sonuç sözlüğünü hazırlar
+        result = {
+            "top_predictions": topk_labels,  # Etiketler Türkçe
+            "all_predictions": classification["all_predictions"],  # Türkçe ve İngilizce
+            "dental_comment": summary_data["comment"],
+            "weekly_plan": summary_data["plan"],
+            "video_suggestion": self.templates.video(self.templates.label_index.get(top_issue)),
+            "model_version": classification.get("model_version"),
+            "success": True
+        }
+        
+        # Eğer kullanıcı ek bir semptom belirtmişse, ona özel bir tavsiye ekler
+        if symptom:
+            with span("symptom"):
+                symptom_advice = self._handle_symptom(symptom, top_issue)
+            result["symptom_advice"] = symptom_advice
+        
+        return result
     
-    def _generate_enhanced_summary(self, findings_text: str, top_issue: Optional[str], user_id: Optional[str]) -> Dict:
+    def _classify_image(self, image_data: Union[bytes, BinaryIO], deadline: Optional[float] = None,
+                        model: Optional[ModelVersion] = None, record_tta: bool = True) -> List[float]:
+        """Görüntüyü verilen (varsayılan: etkin) sürümle, etkin çıkarım yolunda sınıflandırır ve olasılık satırını döndürür."""
+        model = model or self.models.active
+        if self.process_pool is not None:
+            # Çözümleme ve ön işleme de işçi süreçte yapıldığından tek bir aşama olarak ölçülür
+            with span("inference"):
+                return self.process_pool.run(self._image_bytes(image_data), model.version)
+        # Görüntüyü modelin giriş çözünürlüğüne yakın boyutta çözer ve modelin anlayacağı formata getirir
+        with span("image_decode"):
+            image = self._decode_image(image_data, model)
+        with span("preprocess"):
+            # Batch birleştirilirken tensör kopyalandığından iş parçacığının yeniden kullanılan tamponu güvenle kullanılır
+            pixel_values = model.preprocess([image], reuse_buffer=True)
+        # İleri geçiş, bekleyen diğer isteklerle birlikte tek bir batch halinde çalıştırılır (batch bekleme süresi dahil)
+        with span("inference"):
+            probs = model.batcher.run(pixel_values, deadline=deadline)
+        return self._maybe_augment(model, image, probs, self._view_runner(model, deadline), record_tta)
+
+    def _infer_local(self, image_data: bytes, version: Optional[str] = None) -> List[float]:
+        """İşçi süreçlerde çalışan tam çıkarım yolu: çözümleme, ön işleme ve tekil ileri geçiş."""
+        # İşçiler başlatma anındaki sürümleri yükler; etkin sürüm her işle birlikte ebeveynden gelir
+        model = self.models.get(version) if version else self.models.active
+        image = self._decode_image(image_data, model)
+        probs = model.classify_batch([model.preprocess([image], reuse_buffer=True)])[0]
+        return self._maybe_augment(model, image, probs, self._view_runner(model))
+
+    @staticmethod
+    def _view_runner(model: ModelVersion, deadline: Optional[float] = None) -> Callable[["torch.Tensor"], List]:
+        """Artırılmış görünümlerin piksel tensörünü sınıflandıran fonksiyonu döndürür."""
+        if model.batcher is None:
+            # İşçi süreçlerde ve process modunun ebeveyninde görünümler doğrudan tek bir ileri geçişte çalıştırılır
+            return lambda view_pixels: model.classify_batch([view_pixels])
+
+        def run_views(view_pixels):
+            # Görünümler aynı anda kuyruğa eklendiğinden mikro-batch penceresinde tek ileri geçişte birleşir
+            futures = [model.batcher.submit(view_pixels[i:i + 1], deadline) for i in range(len(view_pixels))]
+            return [future.result() for future in futures]
+
+        return run_views
+
+    def _maybe_augment(self, model: ModelVersion, image: Image.Image, probs, run_views, record: bool = True) -> List[float]:
+        """Tek görünümün güveni eşiğin altındaysa artırılmış görünümleri `run_views` ile sınıflandırıp ortalamayı döndürür."""
+        # Isınma ve gölge değerlendirmesindeki çalıştırmalar TTA sayaçlarına yazılmaz (`record=False`)
+        if not self.tta.should_augment(probs, count=record):
+            return probs
+        started_at = time.perf_counter()
+        with span("tta"):
+            view_pixels = model.preprocess(self.tta.augment(image), reuse_buffer=True)
+            final = self.tta.combine(probs, run_views(view_pixels))
+        if record:
+            self.tta.record(probs, final, time.perf_counter() - started_at)
+        return final
+
+    @staticmethod
+    def _decode_base64(image_b64: str) -> bytes:
+        """"data:image/jpeg;base64," önekini liste oluşturmadan atlayıp görüntüyü tek seferde çözer."""
+        with span("b64_decode"):
+            comma = image_b64.find(',')
+            return base64.b64decode(image_b64[comma + 1:] if comma != -1 else image_b64)
+
+    @staticmethod
+    def _image_digest(image_data: Union[bytes, BinaryIO]) -> str:
+        """Sıkıştırılmış görüntü baytlarının SHA-256 özetini, tamponu kopyalamadan hesaplar."""
+        if isinstance(image_data, (bytes, bytearray, memoryview)):
+            return hashlib.sha256(image_data).hexdigest()
+        if isinstance(image_data, io.BytesIO):
+            with image_data.getbuffer() as view:
+                return hashlib.sha256(view).hexdigest()
+        # Diğer dosya benzeri nesneler okunup başa sarılır
+        position = image_data.tell()
+        digest = hashlib.sha256(image_data.read()).hexdigest()
+        image_data.seek(position)
+        return digest
+
+    @staticmethod
+    def _image_bytes(image_data: Union[bytes, BinaryIO]) -> bytes:
+        """Görüntüyü başka bir sürece / iş parçacığına aktarılabilecek bayt dizisi olarak döndürür."""
+        if isinstance(image_data, bytes):
+            return image_data
+        if isinstance(image_data, io.BytesIO):
+            return image_data.getvalue()
+        image_data.seek(0)
+        return image_data.read()
+
+    @staticmethod
+    def _classifier_cache_key(model: ModelVersion, image_key: str) -> str:
+        """Sınıflandırıcı önbelleği anahtarı; sürüm değişiminden sonra eski sürümün sonuçları döndürülmez."""
+        return f"{model.version}|{image_key}"
+
+    @staticmethod
+    def _commentary_cache_key(classifier_key: str, user_id: Optional[str]) -> str:
+        """Yorum önbelleği anahtarı; semptom tavsiyesi özetten sonra eklendiğinden semptom anahtara dahil değildir."""
+        return f"{classifier_key}|{user_id or ''}"
+
+    def _decode_image(self, image_data: Union[bytes, BinaryIO], model: Optional[ModelVersion] = None) -> Image.Image:
+        """Görüntüyü çözer; JPEG'lerde draft modu ile doğrudan hedef çözünürlüğe yakın küçültülmüş çözümleme yapar."""
+        source = io.BytesIO(image_data) if isinstance(image_data, (bytes, bytearray, memoryview)) else image_data
+        image = Image.open(source)
+        target_size = (model or self.models.active).target_size()
+        if target_size is not None:
+            # JPEG dışındaki formatlarda draft çağrısı etkisizdir; çözümleme tam çözünürlükte yapılır
+            image.draft("RGB", target_size)
+        return image.convert("RGB")
+
+    def _summary_cache_key(self, classification: Dict, user_id: Optional[str] = None) -> str:
+        """LLM yanıt önbelleği anahtarı: istem şablonu sürümü, kullanıcı, geçmişin özeti, ana sorun ve %10'luk
+        dilimlere yuvarlanmış bulgular.
+
+        İstem kullanıcının kimliğini ve geçmişini içerdiğinden bir kullanıcıya üretilen metin başka bir kullanıcıya
+        veya geçmişi değişmiş aynı kullanıcıya (önbellekten ya da birleştirilmiş istekten) dönmez.
+        """
+        buckets = ",".join(str(int(p * 10)) for p in classification["probs"])
+        history_digest = hashlib.sha256(self._history_text(user_id).encode("utf-8")).hexdigest()[:16]
+        return f"summary:v{SUMMARY_PROMPT_VERSION}|{user_id or '-'}|{history_digest}|{classification['top_issue'] or '-'}|{buckets}"
+
+    def _history_text(self, user_id: Optional[str]) -> str:
+        """Kullanıcının son 3 etkileşimini istemlere eklenecek metin olarak döndürür."""
+        history = self.history.recent(user_id, 3) if user_id else []
+        return "\n".join([f"Önceki: {msg['user']} -> {msg['ai']}" for msg in history]) if history else "Yeni kullanıcı."
+
+    def _summary_prompt(self, predictions: Sequence[Prediction], user_id: Optional[str]) -> str:
+        """Kullanıcının geçmişini de içeren özet ve 7 günlük plan istemini oluşturur."""
+        findings_text = ", ".join(map(str, predictions))
+        top_issue = predictions[0].label_tr if predictions else None
+        # Kullanıcının son 3 etkileşimini geçmiş deposundan alarak prompt'a ekler
+        history_str = self._history_text(user_id)
+        
+        return (
+            "Sen kişisel diş koçu asistanısın. Tarama sonuçlarına göre motive edici, detaylı TÜRKÇE özet ve 7 günlük kişiselleştirilmiş bakım planı üret. "
+            f"Tarihçe: {history_str}\n\n"
+            f"Sonuçlar: {findings_text}. Ana sorun: {top_issue or 'Sağlıklı görünüm'}. Semptom: {user_id or 'Yok'}\n\n"
+            "Özet: Riskleri, önerileri ve motivasyonu içersin (200 kelime max).\n"
+            "Plan: 7 gün için JSON array: [{'day': 'Pazartesi', 'task': 'Kısa, actionable görev'}]. Görevler çeşitlilikli, ana soruna odaklansın, hekime yönlendirsin.\n\n"
+            "Sadece JSON dön: {'comment': 'Özet metni', 'plan': [array]}"
+        )
+
+    def _parse_summary(self, response_text: str, top: Optional[Prediction]) -> Optional[Dict]:
+        """LLM yanıtındaki JSON özetini ayıklar; ayrıştırılamazsa None döndürür."""
+        try:
+            # Gemini'nin yanıtından JSON formatındaki veriyi ayıklar
+            json_start = response_text.find('{')
+            json_end = response_text.rfind('}') + 1
+            if json_start != -1 and json_end != 0:
+                parsed = json.loads(response_text[json_start:json_end])
+                # Planın 7 günlük olduğundan emin olur, değilse yedek planı kullanır
+                if len(parsed.get("plan", [])) != 7:
+                    parsed["plan"] = self._generate_personalized_plan(top)
+                return parsed
+        except json.JSONDecodeError:
+            print("Gemini JSON parse failed, using fallback.")
+        return None
+
+    def _fallback_summary(self, predictions: Sequence[Prediction]) -> Dict:
+        """Gemini başarısız olursa veya mevcut değilse kullanılan kural tabanlı özet ve plan."""
+        base_comment = self._generate_detailed_comment(predictions)
+        plan = self._generate_personalized_plan(predictions[0] if predictions else None)
+        return {"comment": base_comment, "plan": plan}
+
+    def _generate_enhanced_summary(self, predictions: Sequence[Prediction], user_id: Optional[str], cache_key: Optional[str] = None) -> Dict:
         """Gemini kullanarak veya kural tabanlı bir yedek sistemle kişiselleştirilmiş özet ve plan oluşturur."""
-        if self.gemini_model is not None:
+        # Gemini başarısız olursa veya mevcut değilse, kural tabanlı yedek sistemi çalıştırır
+        return self._llm_summary(predictions, user_id, cache_key) or self._fallback_summary(predictions)
+
+    def _llm_summary(self, predictions: Sequence[Prediction], user_id: Optional[str], cache_key: Optional[str] = None) -> Optional[Dict]:
+        """Özet ve planı Gemini ile üretir; LLM yoksa, hata verirse veya yanıt ayrıştırılamazsa None döndürür."""
+        if not self.llm.available:
+            return None
+        try:
+            response_text = self.llm.generate_sync(self._summary_prompt(predictions, user_id), cache_key)
+            return self._parse_summary(response_text, predictions[0] if predictions else None)
+        except Exception as e:
+            print(f"Gemini error: {e}")
+            return None
+
+    async def _llm_summary_async(self, predictions: Sequence[Prediction], user_id: Optional[str], cache_key: Optional[str] = None) -> Optional[Dict]:
+        """`_llm_summary` metodunun LLM'i asenkron istemciyle çağıran sürümü."""
+        if not self.llm.available:
+            return None
+        try:
+            response_text = await self.llm.generate(self._summary_prompt(predictions, user_id), cache_key)
+            return self._parse_summary(response_text, predictions[0] if predictions else None)
+        except Exception as e:
+            print(f"Gemini error: {e}")
+            return None
+
+    def _comment_prompt(self, predictions: Sequence[Prediction], user_id: Optional[str]) -> str:
+        """Akış halinde üretilecek, yalnızca düz metin özetten oluşan yorum istemini oluşturur."""
+        findings_text = ", ".join(map(str, predictions))
+        top_issue = predictions[0].label_tr if predictions else None
+        history_str = self._history_text(user_id)
+        return (
+            "Sen kişisel diş koçu asistanısın. Tarama sonuçlarına göre motive edici, detaylı TÜRKÇE bir özet yaz. "
+            f"Tarihçe: {history_str}\n\n"
+            f"Sonuçlar: {findings_text}. Ana sorun: {top_issue or 'Sağlıklı görünüm'}.\n\n"
+            "Özet: Riskleri, önerileri ve motivasyonu içersin (200 kelime max). Sadece düz metin dön, JSON kullanma."
+        )
+
+    def stream_comment(self, predictions: Sequence[Prediction], user_id: Optional[str]) -> AsyncIterator[str]:
+        """Yorumu LLM'den parça parça üreten akışı döndürür; LLM yoksa veya ilk parçadan önce hata olursa kural tabanlı yorumu verir."""
+        # İstem hemen (kullanıcı geçmişi bu taramayla güncellenmeden önce) oluşturulur
+        prompt = self._comment_prompt(predictions, user_id) if self.llm.available else None
+        return self._stream_comment(prompt, predictions)
+
+    async def _stream_comment(self, prompt: Optional[str], predictions: Sequence[Prediction]) -> AsyncIterator[str]:
+        if prompt is not None:
+            emitted = False
             try:
-                # Kullanıcının son 3 etkileşimini bellekten alarak prompt'a ekler
-                history = self.user_memory.get(user_id, [])[-3:] if user_id and self.user_memory.get(user_id) else []
-                history_str = "\n".join([f"Önceki: {msg['user']} -> {msg['ai']}" for msg in history]) if history else "Yeni kullanıcı."
-                
-                prompt = (
-                    "Sen kişisel diş koçu asistanısın. Tarama sonuçlarına göre motive edici, detaylı TÜRKÇE özet ve 7 günlük kişiselleştirilmiş bakım planı üret. "
-                    f"Tarihçe: {history_str}\n\n"
-                    f"Sonuçlar: {findings_text}. Ana sorun: {top_issue or 'Sağlıklı görünüm'}. Semptom: {user_id or 'Yok'}\n\n"
-                    "Özet: Riskleri, önerileri ve motivasyonu içersin (200 kelime max).\n"
-                    "Plan: 7 gün için JSON array: [{'day': 'Pazartesi', 'task': 'Kısa, actionable görev'}]. Görevler çeşitlilikli, ana soruna odaklansın, hekime yönlendirsin.\n\n"
-                    "Sadece JSON dön: {'comment': 'Özet metni', 'plan': [array]}"
-                )
-                
-                gemini_resp = self.gemini_model.generate_content(prompt)
-                response_text = getattr(gemini_resp, "text", "")
-                try:
-                    # Gemini'nin yanıtından JSON formatındaki veriyi ayıklar
-                    json_start = response_text.find('{')
-                    json_end = response_text.rfind('}') + 1
-                    if json_start != -1 and json_end != 0:
-                        parsed = json.loads(response_text[json_start:json_end])
-                        # Planın 7 günlük olduğundan emin olur, değilse yedek planı kullanır
-                        if len(parsed.get("plan", [])) != 7:
-                            parsed["plan"] = self._generate_personalized_plan(top_issue)
-                        return parsed
-                except json.JSONDecodeError:
-                    print("Gemini JSON parse failed, using fallback.")
+                async for chunk in self.llm.stream(prompt):
+                    emitted = True
+                    yield chunk
+                return
             except Exception as e:
-                print(f"Gemini error: {e}")
+                print(f"Gemini stream error: {e}")
+                if emitted:
+                    raise
+        yield self._generate_detailed_comment(predictions)
 
-        # Gemini başarısız olursa veya mevcut değilse, kural tabanlı yedek sistemi çalıştırır
-        base_comment = self._generate_detailed_comment(findings_text, top_issue)
-        plan = self._generate_personalized_plan(top_issue)
-        return {"comment": base_comment, "plan": plan}
-
-    def _generate_detailed_comment(self, findings_text: str, top_issue: Optional[str]) -> str:
+    def _generate_detailed_comment(self, predictions: Sequence[Prediction]) -> str:
         """Kural tabanlı olarak, tespit edilen duruma göre detaylı bir açıklama metni oluşturur."""
-        explanations = {
-            "Diş Taşı (Calculus)": (
-                "Diş taşları, diş yüzeyinde biriken sertleşmiş plaklardır. Diş eti hastalıklarına yol açabilir ve düzenli temizlik gerektirir. "
-                "Risk: Diş eti çekilmesi ve enfeksiyon. "
-                "Öneri: Diş hekiminizde profesyonel temizlik yaptırın ve günlük ağız hijyenine özen gösterin."
-            ),
-            "Diş Çürüğü (Karies)": (
-                "Diş çürüğü, diş minesinde asitler nedeniyle oluşan oyuklardır. Erken müdahale edilmezse ağrı ve enfeksiyona yol açabilir. "
-                "Risk: Çürüklerin ilerlemesi ve diş kaybı. "
-                "Öneri: Şekerli gıdalardan kaçının, florürlü diş macunu kullanın ve diş hekiminize başvurun."
-            ),
-            "Diş Eti İltihabı (Gingivitis)": (
-                "Diş eti iltihabı, diş etlerinde kızarıklık, şişlik ve kanamaya neden olur. Uygun bakım ile iyileşme mümkündür. "
-                "Risk: Diş eti çekilmesi ve periodontitis. "
-                "Öneri: Yumuşak bir fırça ile nazikçe fırçalayın ve diş ipi kullanın."
-            ),
-            "Aft (Ağız Yarası)": (
-                "Aft, ağız içinde oluşan ağrılı yaralardır. Genellikle stres, vitamin eksikliği veya travmadan kaynaklanır. "
-                "Risk: Konfor kaybı ve hassasiyet. "
-                "Öneri: Tuzlu suyla gargara yapın ve tahriş edici yiyeceklerden kaçının."
-            ),
-            "Diş Renklenmesi": (
-                "Diş renklenmesi, çay, kahve, sigara veya yapısal nedenlerden kaynaklanabilir. Estetik bir sorundur. "
-                "Risk: Estetik kaygı ve özgüven kaybı. "
-                "Öneri: Beyazlatıcı diş macunu kullanın ve profesyonel temizlik için diş hekiminize danışın."
-            ),
-            "Hipodonti (Eksik Diş)": (
-                "Hipodonti, doğuştan bir veya daha fazla dişin eksik olmasıdır. Fonksiyonel ve estetik sorunlara yol açabilir. "
-                "Risk: Çiğneme ve konuşma zorlukları. "
-                "Öneri: Ortodontik veya protetik tedavi için diş hekiminize başvurun."
-            ),
-        }
-        
-        if top_issue and top_issue in explanations:
-            top_prob = findings_text.split(",")[0].split(":")[1].strip() if findings_text else "N/A"
-            secondary_issues = findings_text.split(",")[1:] if "," in findings_text else []
-            comment = (
-                f"Analiz sonuçlarınızı inceledim. Sonuçlara göre, en yüksek olasılıkla {top_prob} ile *{top_issue}* tespit edildi. "
-                f"{explanations[top_issue]}\n\n"
-            )
-            if secondary_issues:
-                comment += (
-                    f"İkinci en olası bulgu ise {secondary_issues[0].split(':')[1].strip()} ile *{secondary_issues[0].split(':')[0].strip()}*. "
-                    f"{explanations.get(secondary_issues[0].split(':')[0].strip(), 'Bu durum genellikle ciddi değildir, ancak dikkat edilmelidir.')}\n\n"
-                )
-            comment += (
-                "Diğer olasılıklar %1'in altında olduğu için değerlendirmeye alınmamıştır.\n\n"
-                "Size detaylı bir tedavi planı sunabilmem için en kısa sürede bir diş hekimine başvurmanız önemlidir. "
-                "Erken teşhis ve tedavi ile bu durumu kolayca çözebiliriz. Sorularınız varsa lütfen çekinmeden sorun!"
-            )
-        else:
-            comment = (
-                "Analiz sonuçlarınızı inceledim. Dişleriniz genel olarak sağlıklı görünüyor! "
-                f"Detaylı sonuçlar: {findings_text}\n\n"
-                "Yine de düzenli diş hekimi kontrollerini ihmal etmeyin. "
-                "Ağız hijyenine devam ederek bu sağlıklı durumu koruyabilirsiniz. Sorularınız varsa lütfen çekinmeden sorun!"
-            )
-        return comment
-
-    def _generate_personalized_plan(self, top_issue: Optional[str]) -> list:
+        top = predictions[0] if predictions else None
+        second = predictions[1] if len(predictions) > 1 else None
+        return self.templates.comment(
+            (top.label_id, top.percent_text) if top is not None else None,
+            (second.label_id, second.percent_text) if second is not None else None,
+            findings=", ".join(map(str, predictions)),
+        )
+
+    def _generate_personalized_plan(self, top: Optional[Prediction]) -> list:
         """Kural tabanlı olarak, tespit edilen duruma özel 7 günlük bir bakım planı oluşturur."""
-        day_tasks = {
-            "Diş Taşı (Calculus)": [
-                {"day": "Pazartesi", "task": "Diş hekiminizden profesyonel temizlik randevusu alın."},
-                {"day": "Salı", "task": "Diş aralarını diş ipi veya ara yüz fırçasıyla temizleyin."},
-                {"day": "Çarşamba", "task": "Elektrikli diş fırçası ile 2 dakika fırçalayın."},
-                {"day": "Perşembe", "task": "Antibakteriyel ağız gargarası kullanın."},
-                {"day": "Cuma", "task": "Şekerli ve yapışkan gıdalardan uzak durun."},
-                {"day": "Cumartesi", "task": "Parmakla diş eti masajı yaparak kan dolaşımını artırın."},
-                {"day": "Pazar", "task": "Diş fırçanızı kontrol edin, gerekirse yenileyin."},
-            ],
-            "Diş Çürüğü (Karies)": [
-                {"day": "Pazartesi", "task": "Florürlü diş macunu ile sabah ve akşam 2 dakika fırçalayın."},
-                {"day": "Salı", "task": "Diş ipi ile diş aralarını temizleyin."},
-                {"day": "Çarşamba", "task": "Şekerli içecek ve yiyecek tüketimini azaltın."},
-                {"day": "Perşembe", "task": "Bol su içerek ağız içini temiz tutun."},
-                {"day": "Cuma", "task": "Diş hekiminizden çürük kontrolü için randevu alın."},
-                {"day": "Cumartesi", "task": "Sebze ve meyve gibi sağlıklı atıştırmalıklar tüketin."},
-                {"day": "Pazar", "task": "Ağız gargarası ile bakımınızı destekleyin."},
-            ],
-            "Diş Eti İltihabı (Gingivitis)": [
-                {"day": "Pazartesi", "task": "Yumuşak kıllı fırça ile diş etlerinizi nazikçe fırçalayın."},
-                {"day": "Salı", "task": "Diş ipi ile nazikçe diş aralarını temizleyin."},
-                {"day": "Çarşamba", "task": "Antibakteriyel ağız gargarası kullanın."},
-                {"day": "Perşembe", "task": "C vitamini açısından zengin gıdalar (portakal, kivi) tüketin."},
-                {"day": "Cuma", "task": "Diş hekiminizden diş taşı temizliği randevusu alın."},
-                {"day": "Cumartesi", "task": "Diş eti masajı ile kan dolaşımını destekleyin."},
-                {"day": "Pazar", "task": "Diş eti kanaması devam ederse hekime başvurun."},
-            ],
-            "Aft (Ağız Yarası)": [
-                {"day": "Pazartesi", "task": "Tuzlu suyla günde 2 kez gargara yapın."},
-                {"day": "Salı", "task": "Asitli ve baharatlı yiyeceklerden kaçının."},
-                {"day": "Çarşamba", "task": "Yumuşak kıllı fırça ile nazikçe fırçalayın."},
-                {"day": "Perşembe", "task": "Soğuk ve yumuşak yiyecekler (yoğurt, smoothie) tüketin."},
-                {"day": "Cuma", "task": "B12 ve C vitamini takviyesi almayı düşünün."},
-                {"day": "Cumartesi", "task": "Stresi azaltmak için rahatlama teknikleri uygulayın."},
-                {"day": "Pazar", "task": "Aft 1 haftadan uzun sürerse hekime başvurun."},
-            ],
-            "Diş Renklenmesi": [
-                {"day": "Pazartesi", "task": "Çay, kahve ve sigara tüketimini azaltın."},
-                {"day": "Salı", "task": "Beyazlatıcı diş macunu ile 2 dakika fırçalayın."},
-                {"day": "Çarşamba", "task": "Diş hekiminizden profesyonel temizlik randevusu alın."},
-                {"day": "Perşembe", "task": "Bol su içerek ağız içini temiz tutun."},
-                {"day": "Cuma", "task": "Renklenmeye neden olan gıdalardan uzak durun."},
-                {"day": "Cumartesi", "task": "Diş ipi ile diş aralarını temizleyin."},
-                {"day": "Pazar", "task": "Beyazlatma seçenekleri için hekiminize danışın."},
-            ],
-            "Hipodonti (Eksik Diş)": [
-                {"day": "Pazartesi", "task": "Ortodontik muayene için diş hekiminden randevu alın."},
-                {"day": "Salı", "task": "Eksik dişlerin yerine tedavi seçeneklerini araştırın."},
-                {"day": "Çarşamba", "task": "Yumuşak kıllı fırça ile dişlerinizi fırçalayın."},
-                {"day": "Perşembe", "task": "Ağız hijyenine ekstra özen gösterin."},
-                {"day": "Cuma", "task": "Diş hekiminizle tedavi planınızı görüşün."},
-                {"day": "Cumartesi", "task": "Sağlıklı beslenmeye dikkat edin, kalsiyum alın."},
-                {"day": "Pazar", "task": "Düzenli diş kontrolü için plan yapın."},
-            ],
-        }
-        if top_issue in day_tasks:
-            return day_tasks[top_issue]
-        else:
-            return [
-                {"day": "Pazartesi", "task": "Sabah ve akşam 2 dakika diş fırçalayın."},
-                {"day": "Salı", "task": "Diş ipi ile diş aralarını temizleyin."},
-                {"day": "Çarşamba", "task": "Antibakteriyel ağız gargarası kullanın."},
-                {"day": "Perşembe", "task": "Bol su içerek ağız hijyenini destekleyin."},
-                {"day": "Cuma", "task": "Diş hekiminizden kontrol randevusu alın."},
-                {"day": "Cumartesi", "task": "Sebze ve meyve gibi sağlıklı atıştırmalıklar tüketin."},
-                {"day": "Pazar", "task": "Diş fırçanızı kontrol edin ve gerekirse yenileyin."},
-            ]
+        return self.templates.plan(top.label_id if top is not None else None)
     
-    def _handle_symptom(self, symptom: str, top_issue: str) -> str:
+    def _handle_symptom(self, symptom: str, top_issue: Optional[str]) -> str:
         """Handle symptoms like 'Ağrım var'."""
-        symptom_lower = symptom.lower()
-        if "ağrı" in symptom_lower:
-            return f"Ağrı: {top_issue} ile ilgili olabilir (zonklama mı?). Ibuprofen al, soğuk kompres uygula. Devam ederse dişçi!"
-        elif "kanama" in symptom_lower:
-            return "Kanama: Diş eti sorunu? Hafif fırçala, C vitamini artır. 2 günde geçmezse muayene."
-        else:
-            return "Semptom detaylandır: Ağrı tipi, şişlik? Ek bilgi ver."
+        return self.templates.symptom_advice(symptom, self.templates.label_index.get(top_issue))
 
 # Global analyzer instance
-analyzer = DentalImageAnalyzer()
\ No newline at end of file
+analyzer = DentalImageAnalyzer()
+
+
+def _load_worker_models(specs: Sequence[Tuple[str, str, str]]) -> Callable[[bytes, Optional[str]], List[float]]:
+    """İşçi süreçte (spawn) model sürümlerini yükler ve bu süreçteki çıkarım fonksiyonunu döndürür."""
+    for version, model_name, backend_name in specs:
+        analyzer.models.register(ModelVersion.load(version, model_name, backend_name))
+    analyzer.models.activate(specs[0][0])
+    return analyzer._infer_local
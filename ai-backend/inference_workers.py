@@ -0,0 +1,187 @@
+# Gerekli kütüphanelerin import edilmesi
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+# Çıkarım modu: "thread" (varsayılan, süreç içi mikro-batch) veya "process" (çok süreçli işçi havuzu)
+INFERENCE_MODE = os.getenv("INFERENCE_MODE", "thread")
+# Her işçi sürecin kullanacağı torch iş parçacığı sayısı ve işçi sayısı (0: çekirdek sayısına göre otomatik)
+INFERENCE_THREADS_PER_WORKER = int(os.getenv("INFERENCE_THREADS_PER_WORKER", "1"))
+INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", "0"))
+
+# İşçi sürecin durumu: başlatılırken yüklenen modellerle çalışan çıkarım fonksiyonu ve çekirdek ataması
+_WORKER_STATE: Dict[str, Any] = {}
+
+# İşçiye aktarılan model tanımı: (sürüm, model adı, arka uç)
+ModelSpec = Tuple[str, str, str]
+
+
+def _available_cores() -> List[int]:
+    """Sürecin çalışmasına izin verilen CPU çekirdeklerini döndürür."""
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def _init_worker(counter, cores: List[int], threads_per_worker: int,
+                 worker_init: Callable[[Sequence[ModelSpec]], Callable], specs: Sequence[ModelSpec]) -> None:
+    """İşçi süreci kendi çekirdek dilimine sabitler, torch iş parçacığı sayısını ayarlar ve modelleri yükler."""
+    with counter.get_lock():
+        index = counter.value
+        counter.value += 1
+
+    my_cores = cores[index * threads_per_worker:(index + 1) * threads_per_worker]
+    if my_cores and hasattr(os, "sched_setaffinity"):
+        try:
+            os.sched_setaffinity(0, my_cores)
+        except OSError as e:
+            print(f"[WORKER {index}] affinity error: {e}")
+
+    import torch
+    torch.set_num_threads(threads_per_worker)
+    _WORKER_STATE["index"] = index
+    _WORKER_STATE["cores"] = my_cores
+    _WORKER_STATE["infer"] = worker_init(specs)
+
+
+def _run_in_worker(image_data: bytes, version: Optional[str]) -> List[float]:
+    """İşçi süreçte görüntüyü çözer, ön işler ve adı verilen model sürümüyle ileri geçişi çalıştırır."""
+    return _WORKER_STATE["infer"](image_data, version)
+
+
+def _ping() -> int:
+    """Havuzun süreçlerini başlatmaya zorlamak için kullanılan boş iş."""
+    return os.getpid()
+
+
+class ProcessInferencePool:
+    """Görüntü çözümleme, ön işleme ve ileri geçişi GIL'i paylaşmayan işçi süreçlerde çalıştıran havuz.
+
+    İşçiler `spawn` ile temiz bir süreç olarak başlatılır ve model sürümlerini kendileri yükler; ebeveynin
+    iş parçacıkları (LLM döngüsü, geçmiş yazıcısı, havuzlar) varken fork edilmediği için fork anında tutulan
+    kilitler yüzünden kilitlenmez. Bunun bedeli, her işçinin ağırlıkların kendi kopyasını taşımasıdır.
+    Bir işçi çökerse (`BrokenProcessPool`) havuz yeniden kurulur ve o istek varsa `fallback` ile süreç içinde
+    sınıflandırılır.
+    """
+
+    def __init__(self, workers: int = INFERENCE_WORKERS, threads_per_worker: int = INFERENCE_THREADS_PER_WORKER):
+        cores = _available_cores()
+        self.threads_per_worker = max(1, threads_per_worker)
+        self.workers = workers if workers > 0 else max(1, len(cores) // self.threads_per_worker)
+        self._cores = cores
+        # Her işçinin sabitleneceği çekirdek dilimi (çekirdekler yetmezse işçi sabitlenmez)
+        self.core_slices = [
+            cores[i * self.threads_per_worker:(i + 1) * self.threads_per_worker] for i in range(self.workers)
+        ]
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._specs: List[ModelSpec] = []
+        self._worker_init: Optional[Callable] = None
+        self._fallback: Optional[Callable[[bytes, Optional[str]], List[float]]] = None
+        self._lock = threading.Lock()
+        self._inflight = 0
+        self._completed = 0
+        self._errors = 0
+        self._restarts = 0
+        self._fallbacks = 0
+
+    def start(self, specs: Sequence[ModelSpec], worker_init: Callable[[Sequence[ModelSpec]], Callable],
+              fallback: Optional[Callable[[bytes, Optional[str]], List[float]]] = None) -> None:
+        """İşçi süreçlerini başlatır ve hepsi modelleri yükleyene kadar bekler.
+
+        `worker_init` modül düzeyinde (işçide içe aktarılabilir) bir fonksiyon olmalıdır; işçide `specs` ile
+        çağrılır ve `(görüntü baytları, sürüm) -> olasılık satırı` çıkarım fonksiyonunu döndürür.
+        """
+        self._specs = list(specs)
+        self._worker_init = worker_init
+        self._fallback = fallback
+        self._executor = self._create_executor()
+        # spawn bağlamında işçiler ihtiyaç oldukça başlatılır; eşzamanlı boş işlerle hepsi şimdi başlatılır ve
+        # model yükleme hataları ilk istekte değil burada görünür
+        for future in [self._executor.submit(_ping) for _ in range(self.workers)]:
+            future.result()
+        print(f"Process inference pool started: {self.workers} workers x {self.threads_per_worker} threads")
+
+    def _create_executor(self) -> ProcessPoolExecutor:
+        context = multiprocessing.get_context("spawn")
+        counter = context.Value("i", 0)
+        return ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=context,
+            initializer=_init_worker,
+            initargs=(counter, self._cores, self.threads_per_worker, self._worker_init, self._specs),
+        )
+
+    def submit(self, image_data: bytes, version: Optional[str] = None) -> Future:
+        """Sıkıştırılmış görüntü baytlarını bir işçi sürece gönderir ve olasılık satırını taşıyacak future döndürür."""
+        if self._executor is None:
+            raise RuntimeError("Process inference pool başlatılmadı.")
+        with self._lock:
+            self._inflight += 1
+        try:
+            future = self._executor.submit(_run_in_worker, image_data, version)
+        except BaseException:
+            with self._lock:
+                self._inflight -= 1
+            raise
+        future.add_done_callback(self._on_done)
+        return future
+
+    def run(self, image_data: bytes, version: Optional[str] = None, timeout: Optional[float] = None) -> List[float]:
+        """Görüntüyü bir işçi süreçte sınıflandırır ve olasılık satırını döndürür.
+
+        Havuz bozulmuşsa yeniden kurulur; istek `fallback` verildiyse süreç içinde sınıflandırılır, verilmediyse
+        `BrokenProcessPool` fırlatılır. Sonraki istekler yeni havuzda çalışır.
+        """
+        executor = self._executor
+        try:
+            return self.submit(image_data, version).result(timeout=timeout)
+        except BrokenProcessPool as e:
+            print(f"Process inference pool broken: {e}; restarting workers")
+            self._restart(executor)
+            if self._fallback is None:
+                raise
+            with self._lock:
+                self._fallbacks += 1
+            return self._fallback(image_data, version)
+
+    def _restart(self, broken: Optional[ProcessPoolExecutor]) -> None:
+        """Bozulan havuzu yenisiyle değiştirir; aynı havuz için eşzamanlı çağrılardan yalnızca biri yeniden kurar."""
+        with self._lock:
+            if self._executor is not broken or broken is None:
+                return
+            self._executor = self._create_executor()
+            self._restarts += 1
+        broken.shutdown(wait=False, cancel_futures=True)
+
+    def shutdown(self) -> None:
+        """İşçi süreçlerini durdurur."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> Dict:
+        """İşçi sayısı, çekirdek ataması ve iş sayaçlarını döndürür."""
+        with self._lock:
+            return {
+                "mode": "process",
+                "workers": self.workers,
+                "threads_per_worker": self.threads_per_worker,
+                "core_slices": self.core_slices,
+                "inflight": self._inflight,
+                "completed": self._completed,
+                "errors": self._errors,
+                "restarts": self._restarts,
+                "fallbacks": self._fallbacks,
+            }
+
+    def _on_done(self, future: Future) -> None:
+        with self._lock:
+            self._inflight -= 1
+            if future.cancelled() or future.exception() is not None:
+                self._errors += 1
+            else:
+                self._completed += 1
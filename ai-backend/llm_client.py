@@ -0,0 +1,324 @@
+# Gerekli kütüphanelerin import edilmesi
+import asyncio
+import hashlib
+import os
+import random
+import threading
+from concurrent.futures import Future
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+from result_cache import ResultCache
+
+# LLM çağrılarının eşzamanlılık, zaman aşımı ve yeniden deneme ayarları (ortam değişkenleri ile değiştirilebilir)
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+# Eşzamanlılık sınırı doluyken sırada bekleyebilecek en fazla çağrı; aşılırsa çağrı beklemeden reddedilir
+LLM_MAX_QUEUE = int(os.getenv("LLM_MAX_QUEUE", "64"))
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "20"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+LLM_RETRY_BACKOFF_SECONDS = float(os.getenv("LLM_RETRY_BACKOFF_SECONDS", "0.5"))
+# LLM yanıt önbelleğinin boyutu ve geçerlilik süresi
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "512"))
+LLM_CACHE_TTL_SECONDS = float(os.getenv("LLM_CACHE_TTL_SECONDS", "3600"))
+# Tanımlanırsa Gemini yerine bu adresteki yerel stub sunucusu kullanılır (bkz. llm_stub_server.py)
+LLM_STUB_URL = os.getenv("LLM_STUB_URL")
+
+
+class LLMUnavailableError(RuntimeError):
+    """Yapılandırılmış bir LLM taşıyıcısı olmadığında veya tüm denemeler başarısız olduğunda fırlatılır."""
+
+
+class LLMOverloadedError(LLMUnavailableError):
+    """LLM kuyruğu dolu olduğunda beklemeden fırlatılır; özetler kural tabanlı yedeğe düşer."""
+
+
+class GeminiTransport:
+    """google-generativeai `GenerativeModel` nesnesinin asenkron API'sini kullanan taşıyıcı."""
+
+    name = "gemini"
+
+    def __init__(self, model):
+        self.model = model
+
+    async def generate(self, prompt: str) -> str:
+        response = await self.model.generate_content_async(prompt)
+        return getattr(response, "text", "") or ""
+
+    async def chat(self, history: List[Dict], message: str) -> str:
+        # Sistem talimatı modelde (system_instruction) tutulur; yalnızca sınırlı geçmiş ve yeni mesaj gönderilir
+        session = self.model.start_chat(history=[{"role": turn["role"], "parts": [turn["text"]]} for turn in history])
+        response = await session.send_message_async(message)
+        return getattr(response, "text", "") or ""
+
+    async def stream(self, prompt: str) -> AsyncIterator[str]:
+        response = await self.model.generate_content_async(prompt, stream=True)
+        async for chunk in response:
+            text = getattr(chunk, "text", "")
+            if text:
+                yield text
+
+
+class StubHTTPTransport:
+    """Testler ve ölçümler için Gemini yerine yerel stub sunucusuna istek gönderen taşıyıcı."""
+
+    name = "stub"
+
+    def __init__(self, base_url: str):
+        self.base_url = base_url.rstrip("/")
+        self._client = None
+
+    def _get_client(self):
+        import httpx
+        if self._client is None:
+            self._client = httpx.AsyncClient(base_url=self.base_url, timeout=None)
+        return self._client
+
+    async def generate(self, prompt: str) -> str:
+        response = await self._get_client().post("/generate", json={"prompt": prompt})
+        response.raise_for_status()
+        return response.json().get("text", "")
+
+    async def chat(self, history: List[Dict], message: str) -> str:
+        response = await self._get_client().post("/chat", json={"history": history, "message": message})
+        response.raise_for_status()
+        return response.json().get("text", "")
+
+    async def stream(self, prompt: str) -> AsyncIterator[str]:
+        async with self._get_client().stream("POST", "/generate/stream", json={"prompt": prompt}) as response:
+            response.raise_for_status()
+            async for text in response.aiter_text():
+                if text:
+                    yield text
+
+
+class _LoopThread:
+    """Tüm LLM çağrılarının çalıştığı, istek iş parçacığı havuzundan bağımsız arka plan olay döngüsü."""
+
+    _instance: Optional["_LoopThread"] = None
+    _instance_lock = threading.Lock()
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, name="llm-loop", daemon=True)
+        self.thread.start()
+
+    @classmethod
+    def get(cls) -> "_LoopThread":
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = _LoopThread()
+            return cls._instance
+
+
+class AsyncLLMClient:
+    """Eşzamanlılık sınırı, zaman aşımı, geri çekilmeli yeniden deneme, aynı istemleri birleştirme ve
+    yanıt önbelleği sağlayan LLM istemcisi.
+
+    Çağrılar kendi olay döngüsünde çalışır; bu sayede yavaş bir LLM yanıtı görüntü sınıflandırma için
+    kullanılan iş parçacıklarını işgal etmez. Hem `await client.generate(...)` (asenkron) hem de
+    `client.generate_sync(...)` (iş parçacıklarından) ile kullanılabilir.
+    """
+
+    def __init__(
+        self,
+        transport=None,
+        name: str = "llm",
+        max_concurrency: int = LLM_MAX_CONCURRENCY,
+        max_queue: int = LLM_MAX_QUEUE,
+        timeout_seconds: float = LLM_TIMEOUT_SECONDS,
+        max_retries: int = LLM_MAX_RETRIES,
+        retry_backoff_seconds: float = LLM_RETRY_BACKOFF_SECONDS,
+        cache: Optional[ResultCache] = None,
+    ):
+        self.transport = transport
+        self.name = name
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_queue = max(0, max_queue)
+        self.timeout_seconds = timeout_seconds
+        self.max_retries = max(0, max_retries)
+        self.retry_backoff_seconds = retry_backoff_seconds
+        self.cache = cache if cache is not None else ResultCache(
+            f"{name}-responses", max_entries=LLM_CACHE_MAX_ENTRIES, ttl_seconds=LLM_CACHE_TTL_SECONDS
+        )
+        self._runtime = _LoopThread.get()
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._waiting = 0
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+        # İstatistik sayaçları (yalnızca LLM olay döngüsünde güncellenir)
+        self.counters = {
+            "requests": 0,
+            "cache_hits": 0,
+            "coalesced": 0,
+            "upstream_calls": 0,
+            "retries": 0,
+            "timeouts": 0,
+            "failures": 0,
+            "rejected": 0,
+        }
+
+    @property
+    def available(self) -> bool:
+        """Bir taşıyıcı yapılandırılmışsa True döner."""
+        return self.transport is not None
+
+    async def generate(self, prompt: str, cache_key: Optional[str] = None) -> str:
+        """İstemi LLM'e gönderir ve metin yanıtını döndürür; çağıranın olay döngüsünü bloklamaz."""
+        future = asyncio.run_coroutine_threadsafe(self._generate(prompt, cache_key), self._runtime.loop)
+        return await asyncio.wrap_future(future)
+
+    def generate_sync(self, prompt: str, cache_key: Optional[str] = None) -> str:
+        """`generate` metodunun iş parçacıklarından çağrılabilen bloklayan sürümü."""
+        future: Future = asyncio.run_coroutine_threadsafe(self._generate(prompt, cache_key), self._runtime.loop)
+        return future.result()
+
+    async def chat(self, history: List[Dict], message: str) -> str:
+        """Çok turlu sohbette, verilen geçmişin ardından gelen mesajın yanıtını döndürür (önbelleğe alınmaz)."""
+        future = asyncio.run_coroutine_threadsafe(self._chat(history, message), self._runtime.loop)
+        return await asyncio.wrap_future(future)
+
+    def chat_sync(self, history: List[Dict], message: str) -> str:
+        """`chat` metodunun iş parçacıklarından çağrılabilen bloklayan sürümü."""
+        return asyncio.run_coroutine_threadsafe(self._chat(history, message), self._runtime.loop).result()
+
+    async def stream(self, prompt: str) -> AsyncIterator[str]:
+        """İstemin yanıtını parça parça üretir; parçalar LLM olay döngüsünden çağıranın döngüsüne aktarılır.
+
+        Parçalar istemciye ulaştıktan sonra yeniden deneme yapılamayacağı için akışlar yeniden denenmez;
+        eşzamanlılık sınırı ve (akışın tamamı için) zaman aşımı uygulanır.
+        """
+        caller_loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+
+        def emit(kind: str, value) -> None:
+            caller_loop.call_soon_threadsafe(queue.put_nowait, (kind, value))
+
+        async def produce() -> None:
+            try:
+                if self.transport is None:
+                    raise LLMUnavailableError("LLM yapılandırılmadı.")
+                self.counters["requests"] += 1
+                async with self._slot():
+                    self.counters["upstream_calls"] += 1
+
+                    async def pump() -> None:
+                        async for chunk in self.transport.stream(prompt):
+                            emit("chunk", chunk)
+
+                    await asyncio.wait_for(pump(), self.timeout_seconds)
+                emit("done", None)
+            except asyncio.TimeoutError as e:
+                self.counters["timeouts"] += 1
+                emit("error", e)
+            except Exception as e:
+                self.counters["failures"] += 1
+                emit("error", e)
+
+        asyncio.run_coroutine_threadsafe(produce(), self._runtime.loop)
+        while True:
+            kind, value = await queue.get()
+            if kind == "chunk":
+                yield value
+            elif kind == "done":
+                return
+            else:
+                raise LLMUnavailableError(f"LLM akışı başarısız oldu: {value!r}")
+
+    def stats(self) -> Dict:
+        """İstek, önbellek, birleştirme, yeniden deneme ve hata sayaçlarını döndürür."""
+        return {
+            "name": self.name,
+            "transport": getattr(self.transport, "name", None),
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "waiting": self._waiting,
+            "inflight": len(self._inflight),
+            **self.counters,
+            "cache": self.cache.stats(),
+        }
+
+    async def _generate(self, prompt: str, cache_key: Optional[str]) -> str:
+        """Önbellek ve birleştirme katmanları (LLM olay döngüsünde çalışır)."""
+        if self.transport is None:
+            raise LLMUnavailableError("LLM yapılandırılmadı.")
+        self.counters["requests"] += 1
+
+        if cache_key is not None:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                self.counters["cache_hits"] += 1
+                return cached
+
+        # Aynı anda gelen özdeş istekler tek bir LLM çağrısını paylaşır
+        inflight_key = cache_key or hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+        pending = self._inflight.get(inflight_key)
+        if pending is not None:
+            self.counters["coalesced"] += 1
+            return await asyncio.shield(pending)
+
+        pending = asyncio.ensure_future(self._call_with_retry(lambda: self.transport.generate(prompt)))
+        self._inflight[inflight_key] = pending
+        try:
+            text = await asyncio.shield(pending)
+        finally:
+            self._inflight.pop(inflight_key, None)
+
+        if cache_key is not None and text:
+            self.cache.put(cache_key, text)
+        return text
+
+    async def _chat(self, history: List[Dict], message: str) -> str:
+        """Sohbet turları kişiye özel olduğundan önbellek ve birleştirme katmanları atlanır."""
+        if self.transport is None:
+            raise LLMUnavailableError("LLM yapılandırılmadı.")
+        self.counters["requests"] += 1
+        return await self._call_with_retry(lambda: self.transport.chat(history, message))
+
+    @asynccontextmanager
+    async def _slot(self):
+        """Eşzamanlılık sınırından bir yer alır; sırada `max_queue` kadar çağrı bekliyorsa beklemeden reddeder."""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        if self._semaphore.locked() and self._waiting >= self.max_queue:
+            self.counters["rejected"] += 1
+            raise LLMOverloadedError(f"{self.name}: LLM kuyruğu dolu ({self._waiting} bekleyen çağrı).")
+        self._waiting += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self._waiting -= 1
+        try:
+            yield
+        finally:
+            self._semaphore.release()
+
+    async def _call_with_retry(self, call: Callable[[], Awaitable[str]]) -> str:
+        """Eşzamanlılık sınırı altında zaman aşımlı çağrı yapar; hata durumunda üstel geri çekilmeyle yeniden dener."""
+        last_error: Optional[BaseException] = None
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                self.counters["retries"] += 1
+                delay = self.retry_backoff_seconds * (2 ** (attempt - 1))
+                await asyncio.sleep(delay + random.uniform(0, delay / 2))
+            try:
+                async with self._slot():
+                    self.counters["upstream_calls"] += 1
+                    return await asyncio.wait_for(call(), self.timeout_seconds)
+            except LLMOverloadedError:
+                # Kuyruk doluyken yeniden denemek yükü artırır; çağıran hemen yedeğe düşer
+                raise
+            except asyncio.TimeoutError as e:
+                self.counters["timeouts"] += 1
+                last_error = e
+            except Exception as e:
+                last_error = e
+
+        self.counters["failures"] += 1
+        raise LLMUnavailableError(f"LLM çağrısı {self.max_retries + 1} denemede başarısız oldu: {last_error!r}")
+
+
+def create_llm_client(model=None, name: str = "llm") -> AsyncLLMClient:
+    """LLM_STUB_URL tanımlıysa stub sunucusunu, değilse verilen Gemini modelini kullanan bir istemci oluşturur."""
+    if LLM_STUB_URL:
+        return AsyncLLMClient(StubHTTPTransport(LLM_STUB_URL), name=name)
+    return AsyncLLMClient(GeminiTransport(model) if model is not None else None, name=name)
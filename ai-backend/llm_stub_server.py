@@ -0,0 +1,89 @@
+# Gemini yerine kullanılabilen, gecikmesi ayarlanabilir yerel LLM stub sunucusu.
+# Kullanım: python llm_stub_server.py --port 8001 --latency-ms 800
+# Ardından backend'i LLM_STUB_URL=http://127.0.0.1:8001 ile başlatın.
+import argparse
+import asyncio
+import json
+import os
+
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from typing import Dict, List
+
+# Her yanıttan önce beklenecek yapay gecikme (ms)
+STUB_LATENCY_MS = float(os.getenv("LLM_STUB_LATENCY_MS", "500"))
+
+app = FastAPI(title="LLM Stub Server")
+stats = {"requests": 0, "chat_requests": 0, "prompt_chars": 0}
+
+_DAYS = ["Pazartesi", "Salı", "Çarşamba", "Perşembe", "Cuma", "Cumartesi", "Pazar"]
+
+
+class GenerateRequest(BaseModel):
+    prompt: str
+
+
+class ChatRequest(BaseModel):
+    history: List[Dict] = []
+    message: str
+
+
+def _stub_text(prompt: str) -> str:
+    """İstemin türüne göre (özet JSON'u veya sohbet) deterministik bir yanıt üretir."""
+    if "Sadece JSON" in prompt:
+        return json.dumps({
+            "comment": "Stub özeti: düzenli fırçalama ve diş hekimi kontrolü önerilir.",
+            "plan": [{"day": day, "task": "Stub görevi: 2 dakika fırçalayın."} for day in _DAYS],
+        }, ensure_ascii=False)
+    return "Stub yanıtı: Diş sağlığınız için düzenli fırçalamayı unutmayın."
+
+
+@app.post("/generate")
+async def generate(request: GenerateRequest):
+    """Ayarlanan gecikme kadar bekleyip sabit bir yanıt döndürür."""
+    stats["requests"] += 1
+    stats["prompt_chars"] += len(request.prompt)
+    await asyncio.sleep(STUB_LATENCY_MS / 1000.0)
+    return {"text": _stub_text(request.prompt)}
+
+
+@app.post("/chat")
+async def chat(request: ChatRequest):
+    """Çok turlu sohbet isteği: geçmişteki tur sayısını içeren sabit bir yanıt döndürür."""
+    stats["chat_requests"] += 1
+    stats["prompt_chars"] += len(request.message) + sum(len(turn.get("text", "")) for turn in request.history)
+    await asyncio.sleep(STUB_LATENCY_MS / 1000.0)
+    return {"text": f"Stub yanıtı ({len(request.history) // 2 + 1}. tur): Diş sağlığınız için düzenli fırçalamayı unutmayın."}
+
+
+@app.post("/generate/stream")
+async def generate_stream(request: GenerateRequest):
+    """Yanıtı kelime kelime, toplam gecikmeyi parçalara bölerek akış halinde döndürür."""
+    stats["requests"] += 1
+    stats["prompt_chars"] += len(request.prompt)
+    words = _stub_text(request.prompt).split(" ")
+
+    async def body():
+        for i, word in enumerate(words):
+            await asyncio.sleep(STUB_LATENCY_MS / 1000.0 / len(words))
+            yield word if i == 0 else " " + word
+
+    return StreamingResponse(body(), media_type="text/plain; charset=utf-8")
+
+
+@app.get("/stats")
+def get_stats():
+    """Stub sunucusunun aldığı istek sayısını ve toplam istem boyutunu döndürür."""
+    return {**stats, "latency_ms": STUB_LATENCY_MS}
+
+
+if __name__ == "__main__":
+    import uvicorn
+    parser = argparse.ArgumentParser(description="Gecikmesi ayarlanabilir LLM stub sunucusu")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--latency-ms", type=float, default=STUB_LATENCY_MS)
+    args = parser.parse_args()
+    STUB_LATENCY_MS = args.latency_ms
+    uvicorn.run(app, host=args.host, port=args.port)
@@ -1,14 +1,48 @@
 # Gerekli kütüphanelerin ve modüllerin import edilmesi
-from fastapi import FastAPI, Form, HTTPException, Query
+from fastapi import Depends, FastAPI, Form, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from starlette.background import BackgroundTask
+import io
+import json
+import os
 import threading
+import time
 import asyncio
-from concurrent.futures import ThreadPoolExecutor
+import hmac
+from contextlib import asynccontextmanager
 from image_analyzer import analyzer
 from dental_chatbot import chatbot, start_interactive_cli
+from commentary_jobs import comment_jobs
+from batch_analysis import format_csv, format_csv_header, format_ndjson, run_batch
+from metrics import InstrumentedThreadPoolExecutor, profiler, registry
+from llm_client import LLM_MAX_CONCURRENCY, LLMOverloadedError
+from classifier_backends import CLASSIFIER_BACKEND
+from model_registry import MODEL_VERSION_PATTERN, SHADOW_SAMPLE_RATE
+from admission import (
+    ADMISSION_REJECTED, ADMISSION_RETRY_AFTER_SECONDS, BATCH_MAX_CONCURRENCY, CHAT_QUEUE_MAX, CLASSIFY_QUEUE_MAX,
+    CLASSIFY_WORKERS, AdmissionController, AdmissionRejected, PoolSaturated, parse_deadline,
+)
+
+# Sürecin başladığı an; hazır olma süresini raporlamak için kullanılır
+PROCESS_STARTED_AT = time.perf_counter()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Sunucu port'a bağlandıktan hemen sonra sınıflandırma modelini arka planda yüklemeye başlar."""
+    print(f"[STARTUP] app startup after {time.perf_counter() - PROCESS_STARTED_AT:.3f}s; loading classifier in background")
+    threading.Thread(target=analyzer.load, name="model-loader", daemon=True).start()
+    yield
+    executor.shutdown(wait=False, cancel_futures=True)
+    analyzer.models.shadow.shutdown()
+    profiler.stop()
+    if analyzer.process_pool is not None:
+        analyzer.process_pool.shutdown()
+    # Bekleyen geçmiş yazmaları diske aktarılır
+    analyzer.history.close()
 
 # FastAPI uygulamasının oluşturulması ve temel konfigürasyonu
-app = FastAPI(title="Dental AI Backend (Classifier + Gemini NLG)", version="0.5.0")
+app = FastAPI(title="Dental AI Backend (Classifier + Gemini NLG)", version="0.5.0", lifespan=lifespan)
 
 # CORS ayarları. 
 app.add_middleware(
@@ -19,21 +53,103 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# CPU-yoğun veya I/O-beklemeli işlemleri (görüntü işleme, model çıkarımı) asenkron olarak çalıştırmak için bir iş parçacığı havuzu.
-executor = ThreadPoolExecutor(max_workers=4)
+# CPU-yoğun işlemleri (görüntü çözümleme, ön işleme, model çıkarımı) asenkron olarak çalıştırmak için bir iş parçacığı havuzu.
+# INFERENCE_MODE=process kullanılırken bu sayı işçi süreç sayısından az olmamalıdır.
+# LLM çağrıları bu havuzu kullanmaz; kendi olay döngüsünde, kendi eşzamanlılık ve kuyruk sınırıyla çalışır.
+executor = InstrumentedThreadPoolExecutor(max_workers=CLASSIFY_WORKERS, name="classify")
+
+# Havuzların önündeki kabul kontrolü: kapasite dolunca istekler kuyruğa alınmak yerine hemen 503 / 429 ile reddedilir
+classify_admission = AdmissionController("classify", max_inflight=CLASSIFY_WORKERS + CLASSIFY_QUEUE_MAX)
+chat_admission = AdmissionController("chat", max_inflight=LLM_MAX_CONCURRENCY + CHAT_QUEUE_MAX)
+# Tek istekte çok sayıda ileri geçiş ve LLM çağrısı yapabildiğinden toplu analiz ayrı ve küçük bir kapasiteyle sınırlanır
+batch_admission = AdmissionController("batch", max_inflight=BATCH_MAX_CONCURRENCY)
+
+# /metrics çıktısında her istekte güncel değeri okunan göstergeler
+registry.gauge("dental_executor_queue_depth", "İş parçacığı havuzunda çalışmaya başlamayı bekleyen iş sayısı.",
+               lambda: {(executor.name,): executor.queue_depth()}, ("executor",))
+registry.gauge("dental_batch_queue_depth", "Mikro-batch kuyruğunda bekleyen istek sayısı.",
+               lambda: {(m.batcher.name,): m.batcher.queue_depth() for m in analyzer.models.versions() if m.batcher is not None}, ("batcher",))
+registry.gauge("dental_process_pool_inflight", "İşçi süreçlerde çalışan veya bekleyen sınıflandırma sayısı.",
+               lambda: analyzer.process_pool.stats()["inflight"] if analyzer.process_pool is not None else None)
+registry.gauge("dental_admission_inflight", "Kabul kontrolünden geçmiş, henüz tamamlanmamış istek sayısı.",
+               lambda: {(c.name,): c.inflight() for c in (classify_admission, chat_admission, batch_admission)}, ("pool",))
+registry.gauge("dental_classifier_ready", "Sınıflandırma modeli isteklere hazırsa 1.", lambda: int(analyzer.is_ready))
+
+# Ham bayt yükleme uç noktası için kabul edilen en büyük görüntü boyutu ve okuma parça boyutu
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(10 * 1024 * 1024)))
+UPLOAD_CHUNK_SIZE = 64 * 1024
+# Toplu analiz uç noktasında tek istekte kabul edilen en fazla görüntü sayısı
+BATCH_MAX_FILES = int(os.getenv("BATCH_MAX_FILES", "100"))
+
+# Model yüklenirken istemcilerin tekrar denemesi önerilen süre (saniye)
+NOT_READY_RETRY_AFTER = "5"
+
+# Yönetim uç noktalarının (model yükleme/geçiş, /debug/profiler) erişim anahtarı; boşsa bu uç noktalar kapalıdır
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+
+@app.exception_handler(AdmissionRejected)
+async def admission_rejected_handler(request: Request, exc: AdmissionRejected):
+    """Doygunluk (503), kullanıcı başına sınır (429), geçersiz (400) ve süresi dolan (504) son anlar için hızlı yanıt döndürür."""
+    headers = {"Retry-After": str(exc.retry_after)} if exc.retry_after is not None else None
+    return JSONResponse(status_code=exc.status_code, content={"detail": exc.detail}, headers=headers)
+
+def _request_deadline(request: Request):
+    """İstemcinin `X-Request-Timeout-Ms` veya `X-Request-Deadline` başlığından işlemin son anını hesaplar."""
+    return parse_deadline(request.headers.get("x-request-timeout-ms"), request.headers.get("x-request-deadline"))
+
+def _require_admin(request: Request) -> None:
+    """`ADMIN_TOKEN` ayarlı değilse 404, `X-Admin-Token` başlığı eşleşmiyorsa 401 döndürür."""
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Yönetim uç noktaları etkin değil.")
+    token = request.headers.get("x-admin-token", "")
+    if not hmac.compare_digest(token.encode(), ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=401, detail="Geçersiz veya eksik yönetim anahtarı.")
+
+def _ensure_analyzer_ready() -> None:
+    """Sınıflandırma modeli hazır değilse istemciye 503 ve Retry-After döndürür."""
+    if analyzer.is_ready:
+        return
+    if analyzer.load_state == "failed":
+        raise HTTPException(status_code=503, detail="Görüntü sınıflandırma modeli yüklenemedi.")
+    raise HTTPException(
+        status_code=503,
+        detail="Görüntü sınıflandırma modeli henüz yükleniyor. Lütfen birazdan tekrar deneyin.",
+        headers={"Retry-After": NOT_READY_RETRY_AFTER},
+    )
 
 @app.get("/")
 def root():
-    """API'nin ana (root) endpoint'i. Servisin ayakta olup olmadığını kontrol etmek için kullanılır."""
-    return {"message": "AI Backend Hazır! Diş sağlığına hoş geldin 🦷"}
+    """API'nin ana (root) endpoint'i. Sürecin ayakta olup olmadığını (liveness) kontrol etmek için kullanılır."""
+    return {"message": "AI Backend ayakta! Diş sağlığına hoş geldin 🦷"}
+
+@app.get("/ready")
+def ready():
+    """Hazır olma (readiness) kontrolü. Sınıflandırma modeli yüklenip ısıtılana kadar 503 döndürür."""
+    body = {
+        "ready": analyzer.is_ready,
+        "state": analyzer.load_state,
+        "startup_timings": analyzer.startup_timings,
+    }
+    if analyzer.load_error:
+        body["error"] = analyzer.load_error
+    if not analyzer.is_ready:
+        raise HTTPException(status_code=503, detail=body, headers={"Retry-After": NOT_READY_RETRY_AFTER})
+    return body
 
 @app.post("/chat")
-async def chat(message: str = Form(...), session_id: str = Form(...)):
+async def chat(request: Request, message: str = Form(...), session_id: str = Form(...)):
     """Metin tabanlı sohbet için endpoint. Kullanıcıdan bir mesaj ve oturum ID'si alır, chatbot'tan bir yanıt döndürür."""
     try:
-        loop = asyncio.get_event_loop()
-        reply = await loop.run_in_executor(executor, chatbot.chat, message)
+        with chat_admission.slot(session_id, _request_deadline(request)):
+            # LLM çağrısı kendi olay döngüsünde çalışır; bekleme sırasında iş parçacığı havuzu işgal edilmez
+            reply = await chatbot.chat_async(message, session_id)
         return {"reply": reply}
+    except AdmissionRejected:
+        raise
+    except LLMOverloadedError:
+        # LLM istemcisinin kuyruğu dolu: kabul kontrolündeki doygunlukla aynı şekilde 503 + Retry-After döner
+        ADMISSION_REJECTED.inc(pool="chat", reason="llm_queue")
+        raise PoolSaturated("Sohbet servisi şu anda yoğun. Lütfen birazdan tekrar deneyin.", ADMISSION_RETRY_AFTER_SECONDS)
     except Exception as e:
         print(f"Chat error: {str(e)}")
         raise HTTPException(
@@ -52,30 +168,277 @@ def chat_start_cli():
         return {"error": str(e)}
 
 @app.post("/analyze")
-async def analyze_image(user_id: str = Form(...), image_b64: str = Form(...), symptom: str = Form(None)):
-    """Görüntü analizi için ana endpoint. Base64 formatında bir resim alır ve analiz sonuçlarını döndürür."""
+async def analyze_image(request: Request, user_id: str = Form(...), image_b64: str = Form(...), symptom: str = Form(None), stream_comment: bool = Form(False)):
+    """Görüntü analizi için ana endpoint. Base64 formatında bir resim alır ve analiz sonuçlarını döndürür.
+
+    `stream_comment=true` ise yorum beklenmeden sonuç döner; yorum `comment_job_id` ile ayrıca alınır.
+    """
     import datetime
     print(f"[LOG] /analyze endpoint called at {datetime.datetime.now()} for user: {user_id}")
+    _ensure_analyzer_ready()
+    deadline = _request_deadline(request)
     try:
-        loop = asyncio.get_event_loop()
-        # Görüntü analizi fonksiyonunu ana thread'i bloklamadan çalıştırır.
-        result = await loop.run_in_executor(
-            executor, 
-            analyzer.analyze_image, 
-            image_b64,
-            user_id,
-            symptom  
-        )
+        with classify_admission.hold(user_id, deadline) as slot:
+            # Sınıflandırma iş parçacığı havuzunda, Gemini özeti ise havuzu işgal etmeden asenkron olarak çalışır.
+            # Sınıflandırma yeri özet beklenmeden bırakılır; özet LLM istemcisinin kendi kuyruk sınırına tabidir.
+            result = await analyzer.analyze_image_async(image_b64, user_id, symptom, executor, defer_comment=stream_comment,
+                                                        deadline=deadline, on_classified=slot.release)
         
         if not result.get("success", False):
             raise HTTPException(status_code=400, detail=result.get("error", "Analiz sırasında bilinmeyen bir hata oluştu."))
-        return result
-    except HTTPException:
+        return _with_comment_links(result)
+    except (HTTPException, AdmissionRejected):
         raise  
     except Exception as e:
         print(f"[EXCEPTION] analyze_image error: {str(e)}")
         raise HTTPException(status_code=500, detail="Görüntü analizi sırasında sunucu hatası oluştu.")
 
+def _with_comment_links(result: dict) -> dict:
+    """Yorumu arka planda üretilen sonuçlara yoklama ve SSE akış adreslerini ekler."""
+    job_id = result.get("comment_job_id")
+    if job_id:
+        result["comment_status_url"] = f"/analyze/jobs/{job_id}"
+        result["comment_stream_url"] = f"/analyze/jobs/{job_id}/stream"
+    return result
+
+@app.get("/analyze/jobs/{job_id}")
+def analyze_job_status(job_id: str):
+    """Arka planda üretilen yorumun durumunu ve o ana kadar üretilen metni döndürür (yoklama)."""
+    job = comment_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Yorum işi bulunamadı veya süresi doldu.")
+    return job.snapshot()
+
+@app.get("/analyze/jobs/{job_id}/stream")
+async def analyze_job_stream(job_id: str):
+    """Arka planda üretilen yorumu Server-Sent Events ile parça parça gönderir."""
+    job = comment_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Yorum işi bulunamadı veya süresi doldu.")
+
+    async def events():
+        sent = 0
+        while True:
+            # Bağlantı iş sürerken açılmışsa önceki parçalar da sırayla gönderilir
+            while sent < len(job.chunks):
+                yield f"event: token\ndata: {json.dumps({'text': job.chunks[sent]}, ensure_ascii=False)}\n\n"
+                sent += 1
+            if job.finished:
+                final = {"comment": job.text}
+                if job.error:
+                    final["error"] = job.error
+                yield f"event: {'done' if job.status == 'done' else 'error'}\ndata: {json.dumps(final, ensure_ascii=False)}\n\n"
+                return
+            await job.wait_for_update(sent)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+async def _read_upload(request: Request) -> io.BytesIO:
+    """İstek gövdesindeki görüntüyü boyut sınırını aşmadan tek bir tampona okur."""
+    too_large = HTTPException(status_code=413, detail=f"Görüntü boyutu {MAX_UPLOAD_BYTES} baytı aşamaz.")
+    # Content-Length bildirilmişse gövde okunmadan önce reddedilir
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > MAX_UPLOAD_BYTES:
+        raise too_large
+
+    buffer = io.BytesIO()
+    content_type = request.headers.get("content-type", "")
+    if content_type.startswith("multipart/form-data"):
+        form = await request.form()
+        upload = form.get("image")
+        if upload is None or isinstance(upload, str):
+            raise HTTPException(status_code=400, detail="Multipart isteklerde 'image' dosya alanı zorunludur.")
+        while chunk := await upload.read(UPLOAD_CHUNK_SIZE):
+            buffer.write(chunk)
+            if buffer.tell() > MAX_UPLOAD_BYTES:
+                raise too_large
+    else:
+        async for chunk in request.stream():
+            buffer.write(chunk)
+            if buffer.tell() > MAX_UPLOAD_BYTES:
+                raise too_large
+
+    if buffer.tell() == 0:
+        raise HTTPException(status_code=400, detail="Görüntü verisi boş.")
+    buffer.seek(0)
+    return buffer
+
+@app.post("/analyze/upload")
+async def analyze_upload(request: Request, user_id: str = Query(...), symptom: str = Query(None), stream_comment: bool = Query(False)):
+    """Görüntüyü base64 yerine ham bayt (image/jpeg, application/octet-stream) veya multipart 'image' alanı olarak alan analiz endpoint'i."""
+    import datetime
+    print(f"[LOG] /analyze/upload endpoint called at {datetime.datetime.now()} for user: {user_id}")
+    _ensure_analyzer_ready()
+    deadline = _request_deadline(request)
+    # Doygunlukta gövde okunmadan reddedilir; yer, gövde okunurken de tutulur
+    with classify_admission.hold(user_id, deadline) as slot:
+        image_buffer = await _read_upload(request)
+        try:
+            result = await analyzer.analyze_image_bytes_async(image_buffer, user_id, symptom, executor, defer_comment=stream_comment,
+                                                              deadline=deadline, on_classified=slot.release)
+
+            if not result.get("success", False):
+                raise HTTPException(status_code=400, detail=result.get("error", "Analiz sırasında bilinmeyen bir hata oluştu."))
+            return _with_comment_links(result)
+        except (HTTPException, AdmissionRejected):
+            raise
+        except Exception as e:
+            print(f"[EXCEPTION] analyze_upload error: {str(e)}")
+            raise HTTPException(status_code=500, detail="Görüntü analizi sırasında sunucu hatası oluştu.")
+
+@app.post("/analyze/batch")
+async def analyze_batch(request: Request, format: str = Query("ndjson", pattern="^(ndjson|csv)$"), with_comment: bool = Query(False), user_id: str = Query(None)):
+    """Multipart 'images' alanındaki birden çok görüntüyü toplu analiz eder; sonuçları tamamlandıkça NDJSON/CSV olarak akıtır."""
+    _ensure_analyzer_ready()
+    if not request.headers.get("content-type", "").startswith("multipart/form-data"):
+        raise HTTPException(status_code=400, detail="Görüntüler multipart 'images' alanında gönderilmelidir.")
+    deadline = _request_deadline(request)
+    # Kullanıcı başına sınır user_id verilmezse istemci adresine uygulanır; doygunlukta gövde okunmadan reddedilir
+    slot = batch_admission.hold(user_id or (request.client.host if request.client else None), deadline)
+    try:
+        form = await request.form(max_files=BATCH_MAX_FILES)
+        uploads = [upload for upload in form.getlist("images") if not isinstance(upload, str)]
+        if not uploads:
+            raise HTTPException(status_code=400, detail="En az bir görüntü gönderilmelidir.")
+        for upload in uploads:
+            if upload.size is not None and upload.size > MAX_UPLOAD_BYTES:
+                raise HTTPException(status_code=413, detail=f"{upload.filename}: görüntü boyutu {MAX_UPLOAD_BYTES} baytı aşamaz.")
+    except BaseException:
+        slot.release()
+        raise
+
+    def read_upload(upload):
+        # Dosyalar ön getirme iş parçacıklarında, geçici dosyadan okunur
+        return lambda: upload.file.read()
+
+    items = [(upload.filename or f"image-{i}", read_upload(upload)) for i, upload in enumerate(uploads)]
+
+    def body():
+        # Yer, akış bitene (veya istemci bağlantıyı kesene) kadar tutulur
+        with slot:
+            if format == "csv":
+                yield format_csv_header()
+            formatter = format_csv if format == "csv" else format_ndjson
+            for record in run_batch(analyzer, items, with_comment=with_comment, deadline=deadline):
+                yield formatter(record)
+
+    media_type = "text/csv; charset=utf-8" if format == "csv" else "application/x-ndjson"
+    # Akış hiç başlamazsa yer yanıt sonrası görevde bırakılır (release tekrar çağrılsa da etkisizdir)
+    return StreamingResponse(body(), media_type=media_type, background=BackgroundTask(slot.release))
+
+@app.get("/analyze/stats")
+def analyze_stats():
+    """Mikro-batch zamanlayıcısının (kuyruk derinliği, batch boyutu, bekleme süresi) veya süreç havuzunun istatistiklerini döndürür."""
+    stats = analyzer.inference_stats()
+    if stats is None:
+        raise HTTPException(status_code=503, detail="Görüntü sınıflandırma modeli yüklenemedi.")
+    return stats
+
+@app.get("/analyze/cache/stats")
+def analyze_cache_stats():
+    """Sınıflandırıcı ve yorum önbellek katmanlarının isabet/ıskalama/çıkarma sayaçlarını döndürür."""
+    return {
+        "classifier": analyzer.classifier_cache.stats(),
+        "commentary": analyzer.commentary_cache.stats(),
+    }
+
+@app.get("/llm/stats")
+def llm_stats():
+    """Sohbet ve özet LLM istemcilerinin sayaçlarını ve sohbet oturumlarının istem boyutu istatistiklerini döndürür."""
+    return {"chat": chatbot.llm.stats(), "summary": analyzer.llm.stats(), "chat_sessions": chatbot.sessions.stats()}
+
+@app.get("/history/stats")
+def history_stats():
+    """Kullanıcı geçmişi deposunun kullanıcı, kayıt, bayt ve çıkarma/yazma sayaçlarını döndürür."""
+    return analyzer.history.stats()
+
+@app.get("/admission/stats")
+def admission_stats():
+    """Sınıflandırma ve sohbet havuzlarının kapasitesini, anlık eşzamanlılığını ve kabul/ret sayaçlarını döndürür."""
+    return {
+        "classify": {**classify_admission.stats(), "executor_queue_depth": executor.queue_depth()},
+        "chat": chat_admission.stats(),
+        "batch": batch_admission.stats(),
+    }
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """Aşama süreleri, havuz/batch kuyruk derinliği ve bekleme süreleri histogramlarını Prometheus metin biçiminde döndürür."""
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+@app.post("/debug/profiler/start", dependencies=[Depends(_require_admin)])
+def profiler_start(interval_ms: float = Query(None, gt=0)):
+    """Örnekleyici profil aracını önceki sonuçları silerek başlatır."""
+    if not profiler.start(interval_ms):
+        raise HTTPException(status_code=409, detail="Profil aracı zaten çalışıyor.")
+    return profiler.report(top=0)
+
+@app.post("/debug/profiler/stop", dependencies=[Depends(_require_admin)])
+def profiler_stop():
+    """Örnekleyici profil aracını durdurur ve en sık görülen yığınları döndürür."""
+    profiler.stop()
+    return profiler.report()
+
+@app.get("/debug/profiler", dependencies=[Depends(_require_admin)])
+def profiler_report(format: str = Query("json", pattern="^(json|collapsed)$")):
+    """Profil sonuçlarını JSON özeti veya flamegraph araçları için katlanmış yığın metni olarak döndürür."""
+    if format == "collapsed":
+        return PlainTextResponse(profiler.collapsed())
+    return profiler.report()
+
+@app.get("/models")
+def models_list():
+    """Bellekteki sınıflandırıcı sürümlerini, etkin sürümü ve gölge değerlendirme istatistiklerini döndürür."""
+    return analyzer.models.stats()
+
+@app.post("/models", dependencies=[Depends(_require_admin)])
+async def models_load(version: str = Query(..., pattern=MODEL_VERSION_PATTERN), model_name: str = Query(..., min_length=1), backend: str = Query(None)):
+    """Yeni bir sınıflandırıcı sürümünü belleğe yükler ve ısıtır; etkin sürüm değişmez."""
+    _ensure_analyzer_ready()
+    loop = asyncio.get_running_loop()
+    try:
+        # Yükleme uzun sürdüğünden sınıflandırma havuzu yerine varsayılan havuzda çalışır
+        return await loop.run_in_executor(None, lambda: analyzer.load_model(version, model_name, backend or CLASSIFIER_BACKEND))
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except Exception as e:
+        print(f"Model load error ({version}): {e}")
+        raise HTTPException(status_code=500, detail=f"Model yüklenemedi: {e}")
+
+@app.post("/models/{version}/activate", dependencies=[Depends(_require_admin)])
+def models_activate(version: str):
+    """Etkin sürümü atomik olarak değiştirir; devam eden istekler önceki sürümle tamamlanır."""
+    _ensure_analyzer_ready()
+    try:
+        analyzer.models.activate(version)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e.args[0]))
+    return analyzer.models.stats()
+
+@app.post("/models/{version}/unload", dependencies=[Depends(_require_admin)])
+def models_unload(version: str):
+    """Sürümü bellekten kaldırır; onu kullanan isteklerin bitmesini `MODEL_DRAIN_TIMEOUT_SECONDS` kadar bekler."""
+    try:
+        drained = analyzer.models.unload(version)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e.args[0]))
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return {"version": version, "drained": drained}
+
+@app.post("/models/shadow", dependencies=[Depends(_require_admin)])
+def models_shadow(version: str = Query(None), sample_rate: float = Query(SHADOW_SAMPLE_RATE, ge=0, le=1)):
+    """Gölge modda çalışacak aday sürümü ve örnekleme oranını ayarlar; `version` verilmezse gölge mod kapanır."""
+    try:
+        analyzer.models.set_shadow(version, sample_rate)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e.args[0]))
+    return analyzer.models.shadow.stats()
+
 # Bu blok, dosyanın doğrudan bir betik olarak çalıştırıldığında FastAPI sunucusunu başlatır.
 if __name__ == "__main__":
     import uvicorn
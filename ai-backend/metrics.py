@@ -0,0 +1,316 @@
+# Gerekli kütüphanelerin import edilmesi
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter as _StackCounter
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Gecikme histogramlarının kova sınırları (saniye)
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+# "1" ise her zaman aralığı (span) ayrıca tek satırlık JSON olarak loglanır
+METRICS_LOG_SPANS = os.getenv("METRICS_LOG_SPANS", "0") == "1"
+# Örnekleyici profil aracının varsayılan örnekleme aralığı ve raporlanan en fazla yığın sayısı
+PROFILER_INTERVAL_MS = float(os.getenv("PROFILER_INTERVAL_MS", "5"))
+PROFILER_TOP_STACKS = int(os.getenv("PROFILER_TOP_STACKS", "50"))
+
+
+def _format_labels(labelnames: Sequence[str], values: Sequence[str], extra: Optional[Tuple[str, str]] = None) -> str:
+    """Prometheus metin biçimindeki `{ad="değer",...}` etiket bloğunu oluşturur."""
+    pairs = [(name, value) for name, value in zip(labelnames, values)]
+    if extra is not None:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    escaped = []
+    for name, value in pairs:
+        value = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        escaped.append(f'{name}="{value}"')
+    return "{" + ",".join(escaped) + "}"
+
+
+def _format_value(value: float) -> str:
+    value = float(value)
+    if value == float("inf"):
+        return "+Inf"
+    return str(int(value)) if value.is_integer() else repr(value)
+
+
+class Histogram:
+    """Etiket kombinasyonu başına kümülatif kovalar, toplam ve sayı tutan iş parçacığı güvenli histogram."""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[Tuple[str, ...], List] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                # [kova sayaçları..., toplam, sayı]
+                series = self._series[key] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            snapshot = {key: list(series) for key, series in self._series.items()}
+        for key, series in sorted(snapshot.items()):
+            for bound, count in zip(self.buckets, series):
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, ('le', _format_value(bound)))} {count}")
+            lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, ('le', '+Inf'))} {series[-1]}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(series[-2])}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {series[-1]}")
+        return lines
+
+
+class Counter:
+    """Etiket kombinasyonu başına yalnızca artan sayaç."""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            snapshot = dict(self._values)
+        for key, value in sorted(snapshot.items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+
+class Gauge:
+    """Değeri her /metrics isteğinde `collect` fonksiyonundan okunan gösterge.
+
+    `collect` tek bir sayı veya {etiket değerleri demeti: sayı} sözlüğü döndürür; hata verirse seri atlanır.
+    """
+
+    def __init__(self, name: str, documentation: str, collect: Callable[[], object], labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.collect = collect
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} gauge"]
+        try:
+            values = self.collect()
+        except Exception as e:
+            print(f"Metrics gauge error ({self.name}): {e}")
+            return lines
+        if not isinstance(values, dict):
+            values = {(): values}
+        for key, value in sorted(values.items()):
+            if value is None:
+                continue
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+
+class MetricsRegistry:
+    """Metrikleri kayıt sırasıyla tutan ve Prometheus metin biçiminde (0.0.4) dışa aktaran kayıt defteri."""
+
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            # Aynı adla tekrar kayıt yapılırsa (ör. modül yeniden yüklendiğinde) yeni nesne eskisinin yerini alır
+            self._metrics[metric.name] = metric
+        return metric
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, collect: Callable[[], object], labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, collect, labelnames))
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines: List[str] = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+# Analiz ve sohbet aşamalarının süreleri (decode, preprocess, inference, summary, symptom, chat ...)
+STAGE_SECONDS = registry.histogram("dental_stage_duration_seconds", "Analiz ve sohbet aşamalarının süresi.", ("stage",))
+STAGE_ERRORS = registry.counter("dental_stage_errors_total", "Hata ile biten aşama sayısı.", ("stage",))
+# İş parçacığı havuzlarında ve mikro-batch kuyruğunda bekleme süreleri
+EXECUTOR_WAIT_SECONDS = registry.histogram("dental_executor_wait_seconds", "İşin havuz kuyruğunda çalışmaya başlamadan önce beklediği süre.", ("executor",))
+BATCH_WAIT_SECONDS = registry.histogram("dental_batch_wait_seconds", "İsteğin mikro-batch kuyruğunda beklediği süre.", ("batcher",))
+BATCH_SIZE = registry.histogram("dental_batch_size", "Tek ileri geçişte işlenen görüntü sayısı.", ("batcher",), buckets=(1, 2, 4, 8, 16, 32, 64))
+
+
+@contextmanager
+def span(stage: str) -> Iterator[None]:
+    """Bloğun süresini `dental_stage_duration_seconds{stage=...}` histogramına yazar; hata sayacını da günceller.
+
+    Senkron ve asenkron kodda (`await` içeren bloklarda) aynı şekilde kullanılabilir.
+    """
+    started_at = time.perf_counter()
+    failed = False
+    try:
+        yield
+    except BaseException:
+        failed = True
+        raise
+    finally:
+        elapsed = time.perf_counter() - started_at
+        STAGE_SECONDS.observe(elapsed, stage=stage)
+        if failed:
+            STAGE_ERRORS.inc(stage=stage)
+        if METRICS_LOG_SPANS:
+            print(f"[SPAN] {json.dumps({'stage': stage, 'ms': round(elapsed * 1000.0, 3), 'error': failed, 'thread': threading.current_thread().name})}")
+
+
+class InstrumentedThreadPoolExecutor(ThreadPoolExecutor):
+    """Kuyruk derinliğini ve işlerin çalışmaya başlamadan önce bekledikleri süreyi ölçen iş parçacığı havuzu."""
+
+    def __init__(self, max_workers: int, name: str = "executor"):
+        super().__init__(max_workers=max_workers, thread_name_prefix=name)
+        self.name = name
+        self._depth_lock = threading.Lock()
+        self._queued = 0
+
+    def submit(self, fn, /, *args, **kwargs) -> Future:
+        enqueued_at = time.perf_counter()
+        with self._depth_lock:
+            self._queued += 1
+
+        def run():
+            EXECUTOR_WAIT_SECONDS.observe(time.perf_counter() - enqueued_at, executor=self.name)
+            with self._depth_lock:
+                self._queued -= 1
+            return fn(*args, **kwargs)
+
+        try:
+            return super().submit(run)
+        except BaseException:
+            with self._depth_lock:
+                self._queued -= 1
+            raise
+
+    def queue_depth(self) -> int:
+        """Havuza gönderilmiş ancak henüz bir iş parçacığında çalışmaya başlamamış iş sayısı."""
+        with self._depth_lock:
+            return self._queued
+
+
+class SamplingProfiler:
+    """Tüm iş parçacıklarının yığınlarını belirli aralıklarla örnekleyen, çalışma anında açılıp kapatılabilen profil aracı.
+
+    Örnekler "katlanmış yığın" (fonksiyon;fonksiyon;... sayı) biçiminde toplanır; çıktı doğrudan flamegraph
+    araçlarına verilebilir. Kapalıyken hiçbir maliyeti yoktur.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._stacks: _StackCounter = _StackCounter()
+        self.interval_ms = PROFILER_INTERVAL_MS
+        self.samples = 0
+        self.started_at: Optional[float] = None
+        self.stopped_at: Optional[float] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, interval_ms: Optional[float] = None) -> bool:
+        """Örneklemeyi önceki sonuçları silerek başlatır; zaten çalışıyorsa False döner."""
+        with self._lock:
+            if self.running:
+                return False
+            self.interval_ms = max(0.5, interval_ms if interval_ms is not None else PROFILER_INTERVAL_MS)
+            self._stacks = _StackCounter()
+            self.samples = 0
+            self.started_at = time.time()
+            self.stopped_at = None
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._loop, name="sampling-profiler", daemon=True)
+            self._thread.start()
+            return True
+
+    def stop(self) -> bool:
+        """Örneklemeyi durdurur; toplanan sonuçlar `report` ile okunmaya devam eder."""
+        with self._lock:
+            thread = self._thread
+            if thread is None:
+                return False
+            self._stop.set()
+            self._thread = None
+        thread.join()
+        self.stopped_at = time.time()
+        return True
+
+    def report(self, top: int = PROFILER_TOP_STACKS) -> Dict:
+        """Profil aracının durumunu ve en sık görülen katlanmış yığınları döndürür."""
+        with self._lock:
+            stacks = self._stacks.most_common(top)
+            samples = self.samples
+        end = self.stopped_at or time.time()
+        return {
+            "running": self.running,
+            "interval_ms": self.interval_ms,
+            "samples": samples,
+            "duration_s": round(end - self.started_at, 3) if self.started_at else 0.0,
+            "stacks": [{"stack": stack, "count": count} for stack, count in stacks],
+        }
+
+    def collapsed(self) -> str:
+        """Tüm örnekleri flamegraph araçlarının beklediği "yığın sayı" satırları olarak döndürür."""
+        with self._lock:
+            items = sorted(self._stacks.items())
+        return "".join(f"{stack} {count}\n" for stack, count in items)
+
+    def _loop(self) -> None:
+        own_ident = threading.get_ident()
+        interval = self.interval_ms / 1000.0
+        while not self._stop.wait(interval):
+            frames = sys._current_frames()
+            sampled = []
+            for ident, frame in frames.items():
+                if ident == own_ident:
+                    continue
+                parts = []
+                while frame is not None:
+                    code = frame.f_code
+                    parts.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                sampled.append(";".join(reversed(parts)))
+            with self._lock:
+                self._stacks.update(sampled)
+                self.samples += 1
+
+
+profiler = SamplingProfiler()
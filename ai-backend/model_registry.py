@@ -0,0 +1,393 @@
+# Gerekli kütüphanelerin import edilmesi
+import json
+import os
+import random
+import re
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from batching import WAIT_SAMPLE_SIZE, MicroBatcher, _percentile
+from classifier_backends import CLASSIFIER_BACKEND, ONNX_MODEL_PATH, ClassifierBackend, create_backend
+from preprocessing import FAST_PREPROCESS, FastImagePreprocessor
+
+if TYPE_CHECKING:
+    import torch
+
+# Başlangıçta etkin olarak yüklenecek sınıflandırma modelinin Hugging Face adı ve sürüm adı
+CLASSIFIER_MODEL_NAME = os.getenv("CLASSIFIER_MODEL_NAME", "prithivMLmods/tooth-agenesis-siglip2")
+CLASSIFIER_VERSION = os.getenv("CLASSIFIER_VERSION", "default")
+# Başlangıçta ek olarak belleğe yüklenecek sürümler: "sürüm=model_adı[:arka_uç]" biçiminde, virgülle ayrılmış
+CLASSIFIER_MODELS = os.getenv("CLASSIFIER_MODELS", "")
+# Gölge modda çalıştırılacak aday sürüm (boş: kapalı) ve örneklenen trafik oranı (0-1)
+SHADOW_MODEL_VERSION = os.getenv("SHADOW_MODEL_VERSION", "")
+SHADOW_SAMPLE_RATE = float(os.getenv("SHADOW_SAMPLE_RATE", "0.05"))
+# Gölge karşılaştırmalarını çalıştıran iş parçacığı sayısı ve bekleyebilecek en fazla iş (doluysa örnek atlanır)
+SHADOW_WORKERS = int(os.getenv("SHADOW_WORKERS", "1"))
+SHADOW_QUEUE_MAX = int(os.getenv("SHADOW_QUEUE_MAX", "16"))
+# Bir sürüm bellekten kaldırılırken onu kullanan isteklerin bitmesi için beklenecek en uzun süre (saniye)
+MODEL_DRAIN_TIMEOUT_SECONDS = float(os.getenv("MODEL_DRAIN_TIMEOUT_SECONDS", "30"))
+
+# Sürüm adları dosya yollarında (ör. classifier-<sürüm>.onnx) kullanıldığından yalnızca bu karakterlere izin verilir
+MODEL_VERSION_PATTERN = r"^[A-Za-z0-9._-]+$"
+_MODEL_VERSION_RE = re.compile(MODEL_VERSION_PATTERN)
+
+
+def validate_version(version: str) -> str:
+    """Sürüm adı yalnızca harf, rakam, '.', '_' ve '-' içeriyorsa aynen döndürür; aksi halde `ValueError` fırlatır."""
+    if not isinstance(version, str) or not _MODEL_VERSION_RE.fullmatch(version) or version in (".", ".."):
+        raise ValueError(f"Geçersiz sürüm adı: {version!r} (yalnızca harf, rakam, '.', '_' ve '-' kullanılabilir)")
+    return version
+
+
+def parse_model_specs(specs: str, primary_version: str = CLASSIFIER_VERSION) -> List[Tuple[str, str, str]]:
+    """`CLASSIFIER_MODELS` değerini (sürüm, model adı, arka uç) üçlülerine çevirir.
+
+    Birincil sürümü (`CLASSIFIER_VERSION`) tekrar eden veya aynı sürümü iki kez tanımlayan listeler, hiçbir model
+    yüklenmeden önce `ValueError` ile reddedilir.
+    """
+    parsed = []
+    seen = {primary_version}
+    for spec in specs.split(","):
+        spec = spec.strip()
+        if not spec:
+            continue
+        version, sep, target = spec.partition("=")
+        if not sep or not version or not target:
+            raise ValueError(f"Geçersiz model tanımı: {spec!r} (beklenen: sürüm=model_adı[:arka_uç])")
+        version = validate_version(version.strip())
+        if version in seen:
+            source = "CLASSIFIER_VERSION ile aynı" if version == primary_version else "birden fazla kez tanımlı"
+            raise ValueError(f"CLASSIFIER_MODELS içindeki {version!r} sürümü {source}; her sürüm adı tekil olmalı")
+        seen.add(version)
+        model_name, _, backend = target.partition(":")
+        parsed.append((version, model_name.strip(), backend.strip() or CLASSIFIER_BACKEND))
+    return parsed
+
+
+class ModelVersion:
+    """Belleğe yüklenmiş tek bir sınıflandırıcı sürümü: görüntü işlemcisi, çıkarım arka ucu ve mikro-batch kuyruğu.
+
+    Her sürüm kendi ön işleme ayarlarını ve (thread modunda) kendi mikro-batch kuyruğunu taşır; böylece farklı
+    giriş çözünürlüğüne veya arka uca sahip sürümler aynı süreçte yan yana çalışabilir.
+    """
+
+    def __init__(self, version: str, model_name: str, backend_name: str, image_processor,
+                 classifier_backend: Optional[ClassifierBackend] = None,
+                 fast_preprocessor: Optional[FastImagePreprocessor] = None):
+        self.version = validate_version(version)
+        self.model_name = model_name
+        self.backend_name = backend_name
+        self.image_processor = image_processor
+        self.classifier_backend = classifier_backend
+        self.fast_preprocessor = fast_preprocessor
+        self.batcher: Optional[MicroBatcher] = None
+        self.loaded_at = time.time()
+        # Bu sürümü kullanan (kiralamış) istek sayısı; sürüm kaldırılırken sıfıra inmesi beklenir
+        self._inflight = 0
+        self._cond = threading.Condition()
+
+    @classmethod
+    def load(cls, version: str, model_name: str, backend_name: str = CLASSIFIER_BACKEND,
+             timings: Optional[Dict[str, float]] = None) -> "ModelVersion":
+        """Model ağırlıklarını, görüntü işlemcisini ve çıkarım arka ucunu yükler; aşama sürelerini `timings`e yazar."""
+        # Sürüm adı ONNX dosya yolunda kullanılır; ağırlıklar yüklenmeden önce doğrulanır
+        validate_version(version)
+        from transformers import AutoImageProcessor, SiglipForImageClassification
+        timings = timings if timings is not None else {}
+
+        phase_start = time.perf_counter()
+        image_classifier = SiglipForImageClassification.from_pretrained(model_name)
+        image_classifier.eval()
+        timings["classifier_load_s"] = time.perf_counter() - phase_start
+
+        phase_start = time.perf_counter()
+        image_processor = AutoImageProcessor.from_pretrained(model_name)
+        # Sabit çözünürlüklü işlemcilerde genel amaçlı HF ön işlemesi yerine hızlı yol kullanılır
+        fast_preprocessor = FastImagePreprocessor.from_processor(image_processor) if FAST_PREPROCESS else None
+        timings["processor_load_s"] = time.perf_counter() - phase_start
+
+        # fp32 model referans olarak kullanılır; ileri geçiş seçilen arka uç (torch / int8 / onnx) ile yapılır
+        phase_start = time.perf_counter()
+        model = cls(version, model_name, backend_name, image_processor, fast_preprocessor=fast_preprocessor)
+        width, _ = model.target_size() or (224, 224)
+        onnx_path = ONNX_MODEL_PATH if version == CLASSIFIER_VERSION else \
+            os.path.join(os.path.dirname(ONNX_MODEL_PATH), f"classifier-{version}.onnx")
+        model.classifier_backend = create_backend(backend_name, image_classifier, image_size=width, onnx_path=onnx_path)
+        timings["backend_init_s"] = time.perf_counter() - phase_start
+        return model
+
+    def target_size(self) -> Optional[Tuple[int, int]]:
+        """Görüntü işlemcisinin beklediği (genişlik, yükseklik) giriş boyutunu döndürür."""
+        size = getattr(self.image_processor, "size", None) or {}
+        if "width" in size and "height" in size:
+            return size["width"], size["height"]
+        if "shortest_edge" in size:
+            return size["shortest_edge"], size["shortest_edge"]
+        return None
+
+    def preprocess(self, images: Sequence, reuse_buffer: bool = False) -> "torch.Tensor":
+        """Görüntüleri modelin (N, 3, H, W) piksel tensörüne çevirir; mümkünse hızlı ön işleme yolunu kullanır."""
+        if self.fast_preprocessor is not None:
+            return self.fast_preprocessor(images, reuse_buffer=reuse_buffer)
+        return self.image_processor(images=list(images), return_tensors="pt")["pixel_values"]
+
+    def classify_batch(self, pixel_values_list: List["torch.Tensor"]) -> "np.ndarray":
+        """Birden fazla isteğin piksel tensörlerini birleştirip tek ileri geçişte olasılık satırlarını üretir."""
+        import torch
+        return self.classifier_backend.predict(torch.cat(pixel_values_list, dim=0))
+
+    def start_batcher(self) -> None:
+        """Eşzamanlı istekleri tek bir ileri geçişte toplamak için sürüme ait mikro-batch zamanlayıcısını oluşturur."""
+        self.batcher = MicroBatcher(self.classify_batch, name=f"siglip-{self.version}")
+
+    def inflight(self) -> int:
+        with self._cond:
+            return self._inflight
+
+    def _acquire(self) -> None:
+        with self._cond:
+            self._inflight += 1
+
+    def _release(self) -> None:
+        with self._cond:
+            self._inflight -= 1
+            if self._inflight == 0:
+                self._cond.notify_all()
+
+    def drain(self, timeout: Optional[float] = MODEL_DRAIN_TIMEOUT_SECONDS) -> bool:
+        """Sürümü kullanan isteklerin bitmesini bekler (None: süresiz); süre dolarsa False döndürür."""
+        with self._cond:
+            return self._cond.wait_for(lambda: self._inflight == 0, timeout=timeout)
+
+    def describe(self) -> Dict:
+        return {
+            "version": self.version,
+            "model_name": self.model_name,
+            "backend": self.backend_name,
+            "preprocess": "fast" if self.fast_preprocessor is not None else "hf",
+            "input_size": self.target_size(),
+            "loaded_at": time.strftime("%Y-%m-%dT%H:%M:%S%z", time.localtime(self.loaded_at)),
+            "inflight": self.inflight(),
+        }
+
+
+class ShadowEvaluator:
+    """Aday sürümü örneklenen trafikte, isteğin kritik yolu dışında çalıştırıp etkin sürümle karşılaştırır.
+
+    Karşılaştırmalar küçük, sınırlı bir iş parçacığı havuzunda yapılır; kuyruk doluysa örnek beklemeden atlanır,
+    böylece aday sürüm yavaş olsa bile istemci yanıtları gecikmez. Top-1 uyumu, en büyük olasılık farkı ve
+    (aday - etkin) gecikme farkı toplanır ve her karşılaştırma `[SHADOW] {...}` satırı olarak loglanır.
+    """
+
+    def __init__(self, workers: int = SHADOW_WORKERS, queue_max: int = SHADOW_QUEUE_MAX):
+        self.queue_max = max(1, queue_max)
+        self._executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="shadow")
+        self._lock = threading.Lock()
+        self.version: Optional[str] = None
+        self.sample_rate = 0.0
+        self._reset()
+
+    def _reset(self) -> None:
+        """Sayaçları sıfırlar (kilit altında veya başlatmada çağrılır)."""
+        self._pending = 0
+        self._sampled = 0
+        self._dropped = 0
+        self._errors = 0
+        self._compared = 0
+        self._agreed = 0
+        self._max_abs_diff_samples: deque = deque(maxlen=WAIT_SAMPLE_SIZE)
+        self._latency_delta_samples: deque = deque(maxlen=WAIT_SAMPLE_SIZE)
+
+    def configure(self, version: Optional[str], sample_rate: float) -> None:
+        """Aday sürümü ve örnekleme oranını ayarlar; aday değişirse sayaçlar sıfırlanır."""
+        with self._lock:
+            if version != self.version:
+                self._reset()
+            self.version = version
+            self.sample_rate = min(1.0, max(0.0, sample_rate)) if version else 0.0
+
+    def maybe_submit(self, registry: "ModelRegistry", primary: ModelVersion, image_data: bytes, primary_probs,
+                     primary_ms: float, run_fn: Callable[[ModelVersion, bytes], List[float]]) -> bool:
+        """Örneklenen isteklerde aday sürümün çalıştırılmasını arka plana bırakır; iş kuyruğa alındıysa True döner."""
+        with self._lock:
+            version = self.version
+            if version is None or version == primary.version or random.random() >= self.sample_rate:
+                return False
+            if self._pending >= self.queue_max:
+                self._dropped += 1
+                return False
+            self._pending += 1
+            self._sampled += 1
+        self._executor.submit(self._compare, registry, version, primary.version, image_data, primary_probs, primary_ms, run_fn)
+        return True
+
+    def _compare(self, registry: "ModelRegistry", version: str, primary_version: str, image_data: bytes,
+                 primary_probs, primary_ms: float, run_fn: Callable[[ModelVersion, bytes], List[float]]) -> None:
+        try:
+            with registry.lease(version) as candidate:
+                started_at = time.perf_counter()
+                candidate_probs = run_fn(candidate, image_data)
+                candidate_ms = (time.perf_counter() - started_at) * 1000.0
+            primary_row, candidate_row = np.asarray(primary_probs), np.asarray(candidate_probs)
+            primary_top, candidate_top = int(np.argmax(primary_row)), int(np.argmax(candidate_row))
+            # Sınıf sayısı farklı sürümlerde olasılık farkı tanımsızdır; yalnızca top-1 karşılaştırılır
+            max_abs_diff = float(np.max(np.abs(primary_row - candidate_row))) if primary_row.shape == candidate_row.shape else None
+        except Exception as e:
+            with self._lock:
+                self._pending -= 1
+                if version == self.version:
+                    self._errors += 1
+            print(f"Shadow evaluation error ({version}): {e}")
+            return
+
+        latency_delta_ms = candidate_ms - primary_ms
+        with self._lock:
+            self._pending -= 1
+            # Karşılaştırma sürerken aday değiştirildiyse sonuç yeni adayın sayaçlarına yazılmaz
+            if version == self.version:
+                self._compared += 1
+                self._agreed += primary_top == candidate_top
+                if max_abs_diff is not None:
+                    self._max_abs_diff_samples.append(max_abs_diff)
+                self._latency_delta_samples.append(latency_delta_ms)
+        print(f"[SHADOW] {json.dumps({'primary': primary_version, 'candidate': version, 'agree': primary_top == candidate_top, 'primary_top1': primary_top, 'candidate_top1': candidate_top, 'max_abs_diff': None if max_abs_diff is None else round(max_abs_diff, 6), 'primary_ms': round(primary_ms, 3), 'candidate_ms': round(candidate_ms, 3), 'latency_delta_ms': round(latency_delta_ms, 3)})}")
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> Dict:
+        """Örnekleme, atlama ve hata sayaçlarını, top-1 uyum oranını ve gecikme farkı yüzdeliklerini döndürür."""
+        with self._lock:
+            diffs = sorted(self._max_abs_diff_samples)
+            deltas = sorted(self._latency_delta_samples)
+            compared, agreed = self._compared, self._agreed
+            counters = {"sampled": self._sampled, "dropped": self._dropped, "errors": self._errors, "pending": self._pending}
+            version, sample_rate = self.version, self.sample_rate
+        return {
+            "candidate": version,
+            "sample_rate": sample_rate,
+            "queue_max": self.queue_max,
+            **counters,
+            "compared": compared,
+            "top1_agreement": round(agreed / compared, 4) if compared else None,
+            "max_abs_diff": {
+                "samples": len(diffs),
+                "mean": round(sum(diffs) / len(diffs), 6) if diffs else 0.0,
+                "p99": round(_percentile(diffs, 99), 6),
+            },
+            "latency_delta_ms": {
+                "samples": len(deltas),
+                "mean": round(sum(deltas) / len(deltas), 3) if deltas else 0.0,
+                "p50": round(_percentile(deltas, 50), 3),
+                "p90": round(_percentile(deltas, 90), 3),
+                "p99": round(_percentile(deltas, 99), 3),
+            },
+        }
+
+
+class ModelRegistry:
+    """Bellekteki sınıflandırıcı sürümlerini, etkin sürümü ve gölge değerlendirmesini yöneten kayıt.
+
+    İstekler etkin sürümü `lease` ile bir kez alır ve iş bitene kadar aynı sürümle çalışır. Etkin sürüm
+    değişimi yalnızca bir referans atamasıdır: yeni istekler yeni sürüme gider, devam eden istekler eski sürümle
+    tamamlanır; eski sürüm `unload` ile kaldırılana kadar bellekte kalır.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._versions: Dict[str, ModelVersion] = {}
+        self._active: Optional[ModelVersion] = None
+        self.swaps = 0
+        self.shadow = ShadowEvaluator()
+
+    def register(self, model: ModelVersion) -> None:
+        with self._lock:
+            if model.version in self._versions:
+                raise ValueError(f"Sürüm zaten yüklü: {model.version}")
+            self._versions[model.version] = model
+
+    def get(self, version: str) -> ModelVersion:
+        with self._lock:
+            model = self._versions.get(version)
+        if model is None:
+            raise KeyError(f"Bilinmeyen model sürümü: {version}")
+        return model
+
+    def versions(self) -> List[ModelVersion]:
+        with self._lock:
+            return list(self._versions.values())
+
+    @property
+    def active(self) -> Optional[ModelVersion]:
+        return self._active
+
+    def activate(self, version: str) -> ModelVersion:
+        """Etkin sürümü atomik olarak değiştirir; devam eden istekler kiraladıkları sürümle tamamlanır."""
+        with self._lock:
+            model = self._versions.get(version)
+            if model is None:
+                raise KeyError(f"Bilinmeyen model sürümü: {version}")
+            previous = self._active
+            self._active = model
+            if previous is not None and previous is not model:
+                self.swaps += 1
+        print(f"Active classifier: {previous.version if previous else '-'} -> {model.version}")
+        return model
+
+    def set_shadow(self, version: Optional[str], sample_rate: float = SHADOW_SAMPLE_RATE) -> None:
+        """Gölge modda çalışacak aday sürümü ayarlar (None: kapalı)."""
+        if version:
+            self.get(version)
+        self.shadow.configure(version or None, sample_rate)
+
+    @contextmanager
+    def lease(self, version: Optional[str] = None) -> Iterator[ModelVersion]:
+        """Etkin (veya adı verilen) sürümü blok boyunca kiralar; sürüm bu sürede bellekten kaldırılmaz."""
+        with self._lock:
+            model = self._active if version is None else self._versions.get(version)
+            if model is None:
+                raise KeyError(f"Bilinmeyen model sürümü: {version}" if version else "Etkin model sürümü yok.")
+            model._acquire()
+        try:
+            yield model
+        finally:
+            model._release()
+
+    def unload(self, version: str, timeout: float = MODEL_DRAIN_TIMEOUT_SECONDS) -> bool:
+        """Sürümü kayıttan çıkarır, onu kullanan isteklerin bitmesini bekler ve mikro-batch kuyruğunu kapatır.
+
+        Etkin veya gölge sürüm kaldırılamaz. İstekler süre içinde bitmezse False döner; sürüm yeni istek
+        almaz ve kuyruğu son kiralama bittiğinde arka planda kapatılır.
+        """
+        with self._lock:
+            model = self._versions.get(version)
+            if model is None:
+                raise KeyError(f"Bilinmeyen model sürümü: {version}")
+            if model is self._active or version == self.shadow.version:
+                raise ValueError(f"Etkin veya gölge sürüm kaldırılamaz: {version}")
+            del self._versions[version]
+        drained = model.drain(timeout)
+        if model.batcher is not None:
+            if drained:
+                model.batcher.close()
+            else:
+                threading.Thread(target=lambda: model.drain(None) and model.batcher.close(),
+                                 name=f"unload-{version}", daemon=True).start()
+        print(f"Classifier unloaded: {version} (drained: {drained})")
+        return drained
+
+    def stats(self) -> Dict:
+        """Yüklü sürümleri, etkin sürümü, değişim sayısını ve gölge değerlendirme istatistiklerini döndürür."""
+        active = self._active
+        return {
+            "active": active.version if active is not None else None,
+            "swaps": self.swaps,
+            "versions": [model.describe() for model in self.versions()],
+            "shadow": self.shadow.stats(),
+        }
@@ -0,0 +1,145 @@
+# Sabit çözünürlüklü SigLIP görüntü işlemcisi için hızlı ön işleme yolu ve HF işlemcisine karşı parite kontrolü.
+# Kullanım: python preprocessing.py --images "samples/*.jpg"
+import argparse
+import io
+import json
+import os
+import threading
+import time
+from typing import TYPE_CHECKING, Optional, Sequence
+
+import numpy as np
+from PIL import Image
+
+if TYPE_CHECKING:
+    import torch
+
+# "1" ise uygun görüntü işlemcilerinde AutoImageProcessor yerine hızlı ön işleme yolu kullanılır
+FAST_PREPROCESS = os.getenv("FAST_PREPROCESS", "1") == "1"
+
+
+class FastImagePreprocessor:
+    """SigLIP'in sabit boyutlu görüntü işlemcisinin (resize -> rescale -> normalize) eşdeğeri.
+
+    Yeniden boyutlandırma HF işlemcisiyle aynı PIL filtresiyle yapılır. Ölçekleme ve normalizasyon, kanal başına
+    256 girdili bir tabloya önceden katlanır; böylece her piksel tek bir tablo okumasıyla doğrudan float32 çıktı
+    tamponuna yazılır. `reuse_buffer=True` ile çıktı, iş parçacığına özel ve istekler arasında yeniden kullanılan bir
+    tampondur; sonuç bir sonraki çağrıdan önce tüketilmelidir (ör. batch'e kopyalanır).
+    """
+
+    def __init__(self, width: int, height: int, resample: int, rescale_factor: float,
+                 image_mean: Sequence[float], image_std: Sequence[float]):
+        self.width = width
+        self.height = height
+        self.resample = resample
+        values = np.arange(256, dtype=np.float64)
+        mean = np.asarray(image_mean, dtype=np.float64).reshape(3, 1)
+        std = np.asarray(image_std, dtype=np.float64).reshape(3, 1)
+        # (3, 256) tablo: lut[c][v] = (v * rescale_factor - mean[c]) / std[c]
+        self._lut = ((values[np.newaxis, :] * rescale_factor - mean) / std).astype(np.float32)
+        self._local = threading.local()
+
+    @classmethod
+    def from_processor(cls, processor) -> Optional["FastImagePreprocessor"]:
+        """HF görüntü işlemcisinin ayarlarını kopyalar; desteklenmeyen bir işlemciyse None döndürür."""
+        size = getattr(processor, "size", None) or {}
+        # Değişken çözünürlüklü (yama sayısına göre) veya merkez kırpmalı işlemciler için hızlı yol yoktur
+        if "height" not in size or "width" not in size or not getattr(processor, "do_resize", True):
+            return None
+        if getattr(processor, "do_center_crop", False) or hasattr(processor, "max_num_patches"):
+            return None
+        rescale_factor = processor.rescale_factor if getattr(processor, "do_rescale", True) else 1.0
+        if getattr(processor, "do_normalize", True):
+            image_mean, image_std = processor.image_mean, processor.image_std
+        else:
+            image_mean, image_std = (0.0, 0.0, 0.0), (1.0, 1.0, 1.0)
+        if len(image_mean) != 3 or len(image_std) != 3:
+            return None
+        resample = int(getattr(processor, "resample", Image.BICUBIC))
+        return cls(size["width"], size["height"], resample, rescale_factor, image_mean, image_std)
+
+    def __call__(self, images: Sequence[Image.Image], reuse_buffer: bool = False) -> "torch.Tensor":
+        """Görüntüleri (N, 3, H, W) boyutlu float32 piksel tensörüne dönüştürür."""
+        import torch
+        if reuse_buffer:
+            out = self._buffer(len(images))
+        else:
+            out = np.empty((len(images), 3, self.height, self.width), dtype=np.float32)
+        for image, target in zip(images, out):
+            self._fill(image, target)
+        return torch.from_numpy(out)
+
+    def _buffer(self, count: int) -> np.ndarray:
+        """İş parçacığına özel çıktı tamponunu döndürür; daha büyük bir batch gelirse tampon büyütülür."""
+        buffer = getattr(self._local, "buffer", None)
+        if buffer is None or buffer.shape[0] < count:
+            buffer = np.empty((count, 3, self.height, self.width), dtype=np.float32)
+            self._local.buffer = buffer
+        return buffer[:count]
+
+    def _fill(self, image: Image.Image, out: np.ndarray) -> None:
+        if image.mode != "RGB":
+            image = image.convert("RGB")
+        image = image.resize((self.width, self.height), resample=self.resample)
+        pixels = np.asarray(image)
+        for channel in range(3):
+            np.take(self._lut[channel], pixels[:, :, channel], out=out[channel])
+
+
+def check_parity(processor, fast: FastImagePreprocessor, images: Sequence[Image.Image]) -> dict:
+    """Hızlı yolun HF işlemcisine göre en büyük / ortalama mutlak farkını ve görüntü başına süresini raporlar."""
+    start = time.perf_counter()
+    reference = processor(images=list(images), return_tensors="np")["pixel_values"]
+    reference_ms = (time.perf_counter() - start) * 1000.0
+    start = time.perf_counter()
+    candidate = fast(images).numpy()
+    fast_ms = (time.perf_counter() - start) * 1000.0
+    delta = np.abs(reference.astype(np.float64) - candidate.astype(np.float64))
+    return {
+        "samples": len(images),
+        "shape": list(candidate.shape),
+        "max_abs_diff": round(float(delta.max()), 7),
+        "mean_abs_diff": round(float(delta.mean()), 9),
+        "hf_ms_per_image": round(reference_ms / len(images), 3),
+        "fast_ms_per_image": round(fast_ms / len(images), 3),
+    }
+
+
+def main() -> None:
+    """Hızlı ön işleme yolunun HF işlemcisine paritesini ölçer; sonucu JSON olarak yazdırır, tolerans aşılırsa hata verir."""
+    parser = argparse.ArgumentParser(description="Hızlı ön işleme parite kontrolü")
+    parser.add_argument("--images", help="Örnek görüntü glob deseni; verilmezse sabit tohumlu sentetik JPEG'ler kullanılır")
+    parser.add_argument("--count", type=int, default=16)
+    parser.add_argument("--tolerance", type=float, default=1e-5, help="Kabul edilen en büyük mutlak fark")
+    args = parser.parse_args()
+
+    from transformers import AutoImageProcessor
+    from benchmark import build_corpus
+    from image_analyzer import analyzer
+    from model_registry import CLASSIFIER_MODEL_NAME, ModelVersion
+
+    processor = AutoImageProcessor.from_pretrained(CLASSIFIER_MODEL_NAME)
+    fast = FastImagePreprocessor.from_processor(processor)
+    if fast is None:
+        raise SystemExit(f"{type(processor).__name__} için hızlı ön işleme yolu desteklenmiyor.")
+
+    corpus = build_corpus(args.images, args.count)
+    # Aynı girdi üzerinde yalnızca ön işleme farkı ölçülür (tam çözünürlükte çözülmüş görüntüler)
+    full_images = [Image.open(io.BytesIO(data)).convert("RGB") for data in corpus]
+    report = {"processor": type(processor).__name__, "preprocess": check_parity(processor, fast, full_images)}
+
+    # Sunucudaki yol: JPEG draft çözümleme + hızlı ön işleme, tam çözünürlük + HF işlemcisine göre (bilgi amaçlı)
+    reference_model = ModelVersion("parity", CLASSIFIER_MODEL_NAME, "torch", processor)
+    draft_images = [analyzer._decode_image(data, reference_model) for data in corpus]
+    end_to_end = np.abs(processor(images=full_images, return_tensors="np")["pixel_values"] - fast(draft_images).numpy())
+    report["draft_decode"] = {
+        "max_abs_diff": round(float(end_to_end.max()), 6),
+        "mean_abs_diff": round(float(end_to_end.mean()), 6),
+    }
+    print(json.dumps(report, indent=2))
+    if report["preprocess"]["max_abs_diff"] > args.tolerance:
+        raise SystemExit(f"Parite toleransı aşıldı: {report['preprocess']['max_abs_diff']} > {args.tolerance}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+# Gerekli kütüphanelerin import edilmesi
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+# Önbellek sınırlarının varsayılan ayarları (ortam değişkenleri ile değiştirilebilir)
+RESULT_CACHE_MAX_ENTRIES = int(os.getenv("RESULT_CACHE_MAX_ENTRIES", "1024"))
+RESULT_CACHE_MAX_BYTES = int(os.getenv("RESULT_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+RESULT_CACHE_TTL_SECONDS = float(os.getenv("RESULT_CACHE_TTL_SECONDS", "3600"))
+# Tanımlanırsa önbellek katmanları bu dizindeki SQLite dosyalarında da saklanır
+RESULT_CACHE_DIR = os.getenv("RESULT_CACHE_DIR")
+
+
+class _DiskStore:
+    """Önbellek girdilerini işçi yeniden başlatmalarından sonra da korumak için SQLite tabanlı basit bir depo."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value TEXT NOT NULL, created_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get(self, key: str):
+        with self._lock:
+            row = self._conn.execute("SELECT value, created_at FROM cache WHERE key = ?", (key,)).fetchone()
+        return row
+
+    def put(self, key: str, value: str, created_at: float) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, created_at) VALUES (?, ?, ?)", (key, value, created_at)
+            )
+            self._conn.commit()
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+            self._conn.commit()
+
+    def purge_expired(self, oldest_allowed: float) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM cache WHERE created_at < ?", (oldest_allowed,))
+            self._conn.commit()
+
+
+class ResultCache:
+    """Girdi sayısı ve bayt boyutu ile sınırlı, TTL destekli, iş parçacığı güvenli LRU önbellek.
+
+    Değerler JSON'a çevrilebilir olmalıdır; bayt boyutu JSON gösteriminin uzunluğu ile ölçülür.
+    `disk_path` verilirse bellekte bulunamayan girdiler diskten okunur ve yazılan her girdi diske de kaydedilir.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_entries: int = RESULT_CACHE_MAX_ENTRIES,
+        max_bytes: int = RESULT_CACHE_MAX_BYTES,
+        ttl_seconds: float = RESULT_CACHE_TTL_SECONDS,
+        disk_path: Optional[str] = None,
+    ):
+        self.name = name
+        self.max_entries = max(1, max_entries)
+        self.max_bytes = max(1, max_bytes)
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+        self._disk: Optional[_DiskStore] = None
+        if disk_path:
+            try:
+                self._disk = _DiskStore(disk_path)
+                if self.ttl_seconds > 0:
+                    self._disk.purge_expired(time.time() - self.ttl_seconds)
+            except Exception as e:
+                print(f"Result cache disk store error ({disk_path}): {e}")
+
+        # İsabet / ıskalama / çıkarma sayaçları
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def _is_expired(self, created_at: float, now: float) -> bool:
+        return self.ttl_seconds > 0 and now - created_at > self.ttl_seconds
+
+    def get(self, key: str) -> Optional[Any]:
+        """Anahtara ait değeri döndürür; bulunamazsa veya süresi dolmuşsa None döndürür."""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, size, created_at = entry
+                if not self._is_expired(created_at, now):
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                self._remove(key)
+                self.expirations += 1
+
+        if self._disk is not None:
+            try:
+                row = self._disk.get(key)
+            except Exception as e:
+                print(f"Result cache disk read error: {e}")
+                row = None
+            if row is not None:
+                serialized, created_at = row
+                if not self._is_expired(created_at, now):
+                    value = json.loads(serialized)
+                    with self._lock:
+                        self._store(key, value, len(serialized), created_at)
+                        self.disk_hits += 1
+                    return value
+                try:
+                    self._disk.delete(key)
+                except Exception as e:
+                    print(f"Result cache disk delete error: {e}")
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key: str, value: Any) -> None:
+        """Değeri önbelleğe ekler; sınırlar aşılırsa en uzun süredir kullanılmayan girdiler çıkarılır."""
+        serialized = json.dumps(value, ensure_ascii=False)
+        created_at = time.time()
+        with self._lock:
+            self._store(key, value, len(serialized), created_at)
+        if self._disk is not None:
+            try:
+                self._disk.put(key, serialized, created_at)
+            except Exception as e:
+                print(f"Result cache disk write error: {e}")
+
+    def clear(self) -> None:
+        """Bellekteki tüm girdileri siler (disk deposu korunur)."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict:
+        """Önbelleğin doluluk ve isabet istatistiklerini döndürür."""
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                "name": self.name,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl_seconds,
+                "disk_backed": self._disk is not None,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_ratio": round((self.hits + self.disk_hits) / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+    def _store(self, key: str, value: Any, size: int, created_at: float) -> None:
+        """Girdiyi ekler ve sınırlara göre LRU çıkarma yapar (kilit altında çağrılmalıdır)."""
+        if key in self._entries:
+            self._remove(key)
+        if size > self.max_bytes:
+            return
+        self._entries[key] = (value, size, created_at)
+        self._bytes += size
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            oldest_key = next(iter(self._entries))
+            self._remove(oldest_key)
+            self.evictions += 1
+
+    def _remove(self, key: str) -> None:
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+
+def create_result_cache(name: str) -> ResultCache:
+    """Ortam değişkenlerindeki ayarlarla, isteğe bağlı disk destekli bir önbellek katmanı oluşturur."""
+    disk_path = None
+    if RESULT_CACHE_DIR:
+        os.makedirs(RESULT_CACHE_DIR, exist_ok=True)
+        disk_path = os.path.join(RESULT_CACHE_DIR, f"{name}.sqlite3")
+    return ResultCache(name, disk_path=disk_path)
@@ -0,0 +1,66 @@
+# İşçi süreç havuzunun bir işçi çöktüğünde (BrokenProcessPool) yeniden kurulması ve süreç içi yedeğe düşmesi
+import os
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+pytest.importorskip("torch")
+
+from inference_workers import ProcessInferencePool  # noqa: E402
+
+SPECS = [("v1", "test-model", "torch")]
+
+
+def _init_test_worker(specs):
+    """Model yüklemek yerine, b"crash" girdisinde süreci sonlandıran sahte bir çıkarım fonksiyonu döndürür."""
+    loaded = [version for version, _, _ in specs]
+
+    def infer(image_data, version):
+        if image_data == b"crash":
+            os._exit(1)
+        return [float(len(image_data)), version, loaded]
+
+    return infer
+
+
+@pytest.fixture
+def make_pool():
+    pools = []
+
+    def make(fallback=None):
+        pool = ProcessInferencePool(workers=1, threads_per_worker=1)
+        pool.start(SPECS, _init_test_worker, fallback=fallback)
+        pools.append(pool)
+        return pool
+
+    yield make
+    for pool in pools:
+        pool.shutdown()
+
+
+def test_worker_loads_specs_and_runs(make_pool):
+    pool = make_pool()
+
+    assert pool.run(b"abc", "v1") == [3.0, "v1", ["v1"]]
+
+
+def test_crashed_worker_falls_back_in_process_and_pool_recovers(make_pool):
+    pool = make_pool(fallback=lambda image_data, version: ["fallback", version])
+
+    assert pool.run(b"crash", "v1") == ["fallback", "v1"]
+    # Sonraki istekler yeniden kurulan havuzda çalışır
+    assert pool.run(b"abcd", "v1") == [4.0, "v1", ["v1"]]
+
+    stats = pool.stats()
+    assert stats["restarts"] == 1
+    assert stats["fallbacks"] == 1
+    assert stats["inflight"] == 0
+
+
+def test_crashed_worker_without_fallback_raises_and_pool_recovers(make_pool):
+    pool = make_pool()
+
+    with pytest.raises(BrokenProcessPool):
+        pool.run(b"crash", "v1")
+    assert pool.run(b"ab", "v1") == [2.0, "v1", ["v1"]]
+    assert pool.stats()["restarts"] == 1
@@ -0,0 +1,62 @@
+# Hızlı ön işleme yolunun (LUT) HF SigLIP görüntü işlemcisine paritesi
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("torch")
+transformers = pytest.importorskip("transformers")
+Image = pytest.importorskip("PIL.Image")
+
+from preprocessing import FastImagePreprocessor, check_parity  # noqa: E402
+
+# `python preprocessing.py` komutunun varsayılan toleransı
+TOLERANCE = 1e-5
+
+
+def _images(count=4, seed=0):
+    """Farklı boyutlarda, sabit tohumlu sentetik görüntüler."""
+    rng = np.random.default_rng(seed)
+    sizes = [(320, 240), (224, 224), (97, 401), (640, 480)]
+    images = []
+    for i in range(count):
+        width, height = sizes[i % len(sizes)]
+        images.append(Image.fromarray(rng.integers(0, 256, (height, width, 3), dtype=np.uint8)))
+    return images
+
+
+@pytest.mark.parametrize("kwargs", [
+    {},
+    {"size": {"height": 256, "width": 256}, "image_mean": [0.485, 0.456, 0.406], "image_std": [0.229, 0.224, 0.225]},
+    {"resample": Image.BILINEAR, "rescale_factor": 1 / 127.5},
+])
+def test_fast_path_matches_hf_processor(kwargs):
+    processor = transformers.SiglipImageProcessor(**kwargs)
+    fast = FastImagePreprocessor.from_processor(processor)
+    assert fast is not None
+
+    report = check_parity(processor, fast, _images())
+
+    assert report["shape"] == [4, 3, fast.height, fast.width]
+    assert report["max_abs_diff"] <= TOLERANCE
+
+
+def test_reused_buffer_matches_fresh_output():
+    fast = FastImagePreprocessor.from_processor(transformers.SiglipImageProcessor())
+    images = _images()
+
+    fresh = fast(images).numpy().copy()
+    reused = fast(images, reuse_buffer=True).numpy()
+
+    np.testing.assert_array_equal(fresh, reused)
+
+
+def test_non_rgb_input_is_converted():
+    fast = FastImagePreprocessor.from_processor(transformers.SiglipImageProcessor())
+    gray = _images(count=1)[0].convert("L")
+
+    np.testing.assert_array_equal(fast([gray]).numpy(), fast([gray.convert("RGB")]).numpy())
+
+
+def test_unsupported_processor_has_no_fast_path():
+    processor = transformers.SiglipImageProcessor(do_resize=False)
+
+    assert FastImagePreprocessor.from_processor(processor) is None
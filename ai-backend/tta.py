@@ -0,0 +1,110 @@
+# Gerekli kütüphanelerin import edilmesi
+import os
+import threading
+from collections import deque
+from typing import Callable, Dict, List, Sequence
+
+import numpy as np
+from PIL import Image
+
+from batching import WAIT_SAMPLE_SIZE, _percentile
+
+# "1" ise düşük güvenli tahminlerde artırılmış görünümlerle (test-time augmentation) yeniden sınıflandırma yapılır
+TTA_ENABLED = os.getenv("TTA_ENABLED", "0") == "1"
+# Tek görünümdeki en yüksek olasılık bu değerin altındaysa artırılmış görünümler çalıştırılır
+TTA_CONFIDENCE_THRESHOLD = float(os.getenv("TTA_CONFIDENCE_THRESHOLD", "0.6"))
+# Kullanılacak görünümler: hflip, vflip, crop_center, crop_tl, crop_tr, crop_bl, crop_br
+TTA_VIEWS = [view for view in os.getenv("TTA_VIEWS", "hflip,crop_center,crop_tl,crop_br").split(",") if view]
+# Kırpma görünümlerinde korunan kenar oranı
+TTA_CROP_FRACTION = float(os.getenv("TTA_CROP_FRACTION", "0.875"))
+
+
+def _crop(anchor: str) -> Callable[[Image.Image], Image.Image]:
+    """Görüntünün `TTA_CROP_FRACTION` oranındaki bölgesini verilen köşeden (veya merkezden) kırpan fonksiyon."""
+    def crop(image: Image.Image) -> Image.Image:
+        width, height = image.size
+        crop_w, crop_h = int(width * TTA_CROP_FRACTION), int(height * TTA_CROP_FRACTION)
+        left = {"l": 0, "r": width - crop_w, "c": (width - crop_w) // 2}[anchor[1]]
+        top = {"t": 0, "b": height - crop_h, "c": (height - crop_h) // 2}[anchor[0]]
+        return image.crop((left, top, left + crop_w, top + crop_h))
+    return crop
+
+
+VIEW_TRANSFORMS: Dict[str, Callable[[Image.Image], Image.Image]] = {
+    "hflip": lambda image: image.transpose(Image.FLIP_LEFT_RIGHT),
+    "vflip": lambda image: image.transpose(Image.FLIP_TOP_BOTTOM),
+    "crop_center": _crop("cc"),
+    "crop_tl": _crop("tl"),
+    "crop_tr": _crop("tr"),
+    "crop_bl": _crop("bl"),
+    "crop_br": _crop("br"),
+}
+
+
+class TestTimeAugmenter:
+    """Güven eşiğiyle tetiklenen çok görünümlü sınıflandırma ve tetiklenme/gecikme istatistikleri.
+
+    Tek görünümün en yüksek olasılığı eşiğin altındaysa görünümler tek bir tensörde hazırlanır ve tek batch
+    halinde çalıştırılır; sonuç, ilk görünüm dahil tüm görünümlerin olasılık ortalamasıdır.
+    """
+
+    def __init__(self, enabled: bool = TTA_ENABLED, threshold: float = TTA_CONFIDENCE_THRESHOLD,
+                 views: Sequence[str] = TTA_VIEWS):
+        unknown = [view for view in views if view not in VIEW_TRANSFORMS]
+        if unknown:
+            raise ValueError(f"Bilinmeyen TTA görünümleri: {', '.join(unknown)} ({', '.join(VIEW_TRANSFORMS)})")
+        self.enabled = enabled and bool(views)
+        self.threshold = threshold
+        self.views = tuple(views)
+        self._lock = threading.Lock()
+        self._checked = 0
+        self._fired = 0
+        self._top1_changed = 0
+        self._added_ms_samples: deque = deque(maxlen=WAIT_SAMPLE_SIZE)
+
+    def should_augment(self, probs, count: bool = True) -> bool:
+        """Tek görünüm sonucu için artırılmış görünümlerin çalıştırılıp çalıştırılmayacağını döndürür."""
+        if not self.enabled:
+            return False
+        if count:
+            with self._lock:
+                self._checked += 1
+        return float(np.max(probs)) < self.threshold
+
+    def augment(self, image: Image.Image) -> List[Image.Image]:
+        """Yapılandırılmış görünümleri üretir (ilk görünüm hariç)."""
+        return [VIEW_TRANSFORMS[view](image) for view in self.views]
+
+    @staticmethod
+    def combine(base_probs, view_probs: Sequence) -> np.ndarray:
+        """İlk görünüm ve artırılmış görünümlerin olasılık satırlarının ortalamasını döndürür."""
+        return np.mean(np.vstack([np.asarray(base_probs), *map(np.asarray, view_probs)]), axis=0)
+
+    def record(self, base_probs, final_probs, added_seconds: float) -> None:
+        with self._lock:
+            self._fired += 1
+            if int(np.argmax(base_probs)) != int(np.argmax(final_probs)):
+                self._top1_changed += 1
+            self._added_ms_samples.append(added_seconds * 1000.0)
+
+    def stats(self) -> Dict:
+        """Kapının ne sıklıkla tetiklendiğini, top-1 değişim oranını ve eklenen gecikmeyi döndürür."""
+        with self._lock:
+            added = sorted(self._added_ms_samples)
+            checked, fired, changed = self._checked, self._fired, self._top1_changed
+        return {
+            "enabled": self.enabled,
+            "threshold": self.threshold,
+            "views": list(self.views),
+            "checked": checked,
+            "fired": fired,
+            "fire_rate": round(fired / checked, 4) if checked else 0.0,
+            "top1_changed": changed,
+            "added_ms": {
+                "samples": len(added),
+                "mean": round(sum(added) / len(added), 3) if added else 0.0,
+                "p50": round(_percentile(added, 50), 3),
+                "p90": round(_percentile(added, 90), 3),
+                "p99": round(_percentile(added, 99), 3),
+            },
+        }